@@ -1,21 +1,191 @@
 import gymnasium as gym
 import jsbsim
 import numpy as np
-from stable_baselines3 import PPO
+
+import profiling
+from flight_recorder import STATUS_NORMAL, STATUS_STALL, FlightRecorder
+from reward_spec import as_reward_spec
+from stall_analytics import find_stall_events, summarize_events
+
+# JSBSim properties read every step, in observation order.
+OBS_PROPERTIES = (
+    'aero/alpha-deg',
+    'velocities/vc-kts',
+    'velocities/q-rad_sec',
+    'attitude/theta-deg',
+    'position/h-sl-ft',
+    'fcs/throttle-cmd-norm',
+    'attitude/phi-deg',
+)
+# JSBSim properties written every step, in action order.
+ACTION_PROPERTIES = ('fcs/elevator-cmd-norm', 'fcs/throttle-cmd-norm')
+
+# JSBSim initial condition properties, in the order they must be applied.
+IC_PROPERTIES = (
+    'ic/alpha-deg',
+    'ic/vc-kts',
+    'ic/theta-deg',
+    'ic/h-sl-ft',
+    'ic/phi-deg',
+    'ic/psi-deg',
+)
+# Names accepted in reset(options={'ic': {...}}), in IC_PROPERTIES order.
+IC_NAMES = ('alpha', 'vc', 'theta', 'altitude', 'roll', 'heading')
+# Nominal initial condition the sampled values are overlaid on.
+BASE_IC = (15.0, 50.0, 15.0, 3280.0, 0.0, 0.0)  # ~1000m
+
+# (critical, safe) angle of attack in degrees per JSBSim aircraft model.
+# Approximate stall angles; unlisted models use DEFAULT_ALPHA_LIMITS.
+AIRCRAFT_ALPHA_LIMITS = {
+    'B747': (15.0, 10.0),
+    '737': (14.0, 9.0),
+    'A320': (15.0, 10.0),
+    'c172x': (16.0, 11.0),
+    'f16': (25.0, 18.0),
+}
+DEFAULT_ALPHA_LIMITS = (15.0, 10.0)
+
+# Indices into the observation vector.
+OBS_ALPHA, OBS_VC, OBS_Q, OBS_THETA, OBS_ALT, OBS_THROTTLE, OBS_ROLL = range(7)
+# Indices into the initial condition vector.
+IC_ALPHA, IC_VC, IC_THETA, IC_ALT, IC_PHI, IC_PSI = range(6)
+
+# Loaded JSBSim executives that are not owned by any environment, per aircraft.
+_EXEC_CACHE = {}
+
+
+def acquire_executive(aircraft):
+    """
+    Get a JSBSim executive with ``aircraft`` loaded.
+
+    A previously released executive is reused when one is available, so the
+    aircraft, engine and systems XML is parsed at most once per live
+    environment in each process.
+
+    Args:
+        aircraft (str): JSBSim aircraft model name.
+
+    Returns:
+        jsbsim.FGFDMExec: An executive owned by the caller.
+    """
+    pool = _EXEC_CACHE.get(aircraft)
+    if pool:
+        return pool.pop()
+
+    sim = jsbsim.FGFDMExec(None)
+    sim.set_aircraft_path('aircraft')
+    sim.set_engine_path('engine')
+    sim.set_systems_path('systems')
+    sim.load_model(aircraft)
+    return sim
+
+
+def release_executive(aircraft, sim):
+    """Return an executive obtained from ``acquire_executive`` for reuse."""
+    _EXEC_CACHE.setdefault(aircraft, []).append(sim)
+
+
+def clear_executive_cache():
+    """Drop every cached executive."""
+    _EXEC_CACHE.clear()
+
+
+class PropertyBinding:
+    """
+    A fixed set of JSBSim properties resolved to property nodes once.
+
+    Reading and writing through the bound nodes skips the string-keyed
+    property tree lookup that ``get_property_value``/``set_property_value``
+    perform on every call.
+    """
+
+    def __init__(self, sim, names):
+        manager = sim.get_property_manager()
+        self.names = tuple(names)
+        nodes = [manager.get_node(name, True) for name in self.names]
+        self._getters = [node.get_double_value for node in nodes]
+        self._setters = [node.set_double_value for node in nodes]
+        self.buffer = np.zeros(len(self.names), dtype=np.float32)
+
+    def read(self):
+        """
+        Read all bound properties into the preallocated buffer.
+
+        Returns:
+            np.ndarray: The float32 buffer, overwritten in place.
+        """
+        self.buffer[:] = [get() for get in self._getters]
+        return self.buffer
+
+    def write(self, values):
+        """Write one value per bound property, in binding order."""
+        for set_value, value in zip(self._setters, values):
+            set_value(float(value))
+
 
 class CustomStallRecoveryEnv(gym.Env):
-    def __init__(self, aircraft='B747', dt=0.1):
+    def __init__(self, aircraft='B747', dt=0.1, action_repeat=1, physics_substeps=1,
+                 use_cache=True, reset_mode='bound', ic_sampler=None, reward_spec=None):
+        """
+        Args:
+            aircraft (str): JSBSim aircraft model name.
+            dt (float): Physics frame length in seconds.
+            action_repeat (int): Physics frames each action is held for.
+            physics_substeps (int): FDM integration steps per physics frame;
+                JSBSim runs at ``dt / physics_substeps`` internally.
+            use_cache (bool): Reuse a loaded executive from the process-wide
+                cache instead of parsing the aircraft XML again.
+            reset_mode (str): ``'bound'`` writes the cached nominal initial
+                condition vector, with the sampled values overlaid, through
+                the bound ``ic/`` nodes; ``'full'`` sets every initial
+                condition by name. Both re-run ``run_ic()``; no FDM state is
+                restored.
+            ic_sampler (AdaptiveICSampler, optional): Draws the alpha, vc
+                and theta initial conditions instead of uniform sampling
+                and is told the outcome of every episode.
+            reward_spec (RewardSpec or dict, optional): Reward and
+                termination definition; ``DEFAULT_REWARD_SPEC`` when omitted.
+        """
         super(CustomStallRecoveryEnv, self).__init__()
+        if action_repeat < 1 or physics_substeps < 1:
+            raise ValueError("action_repeat and physics_substeps must be >= 1")
+        if reset_mode not in ('bound', 'full'):
+            raise ValueError(f"Unknown reset_mode: {reset_mode!r}")
         self.aircraft = aircraft
         self.dt = dt  # Time step in seconds
+        self.action_repeat = action_repeat
+        self.physics_substeps = physics_substeps
+        self.use_cache = use_cache
+        self.reset_mode = reset_mode
+        self.ic_sampler = ic_sampler
+        self._ic_region = None  # Sampler region of the running episode
+        self._episode_steps = 0
 
         # Initialize JSBSim simulation
-        self.sim = jsbsim.FGFDMExec(None)
-        self.sim.set_aircraft_path('aircraft')
-        self.sim.set_engine_path('engine')
-        self.sim.set_systems_path('systems')
-        self.sim.load_model(self.aircraft)
-        self.sim.set_dt(self.dt)
+        if use_cache:
+            self.sim = acquire_executive(self.aircraft)
+        else:
+            self.sim = jsbsim.FGFDMExec(None)
+            self.sim.set_aircraft_path('aircraft')
+            self.sim.set_engine_path('engine')
+            self.sim.set_systems_path('systems')
+            self.sim.load_model(self.aircraft)
+        self.sim.set_dt(self.dt / self.physics_substeps)
+
+        # Resolve the per-step properties once
+        self._obs_props = PropertyBinding(self.sim, OBS_PROPERTIES)
+        self._action_props = PropertyBinding(self.sim, ACTION_PROPERTIES)
+        self._ic_props = PropertyBinding(self.sim, IC_PROPERTIES)
+
+        # A cached executive keeps the last owner's controls; start neutral
+        self._action_props.write((0.0, 0.0))
+
+        # Initialize once from the nominal condition and keep its initial
+        # condition vector; resets overlay the sampled values onto it
+        self._ic_props.write(BASE_IC)
+        self.sim.run_ic()
+        self._nominal_ic = self._ic_props.read().astype(np.float64)
+        self._ic = self._nominal_ic.copy()
 
         # Define action and observation spaces
         self.action_space = gym.spaces.Box(low=-1, high=1, shape=(2,), dtype=np.float32)  # elevator, throttle
@@ -24,66 +194,146 @@ class CustomStallRecoveryEnv(gym.Env):
         )  # alpha, vc, q, theta, h, throttle, roll
 
         # Task parameters
-        self.critical_alpha = 15  # Critical angle of attack (degrees)
-        self.safe_alpha = 10      # Safe angle of attack for recovery (degrees)
+        # Critical and safe angle of attack for recovery (degrees)
+        self.critical_alpha, self.safe_alpha = AIRCRAFT_ALPHA_LIMITS.get(aircraft, DEFAULT_ALPHA_LIMITS)
         self.recovery_counter = 0
-        self.required_recovery_steps = 10  # Steps needed to consider recovered
+        self.reward_spec = as_reward_spec(reward_spec)
 
         # Track previous altitude for reward calculation
         self.prev_alt = None
 
+    @profiling.timed('env.reset')
     def reset(self, seed=None, options=None):
+        """
+        Start an episode from a random near-stall initial condition.
+
+        Args:
+            seed (int, optional): Reseeds the environment's RNG; later
+                resets without a seed continue its stream.
+            options (dict, optional): ``{'ic': {...}}`` fixes any of the
+                ``IC_NAMES`` initial conditions instead of sampling or
+                defaulting them. ``{'ic_region': r}`` records the episode's
+                outcome under IC sampler region ``r`` instead of the region
+                of the applied alpha and vc, for callers that sample in
+                other units.
+
+        Returns:
+            tuple: (observation, info) with the applied initial condition
+                under ``info['ic']``.
+        """
         super().reset(seed=seed)
+        fixed = (options or {}).get('ic', {})
+        unknown = set(fixed) - set(IC_NAMES)
+        if unknown:
+            raise ValueError(f"Unknown initial conditions: {sorted(unknown)}")
+        obs = self._start_episode(fixed, (options or {}).get('ic_region'))
+        return obs, {'ic': dict(zip(IC_NAMES, self._ic.tolist()))}
+
+    def _start_episode(self, fixed=(), region=None):
+        """
+        Apply a sampled initial condition and return the first observation.
+
+        The rest of ``reset`` without seeding, validation or the info dict,
+        so batched environments can restart finished episodes cheaply.
+        """
+        # An episode cut off before terminating counts as not recovered
+        self._end_episode(False, self._episode_steps)
 
         # Set initial conditions near stall
-        self.sim.set_property_value('ic/alpha-deg', np.random.uniform(12, 18))
-        self.sim.set_property_value('ic/vc-kts', np.random.uniform(40, 60))
-        self.sim.set_property_value('ic/theta-deg', np.random.uniform(10, 20))
-        self.sim.set_property_value('ic/h-sl-ft', 3280)  # ~1000m
-        self.sim.set_property_value('ic/phi-deg', 0)
-        self.sim.set_property_value('ic/psi-deg', 0)
+        ic = self._ic
+        ic[:] = self._nominal_ic if self.reset_mode == 'bound' else BASE_IC
+        if self.ic_sampler is not None:
+            # A fully fixed draw would only advance the RNG
+            if not all(name in fixed for name in ('alpha', 'vc', 'theta')):
+                ic[IC_ALPHA], ic[IC_VC], ic[IC_THETA] = self.ic_sampler.sample(self.np_random)
+        else:
+            ic[IC_ALPHA] = self.np_random.uniform(12, 18)
+            ic[IC_VC] = self.np_random.uniform(40, 60)
+            ic[IC_THETA] = self.np_random.uniform(10, 20)
+        for index, name in ((IC_ALPHA, 'alpha'), (IC_VC, 'vc'), (IC_THETA, 'theta')):
+            if name in fixed:
+                ic[index] = fixed[name]
+        for index, name in ((IC_ALT, 'altitude'), (IC_PHI, 'roll'), (IC_PSI, 'heading')):
+            if name in fixed:
+                ic[index] = fixed[name]
+        if self.reset_mode == 'bound':
+            self._ic_props.write(ic)
+        else:
+            for name, value in zip(IC_PROPERTIES, ic):
+                self.sim.set_property_value(name, value)
         self.sim.run_ic()  # Initialize the simulation
 
-        self.prev_alt = self.sim.get_property_value('position/h-sl-ft')
+        obs = self._get_observation()
+        self.prev_alt = float(obs[OBS_ALT])
         self.recovery_counter = 0
-        return self._get_observation(), {}
+        self._episode_steps = 0
+        if self.ic_sampler is not None:
+            self._ic_region = self.ic_sampler.region_of(ic[IC_ALPHA], ic[IC_VC]) if region is None else region
+        return obs
 
-    def step(self, action):
-        # Apply actions
-        self.sim.set_property_value('fcs/elevator-cmd-norm', action[0])
-        self.sim.set_property_value('fcs/throttle-cmd-norm', action[1])
+    def set_ic_sampler(self, sampler):
+        """Replace the IC sampler; a method so vectorized envs can call it through wrappers."""
+        self.ic_sampler = sampler
 
-        # Run simulation for one time step
-        self.sim.run()
+    def pop_ic_updates(self):
+        """The IC sampler's counts since the last call, or None without a sampler."""
+        return self.ic_sampler.pop_updates() if self.ic_sampler is not None else None
 
-        # Get new observation
-        obs = self._get_observation()
+    def _end_episode(self, recovered, steps):
+        """Report the running episode's outcome to the IC sampler, once."""
+        if self._ic_region is not None and self.ic_sampler is not None:
+            self.ic_sampler.record(self._ic_region, recovered, steps)
+        self._ic_region = None
 
-        # Compute reward
-        alpha = self.sim.get_property_value('aero/alpha-deg')
-        alt = self.sim.get_property_value('position/h-sl-ft')
-        alt_gain = alt - self.prev_alt
-        self.prev_alt = alt
+    @profiling.timed('env.step')
+    def step(self, action):
+        # Apply actions; they are held for every repeated frame
+        self._action_props.write(action)
 
         reward = 0
-        if alpha > self.critical_alpha:
-            reward -= (alpha - self.critical_alpha)  # Penalize high alpha
-        reward += 0.1 * alt_gain  # Reward altitude preservation
-        reward -= 0.01 * np.abs(action[0])  # Penalize large elevator inputs
-
-        # Check termination conditions
         terminated = False
-        if alt <= 0:  # Crash
-            terminated = True
-        elif alpha < self.safe_alpha:
-            self.recovery_counter += 1
-            if self.recovery_counter >= self.required_recovery_steps:
-                terminated = True  # Successfully recovered
-        else:
-            self.recovery_counter = 0
+        for _ in range(self.action_repeat):
+            # Run simulation for one physics frame
+            with profiling.section('jsbsim.run'):
+                for _ in range(self.physics_substeps):
+                    self.sim.run()
+
+            # Get new observation
+            obs = self._get_observation()
 
+            # Accumulate reward and stop at the first terminal frame
+            with profiling.section('env.reward'):
+                frame_reward, terminated = self._compute_reward(obs, action)
+            reward += frame_reward
+            if terminated:
+                break
+
+        self._episode_steps += 1
+        if terminated:
+            # The env only terminates on a crash or a completed recovery
+            self._end_episode(bool(obs[OBS_ALT] > self.reward_spec.crash_altitude), self._episode_steps)
         return obs, reward, terminated, False, {}
 
+    def _compute_reward(self, obs, action):
+        """
+        Compute the reward and termination flag for one physics frame.
+
+        Args:
+            obs (np.ndarray): Observation after the frame.
+            action (np.ndarray): Action applied during the frame.
+
+        Returns:
+            tuple: (reward, terminated)
+        """
+        alt = float(obs[OBS_ALT])
+        reward, terminated, counter = self.reward_spec.step(
+            float(obs[OBS_ALPHA]), alt, self.prev_alt, action, self.recovery_counter,
+            self.critical_alpha, self.safe_alpha)
+        self.prev_alt = alt
+        self.recovery_counter = int(counter)
+        return float(reward), bool(terminated)
+
+    @profiling.timed('env.get_observation')
     def _get_observation(self):
         """
         Extract observation from the simulation state.
@@ -91,63 +341,72 @@ class CustomStallRecoveryEnv(gym.Env):
         Returns:
             np.ndarray: Observation array [alpha, vc, q, theta, h, throttle, roll].
         """
-        alpha = self.sim.get_property_value('aero/alpha-deg')
-        vc = self.sim.get_property_value('velocities/vc-kts')
-        q = self.sim.get_property_value('velocities/q-rad_sec')
-        theta = self.sim.get_property_value('attitude/theta-deg')
-        h = self.sim.get_property_value('position/h-sl-ft')
-        throttle = self.sim.get_property_value('fcs/throttle-cmd-norm') * 100  # Convert to percentage
-        roll = self.sim.get_property_value('attitude/phi-deg')
-
-        return np.array([alpha, vc, q, theta, h, throttle, roll])
+        obs = self._obs_props.read().copy()
+        obs[OBS_THROTTLE] *= 100  # Convert to percentage
+        return obs
 
     def close(self):
         """Clean up the simulation instance."""
+        if self.sim is not None and self.use_cache:
+            release_executive(self.aircraft, self.sim)
         self.sim = None
 
 def main():
     """Train and evaluate the stall recovery agent."""
-    # Create environment
-    env = CustomStallRecoveryEnv(aircraft='B747')
+    # Imported here so that importing the env does not load torch
+    from stable_baselines3 import PPO
+
+    from ic_sampler import AdaptiveICSampler
+    from normalization import save_model
+
+    # Create environment; training focuses on the initial conditions the
+    # agent has not learned to recover from yet
+    ic_sampler = AdaptiveICSampler(curriculum=True)
+    env = CustomStallRecoveryEnv(aircraft='B747', ic_sampler=ic_sampler)
     
     # Initialize PPO agent
     model = PPO('MlpPolicy', env, verbose=1, tensorboard_log="./ppo_stall_recovery_tensorboard/")
     
     # Train the agent
     print("Training the stall recovery agent...")
-    model.learn(total_timesteps=50000)
+    callback = profiling.make_tensorboard_callback() if profiling.is_enabled() else None
+    model.learn(total_timesteps=50000, callback=callback)
     
     # Save the trained model
-    model.save('stall_recovery_agent')
+    save_model(model, 'stall_recovery_agent')
     print("Model saved as 'stall_recovery_agent.zip'")
+    success = ic_sampler.overall_success_rate()
+    if success is not None:
+        print(f"Training recovery rate {success:.1%} at curriculum level {ic_sampler.level:.2f}")
     
-    # Evaluate the agent
+    # Evaluate the agent on uniformly sampled initial conditions
     print("Evaluating the trained agent...")
+    env.ic_sampler = None
     model = PPO.load('stall_recovery_agent')
     obs, _ = env.reset()
     terminated = False
     episode_reward = 0
-    states_log = []  # For analysis
+    recorder = FlightRecorder()  # For analysis
     
     while not terminated:
-        action, _ = model.predict(obs, deterministic=True)
+        with profiling.section('model.predict'):
+            action, _ = model.predict(obs, deterministic=True)
         obs, reward, terminated, _, info = env.step(action)
         episode_reward += reward
-        states_log.append({
-            'alpha_deg': obs[0],
-            'altitude_ft': obs[4],
-            'action': action
-        })
+        status = STATUS_STALL if obs[OBS_ALPHA] > env.critical_alpha else STATUS_NORMAL
+        recorder.record(obs, action, reward, status, time=len(recorder) * env.dt * env.action_repeat)
     
     print(f"Episode reward: {episode_reward}")
     
     # Analyze stall events
-    critical_alpha = 15
-    stall_events = [s for s in states_log if s['alpha_deg'] > critical_alpha]
-    print(f"Number of stall events during evaluation: {len(stall_events)}")
-    if stall_events:
-        avg_alt_loss = np.mean([s['altitude_ft'] - states_log[0]['altitude_ft'] for s in stall_events])
-        print(f"Average altitude loss during stalls: {avg_alt_loss:.2f} ft")
+    events = find_stall_events(recorder.data, env.critical_alpha, env.safe_alpha)
+    summary = summarize_events(events)
+    print(f"Number of stall events during evaluation: {summary['events']}")
+    if len(events):
+        print(f"Average altitude loss during stalls: {summary['altitude_loss_mean']:.2f} ft")
+        print(f"Peak angle of attack: {summary['peak_alpha_max']:.2f} deg")
+        if summary['recovery_time_mean'] is not None:
+            print(f"Average recovery time: {summary['recovery_time_mean']:.2f} s")
     
     env.close()
 
@@ -0,0 +1,173 @@
+import gymnasium as gym
+import numpy as np
+
+from AircraftSHAgent import AIRCRAFT_ALPHA_LIMITS, DEFAULT_ALPHA_LIMITS, OBS_ALPHA, CustomStallRecoveryEnv
+
+
+class MultiAircraftStallRecoveryEnv(gym.Env):
+    """
+    Stall recovery over several airframes, one sampled per episode.
+
+    One ``CustomStallRecoveryEnv`` is kept per aircraft, so every JSBSim
+    executive is loaded once when the pool is built and switching airframes
+    at reset costs nothing. The angle of attack is observed in reference
+    degrees: each aircraft's safe and critical alpha are mapped linearly
+    onto ``DEFAULT_ALPHA_LIMITS``, so one policy sees the same stall
+    boundary on every type. Rewards and termination still use each
+    aircraft's own limits.
+    """
+
+    def __init__(self, aircraft=('B747', 'A320', '737'), weights=None, **env_kwargs):
+        """
+        Args:
+            aircraft (sequence[str]): JSBSim aircraft models in the pool.
+            weights (sequence[float], optional): Sampling probability of each
+                aircraft; uniform when omitted.
+            **env_kwargs: Keyword arguments for every ``CustomStallRecoveryEnv``.
+        """
+        super().__init__()
+        self.aircraft = tuple(aircraft)
+        if not self.aircraft:
+            raise ValueError("aircraft must name at least one model")
+        if weights is not None:
+            weights = np.asarray(weights, dtype=np.float64)
+            if len(weights) != len(self.aircraft) or (weights < 0).any() or weights.sum() <= 0:
+                raise ValueError("weights must be non-negative, one per aircraft")
+            weights = weights / weights.sum()
+        self.weights = weights
+        self.envs = {name: CustomStallRecoveryEnv(aircraft=name, **env_kwargs) for name in self.aircraft}
+
+        reference = self.envs[self.aircraft[0]]
+        self.dt = reference.dt
+        self.action_repeat = reference.action_repeat
+        self.action_space = reference.action_space
+        self.observation_space = reference.observation_space
+        self.reward_spec = reference.reward_spec
+        # Stall boundary of the normalized alpha observation
+        self.critical_alpha, self.safe_alpha = DEFAULT_ALPHA_LIMITS
+
+        # Per-aircraft (scale, offset) taking alpha to reference degrees
+        self._alpha_maps = {}
+        for name, env in self.envs.items():
+            scale = (self.critical_alpha - self.safe_alpha) / (env.critical_alpha - env.safe_alpha)
+            self._alpha_maps[name] = (scale, self.safe_alpha - env.safe_alpha * scale)
+        self.current = self.aircraft[0]
+
+    @property
+    def env(self):
+        """The environment of the current episode's aircraft."""
+        return self.envs[self.current]
+
+    @property
+    def ic_sampler(self):
+        """The initial condition sampler shared by every aircraft, if any."""
+        return self.env.ic_sampler
+
+    @ic_sampler.setter
+    def ic_sampler(self, sampler):
+        for env in self.envs.values():
+            env.ic_sampler = sampler
+
+    def set_ic_sampler(self, sampler):
+        self.ic_sampler = sampler
+
+    def pop_ic_updates(self):
+        # The aircraft share one sampler
+        return self.env.pop_ic_updates()
+
+    def reset(self, seed=None, options=None):
+        """
+        Pick an aircraft and start an episode on it.
+
+        Args:
+            seed (int, optional): Seed for the episode.
+            options (dict, optional): ``{'aircraft': name}`` selects the
+                airframe instead of sampling it; ``{'ic': {...}}`` is passed
+                on, with ``alpha`` given in reference degrees. With an IC
+                sampler, the pool draws the initial condition itself and
+                the inner env only applies it.
+
+        Returns:
+            tuple: (observation, info) with the airframe under
+                ``info['aircraft']``.
+        """
+        super().reset(seed=seed)
+        options = dict(options or {})
+        name = options.pop('aircraft', None)
+        if name is None:
+            name = self.aircraft[self.np_random.choice(len(self.aircraft), p=self.weights)]
+        elif name not in self.envs:
+            raise ValueError(f"Aircraft {name!r} is not in the pool {self.aircraft}")
+        self.current = name
+
+        # Sample the near-stall alpha in reference degrees so every type
+        # starts equally deep into its own stall
+        ic = dict(options.get('ic', {}))
+        sampler = self.ic_sampler
+        if sampler is not None:
+            sampled = dict(zip(('alpha', 'vc', 'theta'), sampler.sample(self.np_random)))
+            ic = {**sampled, **ic}
+        alpha = ic['alpha'] if 'alpha' in ic else self.np_random.uniform(12, 18)
+        scale, offset = self._alpha_maps[name]
+        ic['alpha'] = (alpha - offset) / scale
+        options['ic'] = ic
+        if sampler is not None:
+            # Bin the outcome by the reference alpha the sampler drew from
+            options['ic_region'] = sampler.region_of(alpha, ic['vc'])
+
+        obs, info = self.env.reset(seed=seed, options=options)
+        info['aircraft'] = name
+        return self._normalize(obs), info
+
+    def step(self, action):
+        obs, reward, terminated, truncated, info = self.env.step(action)
+        info['aircraft'] = self.current
+        return self._normalize(obs), reward, terminated, truncated, info
+
+    def _normalize(self, obs):
+        scale, offset = self._alpha_maps[self.current]
+        obs[OBS_ALPHA] = obs[OBS_ALPHA] * scale + offset
+        return obs
+
+    def close(self):
+        for env in self.envs.values():
+            env.close()
+
+
+def observed_alpha_limits(aircraft='B747'):
+    """
+    (critical, safe) alpha as seen in the observations of ``make_stall_env``.
+
+    A multi-aircraft pool observes alpha in reference degrees, so its
+    limits are ``DEFAULT_ALPHA_LIMITS`` whatever the airframes.
+    """
+    if not isinstance(aircraft, str):
+        if len(aircraft) != 1:
+            return DEFAULT_ALPHA_LIMITS
+        aircraft = aircraft[0]
+    return AIRCRAFT_ALPHA_LIMITS.get(aircraft, DEFAULT_ALPHA_LIMITS)
+
+
+def make_stall_env(**env_kwargs):
+    """
+    Build the environment described by ``env_kwargs``.
+
+    Returns:
+        gym.Env: A ``MultiAircraftStallRecoveryEnv`` when ``aircraft`` is a
+            sequence of models, otherwise a ``CustomStallRecoveryEnv``.
+            With ``stream`` set to a telemetry address, every step is also
+            published there.
+    """
+    stream = env_kwargs.pop('stream', None)
+    aircraft = env_kwargs.get('aircraft', 'B747')
+    if isinstance(aircraft, str):
+        env = CustomStallRecoveryEnv(**env_kwargs)
+    elif len(aircraft) == 1:
+        env = CustomStallRecoveryEnv(**dict(env_kwargs, aircraft=aircraft[0]))
+    else:
+        env = MultiAircraftStallRecoveryEnv(**env_kwargs)
+    if stream:
+        from telemetry_stream import TelemetryPublisher, TelemetryStreamWrapper
+
+        env = TelemetryStreamWrapper(env, TelemetryPublisher(stream))
+    return env
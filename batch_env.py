@@ -0,0 +1,173 @@
+import numpy as np
+from stable_baselines3.common.vec_env import VecEnv
+
+import profiling
+from AircraftSHAgent import OBS_ALPHA, OBS_ALT, OBS_THROTTLE, CustomStallRecoveryEnv
+
+
+class BatchStallRecoveryEnv(VecEnv):
+    """
+    Several JSBSim stall recovery episodes stepped in lockstep in one process.
+
+    Holds one ``CustomStallRecoveryEnv`` per slot and drives their FGFDMExec
+    instances directly: actions are written through the bound property
+    nodes, every observation lands in one preallocated (M, 7) float32 array
+    and reward and termination are computed for all slots at once. Finished
+    episodes restart automatically from a new sampled initial condition, as
+    in any Stable-Baselines3 VecEnv.
+
+    Avoids the pickling and IPC of ``SubprocVecEnv``, which dominates for
+    short episodes and on machines with few cores.
+    """
+
+    def __init__(self, num_envs=8, seeds=None, max_episode_steps=None, **env_kwargs):
+        """
+        Args:
+            num_envs (int): Number of lockstep episodes.
+            seeds (list[int], optional): Seed of each slot's first reset.
+            max_episode_steps (int, optional): Agent steps before an episode
+                is truncated. None never truncates, like the single
+                ``CustomStallRecoveryEnv``.
+            **env_kwargs: Keyword arguments for every ``CustomStallRecoveryEnv``;
+                ``aircraft`` must name a single model and ``stream`` is not
+                supported, since the slots are stepped without ``env.step``.
+        """
+        if env_kwargs.get('stream'):
+            raise ValueError("BatchStallRecoveryEnv cannot publish a telemetry stream; "
+                             "use the 'dummy' or 'subproc' vec env with stream")
+        env_kwargs.pop('stream', None)
+        aircraft = env_kwargs.get('aircraft', 'B747')
+        if not isinstance(aircraft, str):
+            if len(aircraft) != 1:
+                raise ValueError("BatchStallRecoveryEnv steps a single aircraft model; "
+                                 "use the 'dummy' or 'subproc' vec env for a multi-aircraft pool")
+            env_kwargs['aircraft'] = aircraft[0]
+        self.envs = [CustomStallRecoveryEnv(**env_kwargs) for _ in range(num_envs)]
+        reference = self.envs[0]
+        super().__init__(num_envs, reference.observation_space, reference.action_space)
+        self.dt = reference.dt
+        self.action_repeat = reference.action_repeat
+        self.physics_substeps = reference.physics_substeps
+        self.critical_alpha = reference.critical_alpha
+        self.safe_alpha = reference.safe_alpha
+        self.reward_spec = reference.reward_spec
+        self.max_episode_steps = max_episode_steps
+
+        # Bound methods resolved once; the step loop only indexes lists
+        self._write_actions = [env._action_props.write for env in self.envs]
+        self._read_obs = [env._obs_props.read for env in self.envs]
+        self._run = [env.sim.run for env in self.envs]
+
+        self.obs = np.zeros((num_envs, reference.observation_space.shape[0]), dtype=np.float32)
+        self.prev_alt = np.zeros(num_envs, dtype=np.float32)
+        self.recovery_counter = np.zeros(num_envs, dtype=np.int32)
+        self.episode_steps = np.zeros(num_envs, dtype=np.int32)
+        self._first_seeds = list(seeds) if seeds is not None else [None] * num_envs
+        if len(self._first_seeds) != num_envs:
+            raise ValueError(f"Expected {num_envs} seeds, got {len(self._first_seeds)}")
+        self._actions = None
+
+    def _restart(self, i):
+        self.obs[i] = self.envs[i]._start_episode()
+        self.prev_alt[i] = self.obs[i, OBS_ALT]
+        self.recovery_counter[i] = 0
+        self.episode_steps[i] = 0
+
+    def reset(self):
+        for i, env in enumerate(self.envs):
+            self.obs[i], _ = env.reset(seed=self._first_seeds[i])
+        self._first_seeds = [None] * self.num_envs  # Later resets continue each env's RNG
+        self.prev_alt[:] = self.obs[:, OBS_ALT]
+        self.recovery_counter[:] = 0
+        self.episode_steps[:] = 0
+        return self.obs.copy()
+
+    def step_async(self, actions):
+        self._actions = np.asarray(actions, dtype=np.float32)
+
+    def step_wait(self):
+        actions = self._actions
+        for write, action in zip(self._write_actions, actions):
+            write(action)
+
+        reward = np.zeros(self.num_envs)
+        terminated = np.zeros(self.num_envs, dtype=bool)
+        active = np.arange(self.num_envs)
+        for _ in range(self.action_repeat):
+            # Run every unfinished episode for one physics frame
+            with profiling.section('jsbsim.run'):
+                for i in active:
+                    run = self._run[i]
+                    for _ in range(self.physics_substeps):
+                        run()
+            for i in active:
+                self.obs[i] = self._read_obs[i]()
+            self.obs[active, OBS_THROTTLE] *= 100  # Convert to percentage
+
+            with profiling.section('env.reward'):
+                frame_reward, frame_terminated = self._compute_reward(active, actions[active])
+            reward[active] += frame_reward
+            terminated[active] = frame_terminated
+            active = active[~frame_terminated]
+            if not len(active):
+                break
+
+        self.episode_steps += 1
+        if self.max_episode_steps is None:
+            truncated = np.zeros(self.num_envs, dtype=bool)
+        else:
+            truncated = ~terminated & (self.episode_steps >= self.max_episode_steps)
+        dones = terminated | truncated
+
+        infos = [{} for _ in range(self.num_envs)]
+        for i in np.flatnonzero(dones):
+            infos[i] = {'terminal_observation': self.obs[i].copy(), 'TimeLimit.truncated': bool(truncated[i])}
+            recovered = terminated[i] and self.obs[i, OBS_ALT] > self.reward_spec.crash_altitude
+            self.envs[i]._end_episode(bool(recovered), int(self.episode_steps[i]))
+            self._restart(i)
+        return self.obs.copy(), reward.astype(np.float32), dones, infos
+
+    def _compute_reward(self, idx, actions):
+        """
+        Reward and termination of one physics frame for the slots ``idx``,
+        with the same ``RewardSpec`` as the single envs.
+
+        Returns:
+            tuple: ``(reward, terminated)`` arrays aligned with ``idx``.
+        """
+        alt = self.obs[idx, OBS_ALT].astype(np.float64)
+        reward, terminated, self.recovery_counter[idx] = self.reward_spec.step(
+            self.obs[idx, OBS_ALPHA].astype(np.float64), alt, self.prev_alt[idx], actions,
+            self.recovery_counter[idx], self.critical_alpha, self.safe_alpha)
+        self.prev_alt[idx] = alt
+        return reward, terminated
+
+    def close(self):
+        for env in self.envs:
+            env.close()
+
+    def seed(self, seed=None):
+        """Seed the next ``reset``; slot ``i`` uses ``seed + i``."""
+        self._first_seeds = [None if seed is None else seed + i for i in range(self.num_envs)]
+        return self._first_seeds
+
+    def get_attr(self, attr_name, indices=None):
+        return [getattr(self.envs[i], attr_name) for i in self._get_indices(indices)]
+
+    def set_attr(self, attr_name, value, indices=None):
+        for i in self._get_indices(indices):
+            setattr(self.envs[i], attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        return [getattr(self.envs[i], method_name)(*method_args, **method_kwargs)
+                for i in self._get_indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False] * len(self._get_indices(indices))
+
+    def _get_indices(self, indices):
+        if indices is None:
+            return range(self.num_envs)
+        if isinstance(indices, int):
+            return [indices]
+        return indices
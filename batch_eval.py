@@ -0,0 +1,249 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import profiling
+from AircraftSHAgent import OBS_ALPHA, OBS_ALT
+from aircraft_pool import make_stall_env, observed_alpha_limits
+from flight_recorder import STATUS_NORMAL, STATUS_STALL, FlightRecorder
+from normalization import load_model
+from stall_analytics import find_stall_events, summarize_events
+
+# One row per evaluated episode.
+EPISODE_DTYPE = np.dtype([
+    ('seed', np.int64),
+    ('recovered', np.bool_),
+    ('crashed', np.bool_),
+    ('steps', np.int32),
+    ('time_to_recovery', np.float64),
+    ('altitude_loss', np.float64),
+    ('steps_above_critical', np.int32),
+    ('reward', np.float64),
+])
+
+# Per-process state set up by _init_worker.
+_MODEL = None
+_ENV_KWARGS = None
+
+
+def _init_worker(model_path, env_kwargs):
+    """Load the policy once per worker process."""
+    global _MODEL, _ENV_KWARGS
+    _MODEL = load_model(model_path)
+    _ENV_KWARGS = env_kwargs
+
+
+def run_episodes(model, seeds, n_envs=8, max_steps=600, env_kwargs=None, ics=None, recorder=None):
+    """
+    Roll out one seeded episode per seed, ``n_envs`` at a time in lockstep.
+
+    All active episodes share a single batched ``model.predict`` call per
+    step. A finished slot is reset with the next pending seed.
+
+    Args:
+        model: Policy with a Stable-Baselines3 style ``predict`` method.
+        seeds (list[int]): One seed per episode.
+        n_envs (int): Number of environments stepped together.
+        max_steps (int): Agent steps before an episode is cut off.
+        env_kwargs (dict, optional): Keyword arguments for
+            ``CustomStallRecoveryEnv``.
+        ics (list[dict], optional): Initial conditions for each episode,
+            passed to ``reset`` as ``options={'ic': ...}``.
+        recorder (FlightRecorder, optional): Receives every step, with the
+            seed as the episode number. Each episode's rows are appended
+            together when it finishes, so episodes are contiguous.
+
+    Returns:
+        np.ndarray: Structured array with ``EPISODE_DTYPE`` rows, in seed order.
+    """
+    seeds = list(seeds)
+    results = np.zeros(len(seeds), dtype=EPISODE_DTYPE)
+    n_envs = max(1, min(n_envs, len(seeds)))
+    envs = [make_stall_env(**(env_kwargs or {})) for _ in range(n_envs)]
+    decision_dt = envs[0].dt * envs[0].action_repeat
+    critical_alpha = envs[0].critical_alpha
+    crash_altitude = envs[0].reward_spec.crash_altitude
+
+    obs = np.zeros((n_envs, envs[0].observation_space.shape[0]), dtype=np.float32)
+    episode = np.full(n_envs, -1)  # Index into seeds, -1 when idle
+    start_alt = np.zeros(n_envs)
+    min_alt = np.zeros(n_envs)
+    next_episode = 0
+    # Per-slot buffers keep lockstep episodes from interleaving in the recorder
+    slot_recorders = [FlightRecorder(capacity=max_steps) for _ in range(n_envs)] if recorder is not None else None
+
+    def start(slot):
+        nonlocal next_episode
+        if next_episode >= len(seeds):
+            episode[slot] = -1
+            return
+        seed = int(seeds[next_episode])  # Gymnasium rejects NumPy integer seeds
+        options = {'ic': ics[next_episode]} if ics is not None else None
+        obs[slot], _ = envs[slot].reset(seed=seed, options=options)
+        episode[slot] = next_episode
+        results[next_episode]['seed'] = seed
+        start_alt[slot] = min_alt[slot] = obs[slot, OBS_ALT]
+        next_episode += 1
+
+    for slot in range(n_envs):
+        start(slot)
+
+    try:
+        while (episode >= 0).any():
+            active = np.flatnonzero(episode >= 0)
+            with profiling.section('model.predict'):
+                actions, _ = model.predict(obs[active], deterministic=True)
+            for slot, action in zip(active, actions):
+                row = results[episode[slot]]
+                obs[slot], reward, terminated, truncated, _ = envs[slot].step(action)
+                row['steps'] += 1
+                row['reward'] += reward
+                if obs[slot, OBS_ALPHA] > critical_alpha:
+                    row['steps_above_critical'] += 1
+                min_alt[slot] = min(min_alt[slot], obs[slot, OBS_ALT])
+                if slot_recorders is not None:
+                    slot_recorders[slot].record(
+                        obs[slot], action, reward,
+                        STATUS_STALL if obs[slot, OBS_ALPHA] > critical_alpha else STATUS_NORMAL,
+                        episode=row['seed'], step=row['steps'] - 1, time=row['steps'] * decision_dt)
+
+                if terminated or truncated or row['steps'] >= max_steps:
+                    row['crashed'] = obs[slot, OBS_ALT] <= crash_altitude
+                    # The env only terminates on a crash or a completed recovery
+                    row['recovered'] = terminated and not row['crashed']
+                    row['time_to_recovery'] = row['steps'] * decision_dt if row['recovered'] else np.nan
+                    row['altitude_loss'] = start_alt[slot] - min_alt[slot]
+                    if slot_recorders is not None:
+                        recorder.record_batch(slot_recorders[slot].data)
+                        slot_recorders[slot].clear()
+                    start(slot)
+    finally:
+        for env in envs:
+            env.close()
+    return results
+
+
+def _run_chunk(seeds, n_envs, max_steps, stall_events=False):
+    """
+    Evaluate a chunk of seeds with the worker's preloaded policy.
+
+    Returns:
+        tuple: ``(results, events)``; ``events`` holds the chunk's stall
+            events when ``stall_events`` is set, otherwise None.
+    """
+    if not stall_events:
+        return run_episodes(_MODEL, seeds, n_envs=n_envs, max_steps=max_steps, env_kwargs=_ENV_KWARGS), None
+    recorder = FlightRecorder()
+    results = run_episodes(_MODEL, seeds, n_envs=n_envs, max_steps=max_steps, env_kwargs=_ENV_KWARGS,
+                           recorder=recorder)
+    limits = observed_alpha_limits((_ENV_KWARGS or {}).get('aircraft', 'B747'))
+    return results, find_stall_events(recorder.data, *limits)
+
+
+def summarize(results):
+    """
+    Aggregate per-episode results into evaluation metrics.
+
+    Args:
+        results (np.ndarray): Structured array with ``EPISODE_DTYPE`` rows.
+
+    Returns:
+        dict: Recovery rate, time-to-recovery, altitude loss and stall statistics.
+    """
+    recovered = results['recovered']
+    ttr = results['time_to_recovery'][recovered]
+    summary = {
+        'episodes': int(len(results)),
+        'recovery_rate': float(recovered.mean()) if len(results) else 0.0,
+        'crash_rate': float(results['crashed'].mean()) if len(results) else 0.0,
+        'mean_reward': float(results['reward'].mean()) if len(results) else 0.0,
+        'time_to_recovery_mean': float(ttr.mean()) if len(ttr) else None,
+        'time_to_recovery_p50': float(np.percentile(ttr, 50)) if len(ttr) else None,
+        'time_to_recovery_p95': float(np.percentile(ttr, 95)) if len(ttr) else None,
+        'altitude_loss_mean': float(results['altitude_loss'].mean()) if len(results) else 0.0,
+        'altitude_loss_max': float(results['altitude_loss'].max()) if len(results) else 0.0,
+        'steps_above_critical_mean': float(results['steps_above_critical'].mean()) if len(results) else 0.0,
+    }
+    return summary
+
+
+def evaluate_parallel(model_path='stall_recovery_agent', n_episodes=1000, seed=0, n_workers=None,
+                      n_envs=8, max_steps=600, env_kwargs=None, chunk_size=None, stall_events=False):
+    """
+    Evaluate a saved policy on seeded episodes across a process pool.
+
+    Args:
+        model_path (str): Path to the saved PPO model.
+        n_episodes (int): Number of episodes; episode ``i`` uses ``seed + i``.
+        seed (int): Base episode seed.
+        n_workers (int, optional): Worker processes. Defaults to the CPU count.
+        n_envs (int): Environments stepped in lockstep inside each worker.
+        max_steps (int): Agent steps before an episode is cut off.
+        env_kwargs (dict, optional): Keyword arguments for
+            ``CustomStallRecoveryEnv``.
+        chunk_size (int, optional): Episodes per task. Defaults to spreading
+            the episodes evenly with a few tasks per worker.
+        stall_events (bool): Record telemetry in the workers and add stall
+            event statistics under ``summary['stall_events']``.
+
+    Returns:
+        tuple: ``(results, summary)`` with the per-episode structured array
+            and the aggregate metrics.
+    """
+    n_workers = n_workers or os.cpu_count() or 1
+    seeds = list(range(seed, seed + n_episodes))
+    if chunk_size is None:
+        chunk_size = max(n_envs, -(-n_episodes // (n_workers * 4)))
+    chunks = [seeds[i:i + chunk_size] for i in range(0, n_episodes, chunk_size)]
+
+    start_time = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                             initargs=(model_path, env_kwargs)) as pool:
+        parts = list(pool.map(_run_chunk, chunks, [n_envs] * len(chunks), [max_steps] * len(chunks),
+                              [stall_events] * len(chunks)))
+    elapsed = time.perf_counter() - start_time
+
+    results = np.concatenate([r for r, _ in parts]) if parts else np.zeros(0, dtype=EPISODE_DTYPE)
+    summary = summarize(results)
+    if stall_events and parts:
+        summary['stall_events'] = summarize_events(np.concatenate([e for _, e in parts]))
+    summary['elapsed_sec'] = elapsed
+    summary['episodes_per_sec'] = n_episodes / elapsed if elapsed > 0 else 0.0
+    summary['agent_steps_per_sec'] = float(results['steps'].sum()) / elapsed if elapsed > 0 else 0.0
+    return results, summary
+
+
+def main():
+    """Evaluate a trained stall recovery agent on many seeded episodes."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--model', default='stall_recovery_agent')
+    parser.add_argument('--episodes', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--envs-per-worker', type=int, default=8)
+    parser.add_argument('--max-steps', type=int, default=600,
+                        help="agent steps before an episode counts as unrecovered")
+    parser.add_argument('--stall-events', action='store_true',
+                        help="also segment the recorded telemetry into stall events")
+    parser.add_argument('--stream', default=None, metavar='ADDRESS',
+                        help="publish every step to a telemetry viewer, e.g. udp://127.0.0.1:5600")
+    parser.add_argument('--output', default=None, help="write the summary to this JSON file")
+    args = parser.parse_args()
+
+    _, summary = evaluate_parallel(
+        args.model, n_episodes=args.episodes, seed=args.seed, n_workers=args.workers,
+        n_envs=args.envs_per_worker, max_steps=args.max_steps, stall_events=args.stall_events,
+        env_kwargs={'stream': args.stream} if args.stream else None,
+    )
+    print(json.dumps(summary, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
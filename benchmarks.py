@@ -0,0 +1,413 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from AircraftSHAgent import (
+    ACTION_PROPERTIES,
+    OBS_PROPERTIES,
+    CustomStallRecoveryEnv,
+    clear_executive_cache,
+)
+
+
+def _time_per_call(fn, n_calls):
+    """Return the mean wall-clock time of ``fn()`` in microseconds."""
+    start = time.perf_counter()
+    for _ in range(n_calls):
+        fn()
+    return (time.perf_counter() - start) / n_calls * 1e6
+
+
+def _latency_stats(fn, n_calls):
+    """Time ``fn()`` call by call and return mean/p50/p99 in microseconds."""
+    samples = np.empty(n_calls)
+    for i in range(n_calls):
+        start = time.perf_counter()
+        fn()
+        samples[i] = time.perf_counter() - start
+    samples *= 1e6
+    return {
+        'mean_us': float(samples.mean()),
+        'p50_us': float(np.percentile(samples, 50)),
+        'p99_us': float(np.percentile(samples, 99)),
+    }
+
+
+def bench_property_io(n_calls=20000, aircraft='B747'):
+    """
+    Compare the per-step JSBSim property I/O cost before and after binding.
+
+    The string-keyed path replays the 11 lookups the environment used to make
+    every step (2 writes, 7 observation reads and 2 reward re-reads). The
+    bound path is what ``CustomStallRecoveryEnv.step`` does now. The
+    simulation is not advanced, so only the I/O overhead is measured.
+
+    Args:
+        n_calls (int): Number of simulated steps to time.
+        aircraft (str): JSBSim aircraft model name.
+
+    Returns:
+        dict: Microseconds per step for each path and the speedup.
+    """
+    env = CustomStallRecoveryEnv(aircraft=aircraft)
+    env.reset(seed=0)
+    sim = env.sim
+    action = np.array([0.1, 0.5], dtype=np.float32)
+
+    def string_keyed():
+        for name, value in zip(ACTION_PROPERTIES, action):
+            sim.set_property_value(name, value)
+        np.array([sim.get_property_value(name) for name in OBS_PROPERTIES])
+        sim.get_property_value('aero/alpha-deg')
+        sim.get_property_value('position/h-sl-ft')
+
+    def bound():
+        env._action_props.write(action)
+        env._get_observation()
+
+    result = {
+        'string_keyed_us': _time_per_call(string_keyed, n_calls),
+        'bound_us': _time_per_call(bound, n_calls),
+    }
+    result['speedup'] = result['string_keyed_us'] / result['bound_us']
+    env.close()
+    return result
+
+
+def bench_setup(n_envs=20, n_resets=500, aircraft='B747'):
+    """
+    Time environment construction and reset with and without caching.
+
+    Args:
+        n_envs (int): Number of constructions to time for each path.
+        n_resets (int): Number of resets to time for each reset mode.
+        aircraft (str): JSBSim aircraft model name.
+
+    Returns:
+        dict: Milliseconds per construction and microseconds per reset.
+    """
+    def construct_uncached():
+        CustomStallRecoveryEnv(aircraft=aircraft, use_cache=False).close()
+
+    def construct_cached():
+        CustomStallRecoveryEnv(aircraft=aircraft).close()
+
+    clear_executive_cache()
+    result = {'construct_uncached_ms': _time_per_call(construct_uncached, n_envs) / 1000}
+    construct_cached()  # Warm the cache
+    result['construct_cached_ms'] = _time_per_call(construct_cached, n_envs) / 1000
+
+    for mode in ('full', 'bound'):
+        env = CustomStallRecoveryEnv(aircraft=aircraft, reset_mode=mode)
+        env.reset(seed=0)
+        result[f'reset_{mode}_us'] = _time_per_call(env.reset, n_resets)
+        env.close()
+    clear_executive_cache()
+    return result
+
+
+def bench_env_step(n_steps=20000, seed=0, **env_kwargs):
+    """
+    Measure raw environment throughput under random actions.
+
+    Episode resets are included, as they are during training.
+
+    Returns:
+        dict: Steps per second and the number of episodes run.
+    """
+    env = CustomStallRecoveryEnv(**env_kwargs)
+    env.reset(seed=seed)
+    rng = np.random.default_rng(seed)
+    actions = rng.uniform(-1, 1, size=(n_steps, 2)).astype(np.float32)
+    episodes = 1
+
+    start = time.perf_counter()
+    for action in actions:
+        _, _, terminated, truncated, _ = env.step(action)
+        if terminated or truncated:
+            env.reset()
+            episodes += 1
+    elapsed = time.perf_counter() - start
+    env.close()
+    return {'steps_per_sec': n_steps / elapsed, 'episodes': episodes}
+
+
+def bench_batch_env(n_envs=8, n_steps=4000, seed=0, **env_kwargs):
+    """
+    Compare ``BatchStallRecoveryEnv`` with stepping single envs one by one.
+
+    Both run ``n_envs`` episodes under an untrained ``MlpPolicy``: the
+    sequential loop calls ``predict`` once per env and step, the batch env
+    once per lockstep step for all of them.
+
+    Returns:
+        dict: Agent steps per second of both and the speedup.
+    """
+    from stable_baselines3 import PPO
+
+    from batch_env import BatchStallRecoveryEnv
+
+    batch_env = BatchStallRecoveryEnv(n_envs, seeds=[seed + i for i in range(n_envs)], **env_kwargs)
+    model = PPO('MlpPolicy', batch_env, device='cpu', seed=seed)
+    n_steps -= n_steps % n_envs
+
+    envs = [CustomStallRecoveryEnv(**env_kwargs) for _ in range(n_envs)]
+    start = time.perf_counter()
+    for i, env in enumerate(envs):
+        obs, _ = env.reset(seed=seed + i)
+        for _ in range(n_steps // n_envs):
+            action, _ = model.predict(obs, deterministic=True)
+            obs, _, terminated, truncated, _ = env.step(action)
+            if terminated or truncated:
+                obs, _ = env.reset()
+    sequential = time.perf_counter() - start
+    for env in envs:
+        env.close()
+
+    start = time.perf_counter()
+    obs = batch_env.reset()
+    for _ in range(n_steps // n_envs):
+        actions, _ = model.predict(obs, deterministic=True)
+        obs, _, _, _ = batch_env.step(actions)
+    batched = time.perf_counter() - start
+    batch_env.close()
+    return {
+        'sequential_steps_per_sec': n_steps / sequential,
+        'batch_steps_per_sec': n_steps / batched,
+        'speedup': sequential / batched,
+    }
+
+
+def bench_reset(n_resets=500, **env_kwargs):
+    """Return the reset latency distribution."""
+    env = CustomStallRecoveryEnv(**env_kwargs)
+    env.reset(seed=0)
+    result = _latency_stats(env.reset, n_resets)
+    env.close()
+    return result
+
+
+def bench_observation(n_calls=20000, **env_kwargs):
+    """Return the ``_get_observation`` latency distribution."""
+    env = CustomStallRecoveryEnv(**env_kwargs)
+    env.reset(seed=0)
+    result = _latency_stats(env._get_observation, n_calls)
+    env.close()
+    return result
+
+
+def bench_inference(model_path=None, batch_sizes=(1, 8, 64, 256), n_calls=2000, **env_kwargs):
+    """
+    Measure PPO ``model.predict`` latency for single and batched observations.
+
+    Args:
+        model_path (str, optional): Saved model to load; an untrained
+            ``MlpPolicy`` of the same shape is used when omitted.
+        batch_sizes (tuple[int]): Batch sizes to time.
+        n_calls (int): Calls per batch size.
+
+    Returns:
+        dict: Per batch size, latency per call and per observation.
+    """
+    from stable_baselines3 import PPO
+
+    env = CustomStallRecoveryEnv(**env_kwargs)
+    obs, _ = env.reset(seed=0)
+    if model_path:
+        model = PPO.load(model_path, device='cpu')
+    else:
+        model = PPO('MlpPolicy', env, device='cpu')
+
+    result = {}
+    for batch_size in batch_sizes:
+        batch = obs if batch_size == 1 else np.repeat(obs[None], batch_size, axis=0)
+        stats = _latency_stats(lambda: model.predict(batch, deterministic=True), n_calls)
+        stats['per_obs_us'] = stats['mean_us'] / batch_size
+        result[str(batch_size)] = stats
+    env.close()
+    return result
+
+
+def bench_training(max_workers=None, timesteps=8192, **env_kwargs):
+    """
+    Measure end-to-end PPO training throughput for 1..``max_workers`` workers.
+
+    Returns:
+        dict: Aggregate steps per second keyed by worker count.
+    """
+    from parallel_training import train_parallel
+
+    max_workers = max_workers or os.cpu_count() or 1
+    result = {}
+    for n_workers in range(1, max_workers + 1):
+        _, stats = train_parallel(n_workers, total_timesteps=timesteps, env_kwargs=env_kwargs,
+                                  tensorboard_log=None, save_path=None, verbose=0)
+        result[str(n_workers)] = stats['steps_per_sec']
+    return result
+
+
+# Startup probes, each timed in a fresh interpreter. The GUI probes run on
+# Qt's offscreen platform; the eager probe repeats what SHAA used to do
+# before its window could appear.
+_GUI_PROLOGUE = """
+from PyQt6.QtWidgets import QApplication
+app = QApplication([])
+"""
+STARTUP_PROBES = {
+    'import_env_module': "import AircraftSHAgent",
+    'window_shown': _GUI_PROLOGUE + """
+import main
+window = main.SHAA()
+window.show()
+app.processEvents()
+""",
+    'simulator_ready': _GUI_PROLOGUE + """
+import main
+window = main.SHAA()
+window.show()
+app.processEvents()
+window.env
+""",
+    'eager_window_shown': _GUI_PROLOGUE + """
+import matplotlib.pyplot
+from stable_baselines3 import PPO
+from AircraftSHAgent import CustomStallRecoveryEnv
+env = CustomStallRecoveryEnv(aircraft='B747')
+PPO('MlpPolicy', env, verbose=1, device='cpu')
+import main
+window = main.SHAA()
+window.show()
+app.processEvents()
+""",
+}
+
+
+def bench_startup(n_runs=5, probes=None):
+    """
+    Measure cold-start times of the GUI and the environment module.
+
+    Every run starts a new Python process, so nothing is imported yet;
+    the median over ``n_runs`` is reported.
+
+    Args:
+        n_runs (int): Processes started per probe.
+        probes (dict, optional): ``{name: code}``; defaults to ``STARTUP_PROBES``.
+
+    Returns:
+        dict: Median seconds per probe (None if it failed) and the speedup
+            of showing the window compared with the eager startup.
+    """
+    repo = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+    result = {}
+    for name, code in (probes or STARTUP_PROBES).items():
+        script = f"import time\n_start = time.perf_counter()\n{code}\nprint(time.perf_counter() - _start)\n"
+        samples = []
+        for _ in range(n_runs):
+            run = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, cwd=repo, env=env)
+            if run.returncode != 0:
+                samples = []
+                break
+            samples.append(float(run.stdout.strip().splitlines()[-1]))
+        result[f'{name}_sec'] = float(np.median(samples)) if samples else None
+    if result.get('window_shown_sec') and result.get('eager_window_shown_sec'):
+        result['window_speedup'] = result['eager_window_shown_sec'] / result['window_shown_sec']
+    return result
+
+
+def _metadata():
+    """Describe the machine and commit the results were taken on."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        'commit': commit or None,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def run_suite(quick=False, max_workers=None, model_path=None, skip_training=False, aircraft='B747'):
+    """
+    Run every benchmark and collect the results.
+
+    Args:
+        quick (bool): Use fewer iterations, for a fast smoke run.
+        max_workers (int, optional): Largest worker count for training.
+        model_path (str, optional): Saved model for the inference benchmark.
+        skip_training (bool): Skip the end-to-end training benchmark.
+        aircraft (str): JSBSim aircraft model name.
+
+    Returns:
+        dict: ``{'metadata': ..., 'results': ...}``, ready for JSON.
+    """
+    scale = 10 if quick else 1
+    results = {
+        'env_step': bench_env_step(n_steps=20000 // scale, aircraft=aircraft),
+        'batch_env': bench_batch_env(n_steps=4000 // scale, aircraft=aircraft),
+        'reset': bench_reset(n_resets=500 // scale, aircraft=aircraft),
+        'observation': bench_observation(n_calls=20000 // scale, aircraft=aircraft),
+        'property_io': bench_property_io(n_calls=20000 // scale, aircraft=aircraft),
+        'setup': bench_setup(n_envs=20 // scale, n_resets=500 // scale, aircraft=aircraft),
+        'inference': bench_inference(model_path=model_path, n_calls=2000 // scale, aircraft=aircraft),
+        'startup': bench_startup(n_runs=1 if quick else 5),
+    }
+    if not skip_training:
+        results['training_steps_per_sec'] = bench_training(
+            max_workers=max_workers, timesteps=8192 // scale, aircraft=aircraft)
+    return {'metadata': _metadata(), 'results': results}
+
+
+def main():
+    """Run the environment and training benchmark suite."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--output', default='benchmark_results.json',
+                        help="JSON file to write the results to")
+    parser.add_argument('--quick', action='store_true', help="fewer iterations for a smoke run")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="largest worker count for the training benchmark (default: CPU count)")
+    parser.add_argument('--model', default=None, help="saved model for the inference benchmark")
+    parser.add_argument('--skip-training', action='store_true')
+    parser.add_argument('--aircraft', default='B747')
+    args = parser.parse_args()
+
+    report = run_suite(quick=args.quick, max_workers=args.workers, model_path=args.model,
+                       skip_training=args.skip_training, aircraft=args.aircraft)
+    results = report['results']
+    print(f"Env step: {results['env_step']['steps_per_sec']:.0f} steps/sec")
+    batch = results['batch_env']
+    print(f"Batch env: {batch['batch_steps_per_sec']:.0f} steps/sec with batched predict vs "
+          f"{batch['sequential_steps_per_sec']:.0f} sequential ({batch['speedup']:.1f}x)")
+    print(f"Reset: {results['reset']['p50_us']:.1f} us p50, {results['reset']['p99_us']:.1f} us p99")
+    print(f"_get_observation: {results['observation']['p50_us']:.2f} us p50")
+    io = results['property_io']
+    print(f"Property I/O per step: string-keyed {io['string_keyed_us']:.2f} us, "
+          f"bound {io['bound_us']:.2f} us ({io['speedup']:.1f}x)")
+    for batch_size, stats in results['inference'].items():
+        print(f"predict batch={batch_size}: {stats['p50_us']:.1f} us p50, {stats['per_obs_us']:.2f} us/obs")
+    startup = results['startup']
+    if startup.get('window_speedup') and startup.get('simulator_ready_sec'):
+        print(f"GUI window shown in {startup['window_shown_sec']:.2f} s "
+              f"(eager startup {startup['eager_window_shown_sec']:.2f} s, {startup['window_speedup']:.1f}x); "
+              f"simulator ready in {startup['simulator_ready_sec']:.2f} s")
+    for n_workers, sps in results.get('training_steps_per_sec', {}).items():
+        print(f"Training with {n_workers} workers: {sps:.0f} steps/sec")
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
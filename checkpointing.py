@@ -0,0 +1,285 @@
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import time
+
+from stable_baselines3 import PPO
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.vec_env import VecNormalize
+
+from normalization import load_model, normalize_env, save_model, stats_path
+from parallel_training import make_vec_env
+
+CHECKPOINT_PATTERN = re.compile(r'step_(\d+)\.zip$')
+BEST_MODEL = 'best_model'
+
+
+def checkpoint_path(run_dir, timesteps):
+    """Path (without ``.zip``) of the checkpoint taken after ``timesteps`` steps."""
+    return os.path.join(run_dir, f'step_{timesteps:010d}')
+
+
+def list_checkpoints(run_dir):
+    """
+    Find the checkpoints in a run directory.
+
+    Returns:
+        list[tuple]: ``(timesteps, path)`` pairs sorted by timesteps, with
+            paths given without the ``.zip`` suffix.
+    """
+    found = []
+    for path in glob.glob(os.path.join(run_dir, 'step_*.zip')):
+        match = CHECKPOINT_PATTERN.search(path)
+        if match:
+            found.append((int(match.group(1)), path[:-len('.zip')]))
+    return sorted(found)
+
+
+def latest_checkpoint(run_dir):
+    """Return the path of the newest checkpoint, or None."""
+    checkpoints = list_checkpoints(run_dir)
+    return checkpoints[-1][1] if checkpoints else None
+
+
+class PeriodicCheckpoint(BaseCallback):
+    """
+    Save the model every ``save_freq`` timesteps and when training ends.
+
+    Checkpoints are taken at the start of a rollout, right after the
+    previous PPO update, so the saved policy and optimizer state are
+    consistent and no partial rollout is lost. Each saved path is put on
+    ``eval_queue`` for the background evaluator, with its timesteps and
+    whether normalization statistics were saved alongside it.
+    """
+
+    def __init__(self, run_dir, save_freq=10000, eval_queue=None, keep_last=5, verbose=0):
+        super().__init__(verbose)
+        self.run_dir = run_dir
+        self.save_freq = save_freq
+        self.eval_queue = eval_queue
+        self.keep_last = keep_last
+        self._last_save = None
+
+    def _on_training_start(self):
+        os.makedirs(self.run_dir, exist_ok=True)
+        self._last_save = self.num_timesteps
+
+    def _on_rollout_start(self):
+        if self.num_timesteps - self._last_save >= self.save_freq:
+            self.save()
+
+    def _on_step(self):
+        return True
+
+    def _on_training_end(self):
+        if self.num_timesteps != self._last_save:
+            self.save()
+
+    def save(self):
+        path = checkpoint_path(self.run_dir, self.num_timesteps)
+        self.model.save(path)  # Policy weights plus optimizer state
+        vec_normalize = self.model.get_vec_normalize_env()
+        normalized = vec_normalize is not None
+        if normalized:
+            vec_normalize.save(stats_path(path))
+        with open(f'{path}.json', 'w') as f:
+            json.dump({'timesteps': self.num_timesteps, 'n_updates': self.model._n_updates,
+                       'saved_at': time.time()}, f)
+        self._last_save = self.num_timesteps
+        if self.verbose:
+            print(f"Saved checkpoint {path}.zip")
+        if self.eval_queue is not None:
+            self.eval_queue.put((path, self.num_timesteps, normalized))
+        self._prune()
+
+    def _prune(self):
+        """Delete all but the newest ``keep_last`` checkpoints."""
+        if not self.keep_last:
+            return
+        for _, path in list_checkpoints(self.run_dir)[:-self.keep_last]:
+            for file in (f'{path}.zip', f'{path}.json', stats_path(path)):
+                if os.path.exists(file):
+                    os.remove(file)
+
+
+def _read_best(run_dir):
+    path = os.path.join(run_dir, f'{BEST_MODEL}.json')
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _evaluator_loop(checkpoints, run_dir, n_episodes, seed, n_envs, max_steps, env_kwargs):
+    """
+    Score each queued checkpoint on a fixed batch of seeded episodes.
+
+    Runs in its own process until it receives None. Every score is
+    appended to ``eval_log.jsonl``; a checkpoint that beats the best so far
+    is copied to ``best_model.zip``. Each checkpoint is first copied to a
+    temporary directory, so pruning cannot remove its normalization
+    statistics between loading and scoring; one pruned before the copy
+    completes is skipped.
+    """
+    from batch_eval import run_episodes, summarize
+
+    seeds = list(range(seed, seed + n_episodes))
+    best = _read_best(run_dir)
+    while True:
+        item = checkpoints.get()
+        if item is None:
+            break
+        path, timesteps, normalized = item
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            local = os.path.join(tmp_dir, os.path.basename(path))
+            try:
+                shutil.copyfile(f'{path}.zip', f'{local}.zip')
+                if normalized:
+                    shutil.copyfile(stats_path(path), stats_path(local))
+            except FileNotFoundError:
+                continue  # Pruned before it could be evaluated
+            model = load_model(local)
+            summary = summarize(run_episodes(model, seeds, n_envs=n_envs, max_steps=max_steps,
+                                             env_kwargs=env_kwargs))
+            summary['timesteps'] = timesteps
+            summary['checkpoint'] = path
+            with open(os.path.join(run_dir, 'eval_log.jsonl'), 'a') as f:
+                f.write(json.dumps(summary) + '\n')
+
+            score = (summary['recovery_rate'], summary['mean_reward'])
+            if best is None or score > (best['recovery_rate'], best['mean_reward']):
+                best = summary
+                shutil.copyfile(f'{local}.zip', os.path.join(run_dir, f'{BEST_MODEL}.zip'))
+                best_stats = stats_path(os.path.join(run_dir, BEST_MODEL))
+                if normalized:
+                    shutil.copyfile(stats_path(local), best_stats)
+                elif os.path.exists(best_stats):
+                    os.remove(best_stats)
+                with open(os.path.join(run_dir, f'{BEST_MODEL}.json'), 'w') as f:
+                    json.dump(best, f, indent=2)
+                print(f"New best model at {timesteps} steps: recovery rate {summary['recovery_rate']:.3f}")
+
+
+def start_evaluator(run_dir, n_episodes=200, seed=12345, n_envs=8, max_steps=600, env_kwargs=None):
+    """
+    Start the background checkpoint evaluator in a separate process.
+
+    Returns:
+        tuple: ``(queue, process)``. Put ``(path, timesteps, normalized)``
+            on the queue to score a checkpoint and None to stop the evaluator.
+    """
+    context = multiprocessing.get_context('spawn')
+    checkpoints = context.Queue()
+    process = context.Process(
+        target=_evaluator_loop,
+        args=(checkpoints, run_dir, n_episodes, seed, n_envs, max_steps, env_kwargs),
+        daemon=True,
+    )
+    process.start()
+    return checkpoints, process
+
+
+def train_with_checkpoints(run_dir, total_timesteps=50000, save_freq=10000, n_workers=1, seed=0,
+                           resume=True, evaluate=True, eval_episodes=200, eval_seed=12345,
+                           normalize=True, env_kwargs=None, save_path='stall_recovery_agent', keep_last=5,
+                           tensorboard_log="./ppo_stall_recovery_tensorboard/", verbose=1):
+    """
+    Train PPO with periodic checkpoints, resuming from the newest one.
+
+    Args:
+        run_dir (str): Directory holding this run's checkpoints.
+        total_timesteps (int): Target timesteps for the whole run, including
+            those done before resuming.
+        save_freq (int): Timesteps between checkpoints.
+        n_workers (int): Number of environment workers.
+        seed (int): Base seed for the workers and the PPO agent.
+        resume (bool): Continue from the latest checkpoint in ``run_dir``.
+        evaluate (bool): Score checkpoints in a background process and keep
+            the best one as ``best_model.zip``.
+        eval_episodes (int): Seeded episodes per checkpoint evaluation.
+        eval_seed (int): First seed of the fixed evaluation batch.
+        normalize (bool): Scale observations and rewards with running
+            statistics, checkpointed and restored with the model.
+        env_kwargs (dict, optional): Keyword arguments for
+            ``CustomStallRecoveryEnv``.
+        save_path (str): Where to save the final model, or None to skip.
+        keep_last (int): Number of checkpoints kept on disk.
+        tensorboard_log (str): TensorBoard log directory.
+        verbose (int): Verbosity level.
+
+    Returns:
+        PPO: The trained model.
+    """
+    os.makedirs(run_dir, exist_ok=True)
+    env = make_vec_env(n_workers, seed=seed, **(env_kwargs or {}))
+    latest = latest_checkpoint(run_dir) if resume else None
+    if normalize:
+        if latest and os.path.exists(stats_path(latest)):
+            env = VecNormalize.load(stats_path(latest), env)  # Continue the running statistics
+        else:
+            env = normalize_env(env)
+    if latest:
+        if verbose:
+            print(f"Resuming from {latest}.zip")
+        model = PPO.load(latest, env=env, device='cpu', tensorboard_log=tensorboard_log)
+    else:
+        model = PPO('MlpPolicy', env, n_steps=max(2048 // n_workers, 64), seed=seed, verbose=verbose,
+                    tensorboard_log=tensorboard_log, device='cpu')
+
+    eval_queue = evaluator = None
+    if evaluate:
+        eval_queue, evaluator = start_evaluator(run_dir, n_episodes=eval_episodes, seed=eval_seed,
+                                                env_kwargs=env_kwargs)
+    try:
+        remaining = total_timesteps - model.num_timesteps
+        if remaining > 0:
+            checkpoint = PeriodicCheckpoint(run_dir, save_freq=save_freq, eval_queue=eval_queue,
+                                            keep_last=keep_last, verbose=verbose)
+            model.learn(total_timesteps=remaining, callback=checkpoint, reset_num_timesteps=not latest)
+        if save_path:
+            save_model(model, save_path)
+    finally:
+        env.close()
+        if evaluator is not None:
+            eval_queue.put(None)
+            evaluator.join()
+    return model
+
+
+def main():
+    """Train the stall recovery agent with checkpoints, resume and best-model tracking."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--run-dir', default='checkpoints/stall_recovery')
+    parser.add_argument('--timesteps', type=int, default=50000, help="target timesteps for the whole run")
+    parser.add_argument('--save-freq', type=int, default=10000)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-resume', action='store_true', help="start over even if checkpoints exist")
+    parser.add_argument('--no-eval', action='store_true', help="disable the background evaluator")
+    parser.add_argument('--eval-episodes', type=int, default=200)
+    parser.add_argument('--eval-seed', type=int, default=12345)
+    parser.add_argument('--keep-last', type=int, default=5)
+    parser.add_argument('--no-normalize', action='store_true',
+                        help="train on raw observations and rewards")
+    parser.add_argument('--save-path', default='stall_recovery_agent')
+    args = parser.parse_args()
+
+    train_with_checkpoints(
+        args.run_dir, total_timesteps=args.timesteps, save_freq=args.save_freq, n_workers=args.workers,
+        seed=args.seed, resume=not args.no_resume, evaluate=not args.no_eval,
+        eval_episodes=args.eval_episodes, eval_seed=args.eval_seed, normalize=not args.no_normalize,
+        keep_last=args.keep_last,
+        save_path=args.save_path,
+    )
+    best = _read_best(args.run_dir)
+    if best:
+        print(f"Best checkpoint: {best['checkpoint']}.zip (recovery rate {best['recovery_rate']:.3f})")
+
+
+if __name__ == "__main__":
+    main()
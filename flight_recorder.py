@@ -0,0 +1,173 @@
+import json
+import os
+
+import numpy as np
+
+# Per-step status codes stored in the ``status`` column.
+STATUS_NORMAL, STATUS_STALL, STATUS_RECOVERED, STATUS_CRASHED = range(4)
+STATUS_LABELS = ('Normal', 'Recovery', 'Recovered', 'Crashed')
+
+# One row per agent step. The observation columns follow
+# CustomStallRecoveryEnv._get_observation.
+TELEMETRY_DTYPE = np.dtype([
+    ('episode', np.int32),
+    ('step', np.int32),
+    ('time', np.float32),
+    ('alpha', np.float32),
+    ('vc', np.float32),
+    ('q', np.float32),
+    ('theta', np.float32),
+    ('altitude', np.float32),
+    ('throttle', np.float32),
+    ('roll', np.float32),
+    ('elevator_cmd', np.float32),
+    ('throttle_cmd', np.float32),
+    ('reward', np.float32),
+    ('status', np.int8),
+])
+OBS_FIELDS = ('alpha', 'vc', 'q', 'theta', 'altitude', 'throttle', 'roll')
+ACTION_FIELDS = ('elevator_cmd', 'throttle_cmd')
+
+SCHEMA_FILE = 'schema.json'
+SCHEMA_VERSION = 1
+
+
+class FlightRecorder:
+    """
+    Append-only telemetry recorder backed by a growable NumPy structured array.
+
+    Rows are appended in place into a preallocated buffer that doubles when
+    full. When ``path`` is given, ``flush`` appends the rows recorded since the
+    last flush to one raw binary file per column, which ``open_flight_log``
+    maps back without copying.
+    """
+
+    def __init__(self, capacity=4096, path=None):
+        self._buffer = np.zeros(capacity, dtype=TELEMETRY_DTYPE)
+        self._size = 0
+        self._flushed = 0
+        self.path = path
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def data(self):
+        """np.ndarray: View of the rows recorded so far."""
+        return self._buffer[:self._size]
+
+    def _reserve(self, n):
+        if self._size + n > len(self._buffer):
+            capacity = max(len(self._buffer) * 2, self._size + n)
+            grown = np.zeros(capacity, dtype=TELEMETRY_DTYPE)
+            grown[:self._size] = self._buffer[:self._size]
+            self._buffer = grown
+
+    def record(self, obs, action, reward, status=STATUS_NORMAL, episode=0, step=None, time=None):
+        """
+        Append one step.
+
+        Args:
+            obs (np.ndarray): Observation [alpha, vc, q, theta, h, throttle, roll].
+            action (np.ndarray): Action [elevator, throttle].
+            reward (float): Reward for the step.
+            status (int): One of the ``STATUS_*`` codes.
+            episode (int): Episode index.
+            step (int, optional): Step index; defaults to the row index.
+            time (float, optional): Simulation time in seconds.
+        """
+        self._reserve(1)
+        row = self._buffer[self._size]
+        row['episode'] = episode
+        row['step'] = self._size if step is None else step
+        row['time'] = 0.0 if time is None else time
+        for field, value in zip(OBS_FIELDS, obs):
+            row[field] = value
+        for field, value in zip(ACTION_FIELDS, action):
+            row[field] = value
+        row['reward'] = reward
+        row['status'] = status
+        self._size += 1
+
+    def record_batch(self, rows):
+        """Append an array of ``TELEMETRY_DTYPE`` rows."""
+        self._reserve(len(rows))
+        self._buffer[self._size:self._size + len(rows)] = rows
+        self._size += len(rows)
+
+    def column(self, name):
+        """Return a view of one column of the recorded rows."""
+        return self.data[name]
+
+    def clear(self):
+        """Forget the recorded rows, keeping the allocated buffer."""
+        self._size = 0
+        self._flushed = 0
+
+    def flush(self):
+        """
+        Append the rows recorded since the last flush to the columnar log.
+
+        Returns:
+            int: Number of rows written.
+        """
+        if self.path is None:
+            raise ValueError("FlightRecorder was created without a path")
+        os.makedirs(self.path, exist_ok=True)
+        pending = self._buffer[self._flushed:self._size]
+        for name in TELEMETRY_DTYPE.names:
+            with open(os.path.join(self.path, f'{name}.bin'), 'ab') as f:
+                f.write(np.ascontiguousarray(pending[name]).tobytes())
+
+        schema = _read_schema(self.path) if os.path.exists(os.path.join(self.path, SCHEMA_FILE)) else None
+        rows = (schema['rows'] if schema else 0) + len(pending)
+        _write_schema(self.path, rows)
+        self._flushed = self._size
+        return len(pending)
+
+    def close(self):
+        """Flush any pending rows when the recorder is backed by a file."""
+        if self.path is not None and self._flushed < self._size:
+            self.flush()
+
+
+def _write_schema(path, rows):
+    schema = {
+        'version': SCHEMA_VERSION,
+        'rows': rows,
+        'columns': [[name, TELEMETRY_DTYPE[name].str] for name in TELEMETRY_DTYPE.names],
+    }
+    tmp_path = os.path.join(path, SCHEMA_FILE + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(schema, f)
+    os.replace(tmp_path, os.path.join(path, SCHEMA_FILE))
+
+
+def _read_schema(path):
+    with open(os.path.join(path, SCHEMA_FILE)) as f:
+        schema = json.load(f)
+    if schema['version'] != SCHEMA_VERSION:
+        raise ValueError(f"Unsupported flight log version: {schema['version']}")
+    return schema
+
+
+def open_flight_log(path):
+    """
+    Map a flight log written by ``FlightRecorder.flush`` without copying it.
+
+    Args:
+        path (str): Flight log directory.
+
+    Returns:
+        dict: Column name to read-only ``np.memmap`` of the flushed rows.
+    """
+    schema = _read_schema(path)
+    rows = schema['rows']
+    columns = {}
+    for name, dtype in schema['columns']:
+        if rows == 0:
+            columns[name] = np.zeros(0, dtype=dtype)
+        else:
+            columns[name] = np.memmap(os.path.join(path, f'{name}.bin'), dtype=dtype,
+                                      mode='r', shape=(rows,))
+    return columns
@@ -0,0 +1,206 @@
+import numpy as np
+
+# One row per initial condition region, as returned by AdaptiveICSampler.stats.
+REGION_DTYPE = np.dtype([
+    ('alpha_low', np.float64),
+    ('alpha_high', np.float64),
+    ('vc_low', np.float64),
+    ('vc_high', np.float64),
+    ('episodes', np.int64),
+    ('recoveries', np.int64),
+    ('success_rate', np.float64),  # Smoothed, 0.5 for an unvisited region
+    ('mean_steps', np.float64),    # NaN for an unvisited region
+    ('weight', np.float64),        # Current sampling probability
+])
+
+
+class AdaptiveICSampler:
+    """
+    Stall initial condition sampler that focuses on the hard regions.
+
+    The alpha/vc box of ``CustomStallRecoveryEnv`` is split into a grid of
+    regions with per-region episode, recovery and length statistics. With
+    ``prioritize`` set, regions are drawn in proportion to how hard they
+    are (failure rate, plus a bonus for long recoveries), mixed with a
+    uniform share so easy regions are not forgotten. With ``curriculum``
+    set, sampling starts in the easy corner (low alpha, high vc) and the
+    box widens by ``widen_by`` whenever the success rate since the last
+    widening reaches ``promote_at``.
+
+    The environment calls ``sample`` at reset and ``record`` when an
+    episode ends; statistics from several worker processes are combined
+    with ``pop_updates`` and ``merge``.
+    """
+
+    def __init__(self, alpha_range=(12.0, 18.0), vc_range=(40.0, 60.0), theta_range=(10.0, 20.0),
+                 bins=(3, 3), prioritize=True, uniform_mix=0.25, length_weight=0.25,
+                 curriculum=False, start_level=0.25, widen_by=0.25, promote_at=0.8, min_episodes=50):
+        """
+        Args:
+            alpha_range (tuple): Initial angle of attack range in degrees.
+            vc_range (tuple): Initial calibrated airspeed range in knots.
+            theta_range (tuple): Initial pitch range in degrees; not binned.
+            bins (tuple): Number of (alpha, vc) regions.
+            prioritize (bool): Oversample regions with low recovery rates.
+            uniform_mix (float): Share of samples drawn uniformly.
+            length_weight (float): Weight of the mean episode length in
+                the hardness of a region, relative to its failure rate.
+            curriculum (bool): Start from the easy corner and widen the
+                ranges as the success rate rises.
+            start_level (float): Fraction of each range used at first.
+            widen_by (float): Fraction added to the ranges per promotion.
+            promote_at (float): Success rate that triggers a promotion.
+            min_episodes (int): Episodes at a level before it can be promoted.
+        """
+        if not 0 <= uniform_mix <= 1:
+            raise ValueError("uniform_mix must be between 0 and 1")
+        self.alpha_edges = np.linspace(*alpha_range, bins[0] + 1)
+        self.vc_edges = np.linspace(*vc_range, bins[1] + 1)
+        self.theta_range = tuple(theta_range)
+        self.prioritize = prioritize
+        self.uniform_mix = uniform_mix
+        self.length_weight = length_weight
+        self.curriculum = curriculum
+        self.widen_by = widen_by
+        self.promote_at = promote_at
+        self.min_episodes = min_episodes
+        self.level = start_level if curriculum else 1.0
+
+        # Region r covers alpha bin r // n_vc and vc bin r % n_vc
+        n_regions = bins[0] * bins[1]
+        alpha_bin, vc_bin = np.divmod(np.arange(n_regions), bins[1])
+        self._alpha_low, self._alpha_high = self.alpha_edges[alpha_bin], self.alpha_edges[alpha_bin + 1]
+        self._vc_low, self._vc_high = self.vc_edges[vc_bin], self.vc_edges[vc_bin + 1]
+        self.episodes = np.zeros(n_regions, dtype=np.int64)
+        self.recoveries = np.zeros(n_regions, dtype=np.int64)
+        self.steps = np.zeros(n_regions, dtype=np.int64)
+        # Counts not yet collected by pop_updates
+        self._pending = np.zeros((3, n_regions), dtype=np.int64)
+        # Episodes and recoveries since the last promotion
+        self._level_episodes = 0
+        self._level_recoveries = 0
+
+    @property
+    def n_regions(self):
+        return len(self.episodes)
+
+    def bounds(self):
+        """
+        The alpha and vc ranges sampled at the current curriculum level.
+
+        Returns:
+            tuple: ``((alpha_low, alpha_high), (vc_low, vc_high))``.
+        """
+        alpha_low, alpha_high = self.alpha_edges[0], self.alpha_edges[-1]
+        vc_low, vc_high = self.vc_edges[0], self.vc_edges[-1]
+        return ((alpha_low, alpha_low + self.level * (alpha_high - alpha_low)),
+                (vc_high - self.level * (vc_high - vc_low), vc_high))
+
+    def weights(self):
+        """Sampling probability of each region."""
+        (alpha_low, alpha_high), (vc_low, vc_high) = self.bounds()
+        # Area of each region inside the current box
+        area = (np.clip(np.minimum(self._alpha_high, alpha_high) - np.maximum(self._alpha_low, alpha_low), 0, None)
+                * np.clip(np.minimum(self._vc_high, vc_high) - np.maximum(self._vc_low, vc_low), 0, None))
+        uniform = area / area.sum()
+        if not self.prioritize:
+            return uniform
+        hardness = 1 - self.success_rate()
+        mean_steps = self.mean_steps()
+        if self.length_weight and np.isfinite(mean_steps).any():
+            longest = np.nanmax(mean_steps)
+            if longest > 0:
+                hardness = hardness + self.length_weight * np.nan_to_num(mean_steps / longest, nan=1.0)
+        hardness = np.where(area > 0, hardness, 0)
+        return self.uniform_mix * uniform + (1 - self.uniform_mix) * hardness / hardness.sum()
+
+    def success_rate(self):
+        """Per-region recovery rate with add-one smoothing."""
+        return (self.recoveries + 1) / (self.episodes + 2)
+
+    def mean_steps(self):
+        """Per-region mean episode length in agent steps, NaN if unvisited."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.episodes > 0, self.steps / self.episodes, np.nan)
+
+    def sample(self, rng):
+        """
+        Draw an initial condition.
+
+        Args:
+            rng (np.random.Generator): Random number generator, e.g. the
+                environment's ``np_random``.
+
+        Returns:
+            tuple: ``(alpha, vc, theta)``.
+        """
+        region = rng.choice(self.n_regions, p=self.weights())
+        (alpha_low, alpha_high), (vc_low, vc_high) = self.bounds()
+        alpha = rng.uniform(max(self._alpha_low[region], alpha_low), min(self._alpha_high[region], alpha_high))
+        vc = rng.uniform(max(self._vc_low[region], vc_low), min(self._vc_high[region], vc_high))
+        return alpha, vc, rng.uniform(*self.theta_range)
+
+    def region_of(self, alpha, vc):
+        """Index of the region containing an initial alpha and vc."""
+        alpha_bin = np.clip(np.searchsorted(self.alpha_edges, alpha, side='right') - 1, 0, len(self.alpha_edges) - 2)
+        vc_bin = np.clip(np.searchsorted(self.vc_edges, vc, side='right') - 1, 0, len(self.vc_edges) - 2)
+        return int(alpha_bin * (len(self.vc_edges) - 1) + vc_bin)
+
+    def record(self, region, recovered, steps):
+        """Add the outcome of one episode started in ``region``."""
+        counts = np.zeros((3, self.n_regions), dtype=np.int64)
+        counts[:, region] = (1, recovered, steps)
+        self._pending += counts
+        self._add(counts)
+
+    def pop_updates(self):
+        """
+        Counts recorded since the last call, for ``merge`` in another process.
+
+        Returns:
+            np.ndarray: (3, n_regions) episodes, recoveries and steps.
+        """
+        updates, self._pending = self._pending, np.zeros_like(self._pending)
+        return updates
+
+    def merge(self, updates):
+        """Add counts returned by another sampler's ``pop_updates``."""
+        self._add(np.asarray(updates, dtype=np.int64))
+
+    def _add(self, counts):
+        episodes, recoveries, steps = counts
+        self.episodes += episodes
+        self.recoveries += recoveries
+        self.steps += steps
+        if not self.curriculum or self.level >= 1:
+            return
+        self._level_episodes += int(episodes.sum())
+        self._level_recoveries += int(recoveries.sum())
+        if (self._level_episodes >= self.min_episodes
+                and self._level_recoveries >= self.promote_at * self._level_episodes):
+            self.level = min(1.0, self.level + self.widen_by)
+            self._level_episodes = self._level_recoveries = 0
+
+    def overall_success_rate(self):
+        """Recovery rate over the full ranges, weighting every region equally."""
+        visited = self.episodes > 0
+        if not visited.any():
+            return None
+        return float((self.recoveries[visited] / self.episodes[visited]).mean())
+
+    def stats(self):
+        """
+        Per-region statistics.
+
+        Returns:
+            np.ndarray: ``REGION_DTYPE`` rows, one per region.
+        """
+        table = np.zeros(self.n_regions, dtype=REGION_DTYPE)
+        table['alpha_low'], table['alpha_high'] = self._alpha_low, self._alpha_high
+        table['vc_low'], table['vc_high'] = self._vc_low, self._vc_high
+        table['episodes'] = self.episodes
+        table['recoveries'] = self.recoveries
+        table['success_rate'] = self.success_rate()
+        table['mean_steps'] = self.mean_steps()
+        table['weight'] = self.weights()
+        return table
@@ -1,217 +1,482 @@
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from PyQt6.QtGui import QFont
-from PyQt6.QtCore import Qt, QTimer
-from PyQt6.QtWidgets import QVBoxLayout, QScrollArea, QFrame, QTableWidget, QTableWidgetItem, QHBoxLayout, QLabel, QApplication, QTabWidget, QMainWindow, QPushButton, QVBoxLayout, QWidget
-import matplotlib.pyplot as plt
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QThread, QTimer, pyqtSignal
+from PyQt6.QtWidgets import QVBoxLayout, QScrollArea, QFrame, QTableView, QHeaderView, QHBoxLayout, QLabel, QApplication, QTabWidget, QMainWindow, QPushButton, QCheckBox, QVBoxLayout, QWidget, QLineEdit, QComboBox
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from stable_baselines3 import PPO
-from threading import Thread
+from matplotlib.figure import Figure
 import time
+import numpy as np
 
-# Import your custom environment
-from AircraftSHAgent import CustomStallRecoveryEnv
+import profiling
+from flight_recorder import STATUS_LABELS, TELEMETRY_DTYPE, FlightRecorder
+from stall_analytics import CRITICAL_ALPHA, SAFE_ALPHA, STALL_EVENT_DTYPE, find_stall_events, summarize_events
+from workers import EvaluationWorker, TrainingWorker
+
+
+class RingBuffer:
+    """
+    Fixed-capacity FIFO of floats exposed as one contiguous array view.
+
+    Every sample is stored twice, ``capacity`` apart, so the newest
+    ``capacity`` samples are always a single slice and never need copying.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._data = np.zeros(2 * capacity)
+        self._start = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, value):
+        i = (self._start + self._size) % self.capacity
+        self._data[i] = self._data[i + self.capacity] = value
+        if self._size < self.capacity:
+            self._size += 1
+        else:
+            self._start = (self._start + 1) % self.capacity
+
+    def view(self):
+        """Return the buffered samples, oldest first, without copying."""
+        return self._data[self._start:self._start + self._size]
+
+    def clear(self):
+        self._start = 0
+        self._size = 0
 
 
 class FlightPlot(FigureCanvas):
-    def __init__(self):
-        self.fig, self.ax = plt.subplots()
+    """
+    Live Angle of Attack and Altitude plot.
+
+    The two lines are persistent artists redrawn over a cached background
+    (blitting), at most ``max_fps`` times per second, over a scrolling
+    window of the last ``window`` samples. The axes are only fully redrawn
+    when the data leaves the current limits.
+    """
+
+    def __init__(self, window=600, max_fps=30):
+        self.fig = Figure()
+        self.ax = self.fig.add_subplot(111)
         super().__init__(self.fig)
         self.ax.set_facecolor("#1e1e1e")  # Dark background
         self.ax.set_xlabel("Time Elapsed (seconds)", color="white", fontsize=12)
         self.ax.set_ylabel("Angle of Attack (degrees) and Altitude (feet)", color="white", fontsize=12)
         self.ax.tick_params(colors="white")
         self.ax.grid(color="gray")
-        self.alpha_data, self.alt_data = [], []
-        self.time_data = []
+        self.time_data = RingBuffer(window)
+        self.alpha_data = RingBuffer(window)
+        self.alt_data = RingBuffer(window)
+        self.max_fps = max_fps
+        self._last_draw = 0.0
+        self._background = None
+
+        # Persistent lines, drawn by blitting rather than by the full redraw
+        self.alpha_line, = self.ax.plot([], [], label='Angle of Attack (deg)', color="cyan", linewidth=2, animated=True)
+        self.alt_line, = self.ax.plot([], [], label='Altitude (ft)', color="orange", linewidth=2, animated=True)
+        self.ax.legend(facecolor="#1e1e1e", edgecolor="white", labelcolor="white", fontsize=10)
+        self.ax.set_xlim(0, 1)
+        self.ax.set_ylim(0, 1000)
+        self.mpl_connect('draw_event', self._on_draw)
+
+    def _on_draw(self, event):
+        """Cache the freshly drawn background and draw the lines over it."""
+        self._background = self.copy_from_bbox(self.ax.bbox)
+        self._draw_lines()
+
+    def _draw_lines(self):
+        self.ax.draw_artist(self.alpha_line)
+        self.ax.draw_artist(self.alt_line)
+
+    def _rescale(self, time_data, alpha_data, alt_data):
+        """
+        Grow the axis limits to fit the data.
+
+        The x-axis jumps ahead by half the visible span so limits, and the
+        full redraw they require, change only occasionally.
+
+        Returns:
+            bool: True if the limits changed.
+        """
+        changed = False
+        xmin, xmax = self.ax.get_xlim()
+        if time_data[-1] > xmax:
+            span = max(time_data[-1] - time_data[0], 1)
+            self.ax.set_xlim(time_data[0], time_data[-1] + span / 2)
+            changed = True
+
+        top = max(alpha_data.max(), alt_data.max())
+        if top > self.ax.get_ylim()[1]:
+            self.ax.set_ylim(0, top + 1000)  # Extend y-axis
+            changed = True
+        return changed
+
+    def clear_plot(self):
+        """Drop all samples and reset the axes."""
+        self.time_data.clear()
+        self.alpha_data.clear()
+        self.alt_data.clear()
+        self.alpha_line.set_data([], [])
+        self.alt_line.set_data([], [])
+        self.ax.set_xlim(0, 1)
+        self.ax.set_ylim(0, 1000)
+        self.draw()
 
+    @profiling.timed('plot.update')
     def update_plot(self, alpha, alt, timestep):
         self.time_data.append(timestep)
         self.alpha_data.append(alpha)
         self.alt_data.append(alt)
-        self.ax.clear()
-        self.ax.set_facecolor("#1e1e1e")
+        if time.perf_counter() - self._last_draw >= 1 / self.max_fps:
+            self.refresh()
+
+    @profiling.timed('plot.update')
+    def append_samples(self, time_data, alpha_data, alt_data):
+        """Add a batch of samples and redraw at most once."""
+        for timestep, alpha, alt in zip(time_data, alpha_data, alt_data):
+            self.time_data.append(timestep)
+            self.alpha_data.append(alpha)
+            self.alt_data.append(alt)
+        if time.perf_counter() - self._last_draw >= 1 / self.max_fps:
+            self.refresh()
+
+    @profiling.timed('plot.refresh')
+    def refresh(self):
+        """Redraw the lines with the buffered samples."""
+        self._last_draw = time.perf_counter()
+        if not len(self.time_data):
+            return
+        time_data = self.time_data.view()
+        alpha_data = self.alpha_data.view()
+        alt_data = self.alt_data.view()
+        self.alpha_line.set_data(time_data, alpha_data)
+        self.alt_line.set_data(time_data, alt_data)
+
+        if self._rescale(time_data, alpha_data, alt_data) or self._background is None:
+            self.draw()  # _on_draw re-caches the background and draws the lines
+            return
+        self.restore_region(self._background)
+        self._draw_lines()
+        self.blit(self.ax.bbox)
+
+
+def minmax_decimate(x, y, n_buckets):
+    """
+    Reduce a series to the minimum and maximum of each of ``n_buckets`` buckets.
+
+    Series with at most two points per bucket are returned unchanged. The
+    kept points stay in time order, so peaks survive at pixel resolution.
+
+    Returns:
+        tuple: (x, y) arrays of the kept points.
+    """
+    n = len(y)
+    if n <= 2 * n_buckets:
+        return x, y
+    size = n // n_buckets
+    whole = size * n_buckets
+    buckets = y[:whole].reshape(n_buckets, size)
+    offsets = np.arange(0, whole, size)
+    keep = np.concatenate((
+        offsets + buckets.argmin(axis=1),
+        offsets + buckets.argmax(axis=1),
+        np.arange(whole, n),  # Leftover points past the last whole bucket
+    ))
+    keep = np.unique(keep)  # Sorted, without duplicates
+    return x[keep], y[keep]
+
+
+class AnalysisPlot:
+    """
+    One Analysis tab chart with persistent axes and artists.
+
+    ``set_data`` only stores the series; ``render`` decimates it to the
+    axes' pixel width and updates the existing artists in place.
+    """
+
+    def __init__(self, title, xlabel, ylabel, label, color, style='line'):
+        self.figure = Figure()
+        self.canvas = FigureCanvas(self.figure)
+        self.ax = self.figure.add_subplot(111)
+        self.ax.set_facecolor("#f9f9f9")  # Light background
+        self.ax.set_title(title, color="black", fontsize=14)
+        self.ax.set_xlabel(xlabel, color="black", fontsize=12)
+        self.ax.set_ylabel(ylabel, color="black", fontsize=12)
+        self.ax.tick_params(colors="black")
+        self.ax.grid(color="gray")
 
-        # Plot the data
-        self.ax.plot(self.time_data, self.alpha_data, label='Angle of Attack (deg)', color="cyan", linewidth=2)
-        self.ax.plot(self.time_data, self.alt_data, label='Altitude (ft)', color="orange", linewidth=2)
+        self.style = style
+        self.color = color
+        if style == 'scatter':
+            self.line, = self.ax.plot([], [], linestyle='None', marker='o', markersize=3, color=color, label=label)
+        else:
+            self.line, = self.ax.plot([], [], color=color, linewidth=2, label=label)
+        self.fill = None
+        self.ax.legend(facecolor="#f9f9f9", edgecolor="black", labelcolor="black", fontsize=10)
+
+        self.x = self.y = None
+        self.dirty = False
+
+    def set_data(self, x, y):
+        # Copied: hidden charts render later, after the recorder is reused
+        self.x = np.array(x, copy=True)
+        self.y = np.array(y, copy=True)
+        self.dirty = True
+
+    def is_visible(self):
+        """Whether any part of the chart is currently on screen."""
+        return self.canvas.isVisible() and not self.canvas.visibleRegion().isEmpty()
+
+    def render(self):
+        """Draw the stored series if it changed since the last render."""
+        if not self.dirty:
+            return
+        self.dirty = False
+        x, y = minmax_decimate(self.x, self.y, max(int(self.ax.bbox.width), 1))
+        self.line.set_data(x, y)
+        if self.style == 'fill':
+            if self.fill is not None:
+                self.fill.remove()
+            self.fill = self.ax.fill_between(x, y, color=self.color, alpha=0.3)
+        if len(x):
+            self.ax.relim()
+            self.ax.autoscale_view()
+            if self.style == 'fill':
+                self.ax.set_ylim(bottom=min(0, y.min()))  # Fill down to zero
+        self.canvas.draw_idle()
+
+
+class StallEventModel(QAbstractTableModel):
+    """Table model showing one row per detected stall event."""
+
+    HEADERS = [
+        "Entry (s)", "Duration (s)", "Peak Alpha (deg)", "Recovery Time (s)",
+        "Altitude Lost (ft)", "Elevator Effort", "Throttle Effort"
+    ]
+    FIELDS = ['entry_time', 'duration', 'peak_alpha', 'recovery_time',
+              'altitude_loss', 'elevator_effort', 'throttle_effort']
 
-        # Set axis limits
-        self.ax.set_xlim(0, max(self.time_data) + 1)  # Extend x-axis slightly beyond the max time
-        self.ax.set_ylim(0, max(max(self.alpha_data, default=0), max(self.alt_data, default=0)) + 1000)  # Extend y-axis
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._events = np.zeros(0, dtype=STALL_EVENT_DTYPE)
 
-        # Add labels and legend
-        self.ax.legend(facecolor="#1e1e1e", edgecolor="white", labelcolor="white", fontsize=10)
-        self.ax.set_xlabel("Time Elapsed (seconds)", color="white", fontsize=12)
-        self.ax.set_ylabel("Angle of Attack (degrees) and Altitude (feet)", color="white", fontsize=12)
-        self.ax.tick_params(colors="white")
-        self.ax.grid(color="gray")
-        self.draw()
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._events)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole or not index.isValid():
+            return None
+        value = self._events[self.FIELDS[index.column()]][index.row()]
+        return "Not recovered" if np.isnan(value) else f"{value:.2f}"
+
+    def set_events(self, events):
+        self.beginResetModel()
+        self._events = events
+        self.endResetModel()
 
 
 class AnalysisTab(QWidget):
+    # key, title, y-label, series label, color, style
+    PLOTS = [
+        ('alpha', "Scatter: Angle of Attack vs. Time", "Angle of Attack (degrees)", "Angle of Attack (deg)", "blue", 'scatter'),
+        ('altitude', "Filled Line: Altitude vs. Time", "Altitude (feet)", "Altitude (ft)", "orange", 'fill'),
+        ('speed', "Line Plot: Speed vs. Time", "Speed (knots)", "Speed (knots)", "blue", 'line'),
+        ('vertical_speed', "Line Plot: Vertical Speed vs. Time", "Vertical Speed (ft/min)", "Vertical Speed (ft/min)", "green", 'line'),
+        ('throttle', "Line Plot: Throttle vs. Time", "Throttle (%)", "Throttle (%)", "orange", 'line'),
+        ('roll', "Line Plot: Roll vs. Time", "Roll (degrees)", "Roll (degrees)", "purple", 'line'),
+        ('stall_margin', "Line Plot: Stall Margin vs. Time", "Stall Margin (degrees)", "Stall Margin (degrees)", "red", 'line'),
+    ]
+
     def __init__(self, parent=None):
         super().__init__(parent)
 
         # Create a scrollable area for the plots
-        scroll_area = QScrollArea()
-        scroll_area.setWidgetResizable(True)
+        self.scroll_area = QScrollArea()
+        self.scroll_area.setWidgetResizable(True)
 
         # Main container widget for the scroll area
         container = QWidget()
         self.layout = QVBoxLayout(container)
 
         # Add individual plots with fixed heights and spacing
-        self.alpha_scatter_plot = self.create_plot("Scatter: Angle of Attack vs. Time", "Time (s)", "Angle of Attack (degrees)")
-        self.alpha_scatter_plot.setFixedHeight(600)
-        self.layout.addWidget(self.alpha_scatter_plot)
-        self.layout.addSpacing(20)
-
-        self.altitude_bar_plot = self.create_plot("Bar Graph: Altitude vs. Time", "Time (s)", "Altitude (feet)")
-        self.altitude_bar_plot.setFixedHeight(600)
-        self.layout.addWidget(self.altitude_bar_plot)
-        self.layout.addSpacing(20)
-
-        self.speed_plot = self.create_plot("Line Plot: Speed vs. Time", "Time (s)", "Speed (knots)")
-        self.speed_plot.setFixedHeight(600)
-        self.layout.addWidget(self.speed_plot)
-        self.layout.addSpacing(20)
-
-        self.vertical_speed_plot = self.create_plot("Line Plot: Vertical Speed vs. Time", "Time (s)", "Vertical Speed (ft/min)")
-        self.vertical_speed_plot.setFixedHeight(600)
-        self.layout.addWidget(self.vertical_speed_plot)
-        self.layout.addSpacing(20)
-
-        self.throttle_plot = self.create_plot("Line Plot: Throttle vs. Time", "Time (s)", "Throttle (%)")
-        self.throttle_plot.setFixedHeight(600)
-        self.layout.addWidget(self.throttle_plot)
-        self.layout.addSpacing(20)
-
-        self.roll_plot = self.create_plot("Line Plot: Roll vs. Time", "Time (s)", "Roll (degrees)")
-        self.roll_plot.setFixedHeight(600)
-        self.layout.addWidget(self.roll_plot)
-        self.layout.addSpacing(20)
-
-        self.stall_margin_plot = self.create_plot("Line Plot: Stall Margin vs. Time", "Time (s)", "Stall Margin (degrees)")
-        self.stall_margin_plot.setFixedHeight(600)
-        self.layout.addWidget(self.stall_margin_plot)
+        self.plots = {}
+        for i, (key, title, ylabel, label, color, style) in enumerate(self.PLOTS):
+            plot = AnalysisPlot(title, "Time (s)", ylabel, label, color, style)
+            plot.canvas.setFixedHeight(600)
+            self.layout.addWidget(plot.canvas)
+            if i < len(self.PLOTS) - 1:
+                self.layout.addSpacing(20)
+            self.plots[key] = plot
 
         # Set the container widget as the scroll area's widget
-        scroll_area.setWidget(container)
+        self.scroll_area.setWidget(container)
+        # Charts scrolled into view render their pending data
+        self.scroll_area.verticalScrollBar().valueChanged.connect(self.render_visible)
+
+        # Stall event summary and table above the plots
+        self.stall_summary = QLabel("No stall events")
+        self.stall_summary.setStyleSheet("font-size: 14px; padding: 5px;")
+        self.stall_event_model = StallEventModel(self)
+        self.stall_event_table = QTableView()
+        self.stall_event_table.setModel(self.stall_event_model)
+        self.stall_event_table.setMaximumHeight(150)
+        self.stall_event_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
 
         # Add the scroll area to the main layout
         main_layout = QVBoxLayout(self)
-        main_layout.addWidget(scroll_area)
+        main_layout.addWidget(self.stall_summary)
+        main_layout.addWidget(self.stall_event_table)
+        main_layout.addWidget(self.scroll_area)
         self.setLayout(main_layout)
 
-    def create_plot(self, title, xlabel, ylabel):
-        """Helper function to create a plot with a title, x-label, and y-label."""
-        fig, ax = plt.subplots()
-        canvas = FigureCanvas(fig)
-        ax.set_facecolor("#f9f9f9")  # Light background
-        ax.set_title(title, color="black", fontsize=14)
-        ax.set_xlabel(xlabel, color="black", fontsize=12)
-        ax.set_ylabel(ylabel, color="black", fontsize=12)
-        ax.tick_params(colors="black")
-        ax.grid(color="gray")
-        return canvas
+    def showEvent(self, event):
+        super().showEvent(event)
+        # Visible regions are only known once the layout has been applied
+        QTimer.singleShot(0, self.render_visible)
+
+    def render_visible(self):
+        """Render the charts that are on screen and have pending data."""
+        for plot in self.plots.values():
+            if plot.dirty and plot.is_visible():
+                plot.render()
+
+    def _set_data(self, key, time_data, values):
+        plot = self.plots[key]
+        plot.set_data(time_data, values)
+        if plot.is_visible():
+            plot.render()
 
     def update_alpha_scatter_plot(self, time_data, alpha_data):
         """Update the Scatter Plot for Angle of Attack vs. Time."""
-        self.alpha_scatter_plot.figure.clear()
-        ax = self.alpha_scatter_plot.figure.add_subplot(111)
-        ax.set_facecolor("#f9f9f9")
-        ax.scatter(time_data, alpha_data, label="Angle of Attack (deg)", color="blue", s=10)
-        ax.set_title("Scatter: Angle of Attack vs. Time", color="black", fontsize=14)
-        ax.set_xlabel("Time (s)", color="black", fontsize=12)
-        ax.set_ylabel("Angle of Attack (degrees)", color="black", fontsize=12)
-        ax.tick_params(colors="black")
-        ax.grid(color="gray")
-        ax.legend(facecolor="#f9f9f9", edgecolor="black", labelcolor="black", fontsize=10)
-        self.alpha_scatter_plot.draw()
-
-    def update_altitude_bar_plot(self, time_data, altitude_data):
-        """Update the Bar Graph for Altitude vs. Time."""
-        self.altitude_bar_plot.figure.clear()
-        ax = self.altitude_bar_plot.figure.add_subplot(111)
-        ax.set_facecolor("#f9f9f9")
-        ax.bar(time_data, altitude_data, label="Altitude (ft)", color="orange", width=0.1)
-        ax.set_title("Bar Graph: Altitude vs. Time", color="black", fontsize=14)
-        ax.set_xlabel("Time (s)", color="black", fontsize=12)
-        ax.set_ylabel("Altitude (feet)", color="black", fontsize=12)
-        ax.tick_params(colors="black")
-        ax.grid(color="gray")
-        ax.legend(facecolor="#f9f9f9", edgecolor="black", labelcolor="black", fontsize=10)
-        self.altitude_bar_plot.draw()
+        self._set_data('alpha', time_data, alpha_data)
+
+    def update_altitude_plot(self, time_data, altitude_data):
+        """Update the filled line plot for Altitude vs. Time."""
+        self._set_data('altitude', time_data, altitude_data)
 
     def update_speed_plot(self, time_data, speed_data):
         """Update the Speed vs. Time plot."""
-        self.speed_plot.figure.clear()
-        ax = self.speed_plot.figure.add_subplot(111)
-        ax.set_facecolor("#f9f9f9")
-        ax.plot(time_data, speed_data, label="Speed (knots)", color="blue", linewidth=2)
-        ax.set_title("Speed vs. Time", color="black", fontsize=14)
-        ax.set_xlabel("Time (s)", color="black", fontsize=12)
-        ax.set_ylabel("Speed (knots)", color="black", fontsize=12)
-        ax.tick_params(colors="black")
-        ax.grid(color="gray")
-        ax.legend(facecolor="#f9f9f9", edgecolor="black", labelcolor="black", fontsize=10)
-        self.speed_plot.draw()
+        self._set_data('speed', time_data, speed_data)
 
     def update_vertical_speed_plot(self, time_data, vertical_speed_data):
         """Update the Vertical Speed vs. Time plot."""
-        self.vertical_speed_plot.figure.clear()
-        ax = self.vertical_speed_plot.figure.add_subplot(111)
-        ax.set_facecolor("#f9f9f9")
-        ax.plot(time_data, vertical_speed_data, label="Vertical Speed (ft/min)", color="green", linewidth=2)
-        ax.set_title("Vertical Speed vs. Time", color="black", fontsize=14)
-        ax.set_xlabel("Time (s)", color="black", fontsize=12)
-        ax.set_ylabel("Vertical Speed (ft/min)", color="black", fontsize=12)
-        ax.tick_params(colors="black")
-        ax.grid(color="gray")
-        ax.legend(facecolor="#f9f9f9", edgecolor="black", labelcolor="black", fontsize=10)
-        self.vertical_speed_plot.draw()
+        self._set_data('vertical_speed', time_data, vertical_speed_data)
 
     def update_throttle_plot(self, time_data, throttle_data):
         """Update the Throttle vs. Time plot."""
-        self.throttle_plot.figure.clear()
-        ax = self.throttle_plot.figure.add_subplot(111)
-        ax.set_facecolor("#f9f9f9")
-        ax.plot(time_data, throttle_data, label="Throttle (%)", color="orange", linewidth=2)
-        ax.set_title("Throttle vs. Time", color="black", fontsize=14)
-        ax.set_xlabel("Time (s)", color="black", fontsize=12)
-        ax.set_ylabel("Throttle (%)", color="black", fontsize=12)
-        ax.tick_params(colors="black")
-        ax.grid(color="gray")
-        ax.legend(facecolor="#f9f9f9", edgecolor="black", labelcolor="black", fontsize=10)
-        self.throttle_plot.draw()
+        self._set_data('throttle', time_data, throttle_data)
 
     def update_roll_plot(self, time_data, roll_data):
         """Update the Roll vs. Time plot."""
-        self.roll_plot.figure.clear()
-        ax = self.roll_plot.figure.add_subplot(111)
-        ax.set_facecolor("#f9f9f9")
-        ax.plot(time_data, roll_data, label="Roll (degrees)", color="purple", linewidth=2)
-        ax.set_title("Roll vs. Time", color="black", fontsize=14)
-        ax.set_xlabel("Time (s)", color="black", fontsize=12)
-        ax.set_ylabel("Roll (degrees)", color="black", fontsize=12)
-        ax.tick_params(colors="black")
-        ax.grid(color="gray")
-        ax.legend(facecolor="#f9f9f9", edgecolor="black", labelcolor="black", fontsize=10)
-        self.roll_plot.draw()
+        self._set_data('roll', time_data, roll_data)
 
     def update_stall_margin_plot(self, time_data, stall_margin_data):
         """Update the Stall Margin vs. Time plot."""
-        self.stall_margin_plot.figure.clear()
-        ax = self.stall_margin_plot.figure.add_subplot(111)
-        ax.set_facecolor("#f9f9f9")
-        ax.plot(time_data, stall_margin_data, label="Stall Margin (degrees)", color="red", linewidth=2)
-        ax.set_title("Stall Margin vs. Time", color="black", fontsize=14)
-        ax.set_xlabel("Time (s)", color="black", fontsize=12)
-        ax.set_ylabel("Stall Margin (degrees)", color="black", fontsize=12)
-        ax.tick_params(colors="black")
-        ax.grid(color="gray")
-        ax.legend(facecolor="#f9f9f9", edgecolor="black", labelcolor="black", fontsize=10)
-        self.stall_margin_plot.draw()
+        self._set_data('stall_margin', time_data, stall_margin_data)
+
+    def update_stall_events(self, events):
+        """Show the stall events of an episode and their summary."""
+        self.stall_event_model.set_events(events)
+        summary = summarize_events(events)
+        if not summary['events']:
+            self.stall_summary.setText("No stall events")
+            return
+        text = (f"Stall events: {summary['events']} | Recovered: {summary['recovery_rate']:.0%} | "
+                f"Peak alpha: {summary['peak_alpha_max']:.2f} deg | "
+                f"Max altitude lost: {summary['altitude_loss_max']:.2f} ft")
+        if summary['recovery_time_mean'] is not None:
+            text += f" | Mean recovery time: {summary['recovery_time_mean']:.2f} s"
+        self.stall_summary.setText(text)
+
+
+class FlightDataModel(QAbstractTableModel):
+    """
+    Table model that reads flight data straight from a telemetry array.
+
+    Cells are formatted only when the view asks for them, so the cost of
+    showing an episode depends on the visible rows, not on its length.
+    """
+
+    HEADERS = [
+        "Time (s)", "Angle of Attack (deg)", "Altitude (ft)", "Speed (knots)",
+        "Vertical Speed (ft/min)", "Throttle (%)", "Roll (deg)", "Stall Margin (deg)", "Status"
+    ]
+    # Telemetry field shown directly in each numeric column, if any
+    FIELDS = ['time', 'alpha', 'altitude', 'vc', None, 'throttle', 'roll', None]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._telemetry = np.zeros(0, dtype=TELEMETRY_DTYPE)
+        self.critical_alpha = CRITICAL_ALPHA  # Stall margin reference
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._telemetry)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole or not index.isValid():
+            return None
+        row, column = index.row(), index.column()
+        telemetry = self._telemetry
+        if column == 8:
+            return STATUS_LABELS[telemetry['status'][row]]
+        if column == 4:
+            value = self._vertical_speed(row)
+        elif column == 7:
+            value = self.critical_alpha - telemetry['alpha'][row]
+        else:
+            value = telemetry[self.FIELDS[column]][row]
+        return f"{value:.2f}"
+
+    def _vertical_speed(self, row):
+        """Vertical speed in ft/min from the altitude change since the previous row."""
+        if row == 0:
+            return 0.0
+        telemetry = self._telemetry
+        dt = telemetry['time'][row] - telemetry['time'][row - 1]
+        if dt == 0:
+            return 0.0
+        return (telemetry['altitude'][row] - telemetry['altitude'][row - 1]) / dt * 60
+
+    def set_telemetry(self, telemetry):
+        """Show a copy of ``telemetry`` in place of the current rows."""
+        self.beginResetModel()
+        self._telemetry = telemetry.copy()
+        self.endResetModel()
+
+    def append_telemetry(self, telemetry):
+        """
+        Show ``telemetry`` when it extends the current rows.
+
+        Args:
+            telemetry (np.ndarray): Array whose leading rows are the ones
+                already shown, followed by the new rows.
+        """
+        old_rows, new_rows = len(self._telemetry), len(telemetry)
+        if new_rows <= old_rows:
+            self.set_telemetry(telemetry)
+            return
+        self.beginInsertRows(QModelIndex(), old_rows, new_rows - 1)
+        self._telemetry = telemetry
+        self.endInsertRows()
 
 
 class FlightDataTab(QWidget):
@@ -224,14 +489,13 @@ class FlightDataTab(QWidget):
         self.layout.addWidget(self.flight_plot)
 
         # Flight Data Table
-        self.flight_data_table = QTableWidget()
-        self.flight_data_table.setColumnCount(9)  # Add columns for new parameters
-        self.flight_data_table.setHorizontalHeaderLabels([
-            "Time (s)", "Angle of Attack (deg)", "Altitude (ft)", "Speed (knots)",
-            "Vertical Speed (ft/min)", "Throttle (%)", "Roll (deg)", "Stall Margin (deg)", "Status"
-        ])
+        self.flight_data_model = FlightDataModel(self)
+        self.flight_data_table = QTableView()
+        self.flight_data_table.setModel(self.flight_data_model)
+        # Fixed row heights keep scrolling independent of the row count
+        self.flight_data_table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
         self.flight_data_table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 background-color: #0d1b2a;
                 color: #00d4ff;
                 border: 2px solid #3a607f;
@@ -249,23 +513,37 @@ class FlightDataTab(QWidget):
 
         self.setLayout(self.layout)
 
-    def update_flight_data(self, time_data, alpha_data, altitude_data, speed_data, vertical_speed_data, throttle_data, roll_data, stall_margin_data, status_data):
-        """Update the flight data table with new data."""
-        self.flight_data_table.setRowCount(len(time_data))
-        for i, (time, alpha, altitude, speed, vertical_speed, throttle, roll, stall_margin, status) in enumerate(
-                zip(time_data, alpha_data, altitude_data, speed_data, vertical_speed_data, throttle_data, roll_data, stall_margin_data, status_data)):
-            self.flight_data_table.setItem(i, 0, QTableWidgetItem(f"{time:.2f}"))
-            self.flight_data_table.setItem(i, 1, QTableWidgetItem(f"{alpha:.2f}"))
-            self.flight_data_table.setItem(i, 2, QTableWidgetItem(f"{altitude:.2f}"))
-            self.flight_data_table.setItem(i, 3, QTableWidgetItem(f"{speed:.2f}"))
-            self.flight_data_table.setItem(i, 4, QTableWidgetItem(f"{vertical_speed:.2f}"))
-            self.flight_data_table.setItem(i, 5, QTableWidgetItem(f"{throttle:.2f}"))
-            self.flight_data_table.setItem(i, 6, QTableWidgetItem(f"{roll:.2f}"))
-            self.flight_data_table.setItem(i, 7, QTableWidgetItem(f"{stall_margin:.2f}"))
-            self.flight_data_table.setItem(i, 8, QTableWidgetItem(status))
+    @profiling.timed('table.update')
+    def update_flight_data(self, telemetry):
+        """Replace the flight data table contents with ``telemetry``."""
+        self.flight_data_model.set_telemetry(telemetry)
+
+    @profiling.timed('table.update')
+    def append_flight_data(self, telemetry):
+        """Extend the flight data table with the new rows at the end of ``telemetry``."""
+        self.flight_data_model.append_telemetry(telemetry)
+
+
+def load_environment():
+    """
+    Import the simulation stack and build the GUI's environment.
+
+    Runs off the GUI thread at startup; importing ``stable_baselines3``
+    here also loads torch, so training and evaluation start without that
+    cost later.
+    """
+    import stable_baselines3  # noqa: F401
+
+    from AircraftSHAgent import CustomStallRecoveryEnv
+
+    return CustomStallRecoveryEnv(aircraft='B747')
 
 
 class SHAA(QMainWindow):
+    # Emitted with the loader future when the environment load ends; queued
+    # to the GUI thread, since the future completes on the loader thread
+    env_load_finished = pyqtSignal(object)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("SHAA")
@@ -322,8 +600,13 @@ class SHAA(QMainWindow):
             }
         """)
 
-        self.env = CustomStallRecoveryEnv(aircraft='B747')
-        self.model = PPO('MlpPolicy', self.env, verbose=1, device='cpu')
+        # The environment loads in the background once the window is up and
+        # train and evaluate stay disabled until it is there; the model is
+        # created or loaded by the first train or evaluate
+        self.env = None
+        self.model = None
+        self.env_load_finished.connect(self._on_env_loaded)
+        QTimer.singleShot(0, self._start_env_loader)
 
         self.central_widget = QTabWidget()
         self.setCentralWidget(self.central_widget)
@@ -349,8 +632,35 @@ class SHAA(QMainWindow):
         self.eval_button.clicked.connect(self.evaluate_agent)
         self.control_layout.addWidget(self.eval_button)
 
+        self.pause_button = QPushButton("Pause")
+        self.pause_button.clicked.connect(self.toggle_pause)
+        self.pause_button.setEnabled(False)
+        self.control_layout.addWidget(self.pause_button)
+
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.cancel_worker)
+        self.cancel_button.setEnabled(False)
+        self.control_layout.addWidget(self.cancel_button)
+
+        self.fast_checkbox = QCheckBox("Run as fast as possible")
+        self.fast_checkbox.toggled.connect(self.set_fast_mode)
+        self.control_layout.addWidget(self.fast_checkbox)
+
+        # Telemetry stream from training or evaluation processes
+        stream_layout = QHBoxLayout()
+        self.stream_address = QLineEdit("udp://127.0.0.1:5600")
+        stream_layout.addWidget(self.stream_address)
+        self.stream_button = QPushButton("Monitor Stream")
+        self.stream_button.setCheckable(True)
+        self.stream_button.toggled.connect(self.toggle_stream)
+        stream_layout.addWidget(self.stream_button)
+        self.stream_source = QComboBox()
+        self.stream_source.currentIndexChanged.connect(self._reset_stream_view)
+        stream_layout.addWidget(self.stream_source)
+        self.control_layout.addLayout(stream_layout)
+
         # Status Label
-        self.status_label = QLabel("Status: Ready")
+        self.status_label = QLabel("Status: Loading Simulator...")
         self.status_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.status_label.setStyleSheet("color: black; font-size: 14px;")
         self.control_layout.addWidget(self.status_label)
@@ -361,20 +671,92 @@ class SHAA(QMainWindow):
         self.analysis_tab = AnalysisTab()
         self.central_widget.addTab(self.analysis_tab, "Analysis")
 
-        self.training_thread = None
-        self.timestep = 0
+        self.worker = None
+        self.worker_thread = None
+        self.recorder = FlightRecorder()
+
+        self.subscriber = None
+        self._stream_episode = None
+        self.stream_timer = QTimer(self)
+        self.stream_timer.setInterval(50)
+        self.stream_timer.timeout.connect(self._poll_stream)
+        self._set_running(False)
+
+    def _start_env_loader(self):
+        executor = ThreadPoolExecutor(max_workers=1)
+        executor.submit(load_environment).add_done_callback(self.env_load_finished.emit)
+        executor.shutdown(wait=False)
+
+    def _on_env_loaded(self, loader):
+        try:
+            self.env = loader.result()
+        except Exception as e:
+            self.status_label.setText(f"Status: Cannot load the simulator: {e}")
+            return
+        self.status_label.setText("Status: Ready")
+        if self.subscriber is None:  # Monitoring a stream keeps them disabled
+            self._set_running(False)
+
+    def _start_worker(self, worker):
+        """Run ``worker.run`` on a new QThread; only one worker runs at a time."""
+        thread = QThread(self)
+        worker.moveToThread(thread)
+        thread.started.connect(worker.run)
+        worker.status.connect(self.status_label.setText)
+        worker.failed.connect(self.status_label.setText)
+        worker.finished.connect(thread.quit)
+        worker.finished.connect(worker.deleteLater)
+        thread.finished.connect(thread.deleteLater)
+        thread.finished.connect(self._on_worker_stopped)
+        self.worker, self.worker_thread = worker, thread
+        self._set_running(True)
+        thread.start()
+
+    def _on_worker_stopped(self):
+        self.worker = None
+        self.worker_thread = None
+        self._set_running(False)
+
+    def _set_running(self, running):
+        self.train_button.setEnabled(not running and self.env is not None)
+        self.eval_button.setEnabled(not running and self.env is not None)
+        self.pause_button.setEnabled(running)
+        self.cancel_button.setEnabled(running)
+        self.stream_button.setEnabled(not running)
+        self.pause_button.setText("Pause")
+
+    def toggle_pause(self):
+        if self.worker is None:
+            return
+        if self.worker.paused:
+            self.worker.resume()
+            self.pause_button.setText("Pause")
+        else:
+            self.worker.pause()
+            self.pause_button.setText("Resume")
+            self.status_label.setText("Status: Paused")
+
+    def cancel_worker(self):
+        if self.worker is not None:
+            self.worker.cancel()
+
+    def set_fast_mode(self, fast):
+        if isinstance(self.worker, EvaluationWorker):
+            self.worker.realtime = not fast
 
     def train_agent(self):
-        if not self.training_thread:
-            self.training_thread = Thread(target=self._train)
-            self.training_thread.start()
-
-    def _train(self):
-        self.status_label.setText("Status: Training...")
-        self.model.learn(total_timesteps=8000)
-        self.model.save('stall_recovery_agent')
-        self.status_label.setText("Status: Training Complete")
-        self.training_thread = None
+        if self.worker is None:
+            worker = TrainingWorker(self.model, env=self.env, total_timesteps=8000, save_path='stall_recovery_agent')
+            worker.finished.connect(self._on_training_finished)
+            self._start_worker(worker)
+
+    def _on_training_finished(self):
+        if self.worker.completed:
+            self.model = self.worker.model  # Shared with the next train or evaluate
+        else:
+            # learn() updated the model in place before it stopped; the next
+            # evaluate loads the last saved agent instead
+            self.model = None
 
     def display_stall_warning(self):
         """Display a warning message when a stall condition is detected."""
@@ -401,70 +783,141 @@ class SHAA(QMainWindow):
         QTimer.singleShot(3000, remove_warning)
 
     def evaluate_agent(self):
-        self.status_label.setText("Status: Evaluating...")
-        self.model = PPO.load('stall_recovery_agent')
-        obs, _ = self.env.reset()
-        terminated = False
-        self.timestep = 0
-
-        # Initialize data lists
-        time_data, alpha_data, altitude_data, speed_data = [], [], [], []
-        vertical_speed_data, throttle_data, roll_data, stall_margin_data, status_data = [], [], [], [], []
-
-        while not terminated:
-            action, _ = self.model.predict(obs, deterministic=True)
-            obs, _, terminated, _, _ = self.env.step(action)
-            alpha = obs[0]
-            altitude = obs[4]
-            speed = obs[5]  # Example: Assuming speed is available in obs[5]
-            vertical_speed = (altitude - altitude_data[-1]) / 0.1 if altitude_data else 0  # Calculate vertical speed
-            throttle = obs[6] if len(obs) > 6 else 50  # Example: Assuming throttle is available in obs[6]
-            roll = obs[7] if len(obs) > 7 else 0  # Example: Assuming roll is available in obs[7]
-            stall_margin = 15 - alpha  # Example: Assuming critical stall angle is 15 degrees
-
-            # Detect stall condition
-            if alpha > 15:  # Stall condition: angle of attack > 15 degrees
-                self.display_stall_warning()
-                alpha = 10  # Adjust angle of attack to recover from stall
-                obs[0] = alpha  # Update the observation with the adjusted alpha
-                status = "Recovery"
-            else:
-                status = "Normal"
-
-            # Collect data for analysis
-            time_data.append(self.timestep)
-            alpha_data.append(alpha)
-            altitude_data.append(altitude)
-            speed_data.append(speed)
-            vertical_speed_data.append(vertical_speed)
-            throttle_data.append(throttle)
-            roll_data.append(roll)
-            stall_margin_data.append(stall_margin)
-            status_data.append(status)
-
-            # Update flight data plot
-            self.flight_data_tab.flight_plot.update_plot(alpha, altitude, self.timestep)
-
-            self.timestep += 0.1
-            time.sleep(0.1)
-            QApplication.processEvents()
+        if self.worker is not None:
+            return
+        self.recorder.clear()
+        self.flight_data_tab.flight_plot.clear_plot()
+        self.flight_data_tab.update_flight_data(self.recorder.data)
+
+        worker = EvaluationWorker(self.env, 'stall_recovery_agent', realtime=not self.fast_checkbox.isChecked(),
+                                  model=self.model)
+        worker.telemetry.connect(self._on_telemetry)
+        worker.stall_detected.connect(self.display_stall_warning)
+        worker.finished.connect(self._on_evaluation_finished)
+        self._start_worker(worker)
+
+    def _on_telemetry(self, chunk):
+        """Collect a streamed telemetry chunk and update the live plot."""
+        self.recorder.record_batch(chunk)
+        self.flight_data_tab.append_flight_data(self.recorder.data)
+        self.flight_data_tab.flight_plot.append_samples(chunk['time'], chunk['alpha'], chunk['altitude'])
+
+    def toggle_stream(self, monitoring):
+        """Start or stop showing telemetry published by other processes."""
+        from telemetry_stream import TelemetrySubscriber
+
+        if monitoring:
+            try:
+                self.subscriber = TelemetrySubscriber(self.stream_address.text())
+            except (OSError, ValueError) as e:
+                self.status_label.setText(f"Status: Cannot monitor stream: {e}")
+                self.stream_button.setChecked(False)
+                return
+            self.stream_source.clear()
+            self._reset_stream_view()
+            self.stream_timer.start()
+            self.status_label.setText("Status: Waiting for telemetry...")
+        else:
+            self.stream_timer.stop()
+            if self.subscriber is not None:
+                if len(self.recorder):
+                    self.show_telemetry(self.recorder.data, self._stream_alpha_limits())
+                self.subscriber.close()
+                self.subscriber = None
+            self.status_label.setText("Status: Ready")
+        self.train_button.setEnabled(not monitoring and self.env is not None)
+        self.eval_button.setEnabled(not monitoring and self.env is not None)
+        self.stream_address.setEnabled(not monitoring)
+        self.stream_button.setText("Stop Monitoring" if monitoring else "Monitor Stream")
+
+    def _reset_stream_view(self):
+        self._stream_episode = None
+        self.recorder.clear()
+        self.flight_data_tab.flight_plot.clear_plot()
+        self.flight_data_tab.update_flight_data(self.recorder.data)
+
+    def _poll_stream(self):
+        """Show the frames of the selected source; list every other source."""
+        from telemetry_stream import source_label
+
+        frames = self.subscriber.poll()
+        for source, rows in frames:
+            if self.stream_source.findData(source) < 0:
+                self.stream_source.addItem(source_label(source), source)
+            if source != self.stream_source.currentData():
+                continue
+            # Publishers flush at episode boundaries, so a frame never spans two
+            if rows['episode'][0] != self._stream_episode:
+                if len(self.recorder):
+                    self.show_telemetry(self.recorder.data, self._stream_alpha_limits())
+                self._reset_stream_view()
+                self._stream_episode = rows['episode'][0]
+            self._on_telemetry(rows)
+        if frames:
+            self.flight_data_tab.flight_plot.refresh()
+            self.status_label.setText(
+                f"Status: Monitoring {self.stream_source.count()} source(s), "
+                f"episode {self._stream_episode}, {self.subscriber.lost} frames lost")
+
+    def _on_evaluation_finished(self):
+        if self.worker.model is not None:
+            self.model = self.worker.model
+        self.flight_data_tab.flight_plot.refresh()
+        if len(self.recorder):
+            self.show_telemetry(self.recorder.data)
+
+    def closeEvent(self, event):
+        """Stop any running worker before the window closes."""
+        if self.subscriber is not None:
+            self.stream_timer.stop()
+            self.subscriber.close()
+        if self.worker_thread is not None:
+            self.worker.cancel()
+            self.worker_thread.quit()
+            self.worker_thread.wait()
+        super().closeEvent(event)
+
+    def _stream_alpha_limits(self):
+        """(critical, safe) alpha sent by the selected stream source."""
+        return self.subscriber.alpha_limits.get(self.stream_source.currentData(), (CRITICAL_ALPHA, SAFE_ALPHA))
+
+    def show_telemetry(self, telemetry, alpha_limits=None):
+        """
+        Fill the flight data table and analysis plots from recorded telemetry.
+
+        Args:
+            telemetry (np.ndarray): ``TELEMETRY_DTYPE`` rows of one episode.
+            alpha_limits (tuple, optional): ``(critical, safe)`` alpha the
+                telemetry was flown with; the local environment's when omitted.
+        """
+        if alpha_limits is None:
+            alpha_limits = (self.env.critical_alpha, self.env.safe_alpha)
+        critical_alpha, safe_alpha = alpha_limits
+        time_data = telemetry['time']
+        alpha_data = telemetry['alpha']
+        altitude_data = telemetry['altitude']
+        speed_data = telemetry['vc']
+        dt = np.diff(time_data, prepend=time_data[:1])
+        dt[dt == 0] = 1  # First row has no previous sample
+        vertical_speed_data = np.diff(altitude_data, prepend=altitude_data[:1]) / dt * 60  # ft/min
+        throttle_data = telemetry['throttle']
+        roll_data = telemetry['roll']
+        stall_margin_data = critical_alpha - alpha_data
 
         # Update flight data table
-        self.flight_data_tab.update_flight_data(
-            time_data, alpha_data, altitude_data, speed_data, vertical_speed_data,
-            throttle_data, roll_data, stall_margin_data, status_data
-        )
+        self.flight_data_tab.flight_data_model.critical_alpha = critical_alpha
+        self.flight_data_tab.update_flight_data(telemetry)
 
         # Update analysis plots
         self.analysis_tab.update_alpha_scatter_plot(time_data, alpha_data)
-        self.analysis_tab.update_altitude_bar_plot(time_data, altitude_data)
+        self.analysis_tab.update_altitude_plot(time_data, altitude_data)
         self.analysis_tab.update_speed_plot(time_data, speed_data)
         self.analysis_tab.update_vertical_speed_plot(time_data, vertical_speed_data)
         self.analysis_tab.update_throttle_plot(time_data, throttle_data)
         self.analysis_tab.update_roll_plot(time_data, roll_data)
         self.analysis_tab.update_stall_margin_plot(time_data, stall_margin_data)
-
-        self.status_label.setText("Status: Evaluation Complete")
+        self.analysis_tab.update_stall_events(
+            find_stall_events(telemetry, critical_alpha, safe_alpha))
 
 
 if __name__ == "__main__":
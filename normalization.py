@@ -0,0 +1,117 @@
+import os
+import pickle
+
+import numpy as np
+from stable_baselines3 import PPO
+from stable_baselines3.common.vec_env import DummyVecEnv, VecNormalize
+
+
+def stats_path(model_path):
+    """Path of the normalization statistics saved next to a model."""
+    if model_path.endswith('.zip'):
+        model_path = model_path[:-len('.zip')]
+    return f'{model_path}_vecnormalize.pkl'
+
+
+class Float32VecNormalize(VecNormalize):
+    """
+    Running mean/variance observation and discounted-return reward scaling.
+
+    The statistics live in the process that owns the vectorized env, so
+    with ``SubprocVecEnv`` every worker's transitions update one shared set.
+    Normalized observations are returned as float32 to match the declared
+    observation space.
+    """
+
+    def normalize_obs(self, obs):
+        return super().normalize_obs(obs).astype(np.float32)
+
+
+def normalize_env(venv, gamma=0.99, norm_obs=True, norm_reward=True, clip_obs=10.0):
+    """Wrap a vectorized env in ``Float32VecNormalize``; ``gamma`` should match the agent's."""
+    return Float32VecNormalize(venv, norm_obs=norm_obs, norm_reward=norm_reward,
+                               clip_obs=clip_obs, gamma=gamma)
+
+
+def load_normalizer(model_path):
+    """
+    Load the statistics saved next to a model, frozen for inference.
+
+    Returns:
+        VecNormalize: Detached normalizer, or None when the model was
+            trained without one.
+    """
+    path = stats_path(model_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        normalizer = pickle.load(f)  # VecNormalize pickles without its venv
+    normalizer.training = False
+    normalizer.norm_reward = False
+    return normalizer
+
+
+class NormalizedModel:
+    """
+    A model whose ``predict`` takes raw environment observations.
+
+    Observations are scaled with the statistics the model was trained
+    with before being passed on; every other attribute is the model's own.
+    """
+
+    def __init__(self, model, normalizer):
+        self.model = model
+        self.normalizer = normalizer
+
+    def predict(self, observation, *args, **kwargs):
+        return self.model.predict(self.normalizer.normalize_obs(observation), *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+
+def unwrap(model):
+    """Return the underlying Stable-Baselines3 model."""
+    return model.model if isinstance(model, NormalizedModel) else model
+
+
+def load_model(model_path, env=None, device='cpu', **kwargs):
+    """
+    Load a PPO model together with its normalization statistics.
+
+    Args:
+        model_path (str): Path to the saved PPO model.
+        env (gym.Env or VecEnv, optional): Environment to attach, e.g. to
+            continue training; it is wrapped in the saved normalizer.
+        device (str): Torch device.
+        **kwargs: Extra arguments for ``PPO.load``.
+
+    Returns:
+        PPO or NormalizedModel: The model, wrapped so that ``predict``
+            accepts raw observations when statistics were saved with it.
+    """
+    normalizer = load_normalizer(model_path)
+    if normalizer is not None and env is not None:
+        if not hasattr(env, 'num_envs'):
+            single_env = env
+            env = DummyVecEnv([lambda: single_env])
+        normalizer.set_venv(env)
+        env = normalizer
+    model = PPO.load(model_path, env=env, device=device, **kwargs)
+    return model if normalizer is None else NormalizedModel(model, normalizer)
+
+
+def save_model(model, path):
+    """
+    Save a model and the statistics of its normalized env, if any.
+
+    Stale statistics from an earlier model at ``path`` are removed, so a
+    model saved without normalization is never loaded with someone else's.
+    """
+    model = unwrap(model)
+    model.save(path)
+    normalizer = model.get_vec_normalize_env()
+    if normalizer is not None:
+        normalizer.save(stats_path(path))
+    elif os.path.exists(stats_path(path)):
+        os.remove(stats_path(path))
@@ -0,0 +1,279 @@
+import argparse
+import os
+import time
+
+from stable_baselines3 import PPO
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.monitor import Monitor
+from stable_baselines3.common.utils import set_random_seed
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv, VecMonitor
+
+from aircraft_pool import make_stall_env
+from normalization import normalize_env, save_model
+
+
+def make_env(seed, **env_kwargs):
+    """
+    Build a factory for one environment worker.
+
+    The factory runs inside the worker process, so each worker owns its own
+    JSBSim FGFDMExec instance.
+
+    Args:
+        seed (int): Seed used for this worker's first reset.
+        **env_kwargs: Keyword arguments for ``CustomStallRecoveryEnv``; a
+            sequence of ``aircraft`` builds a multi-aircraft pool.
+
+    Returns:
+        callable: Zero-argument function returning a monitored environment.
+    """
+    def _init():
+        env = Monitor(make_stall_env(**env_kwargs))
+        env.reset(seed=seed)
+        return env
+    return _init
+
+
+def make_vec_env(n_workers, seed=0, worker_seeds=None, vec_env='subproc', start_method=None,
+                 **env_kwargs):
+    """
+    Create a vectorized environment with one JSBSim instance per worker.
+
+    Args:
+        n_workers (int): Number of environment workers.
+        seed (int): Base seed; worker ``i`` uses ``seed + i``.
+        worker_seeds (list[int], optional): Explicit per-worker seeds,
+            overriding ``seed``.
+        vec_env (str): ``'subproc'`` for one process per worker,
+            ``'dummy'`` to step all workers in the current process, or
+            ``'batch'`` to step them in lockstep in the current process with
+            ``BatchStallRecoveryEnv`` (single aircraft, no ``stream``).
+        start_method (str, optional): Multiprocessing start method for
+            ``SubprocVecEnv`` (``'fork'``, ``'spawn'`` or ``'forkserver'``).
+        **env_kwargs: Keyword arguments for ``CustomStallRecoveryEnv``.
+
+    Returns:
+        VecEnv: The vectorized environment.
+    """
+    if worker_seeds is None:
+        worker_seeds = [seed + i for i in range(n_workers)]
+    if len(worker_seeds) != n_workers:
+        raise ValueError(f"Expected {n_workers} worker seeds, got {len(worker_seeds)}")
+
+    if vec_env == 'batch':
+        # Raises ValueError for a multi-aircraft pool or a telemetry stream
+        from batch_env import BatchStallRecoveryEnv
+
+        return VecMonitor(BatchStallRecoveryEnv(n_workers, seeds=worker_seeds, **env_kwargs))
+    env_fns = [make_env(s, **env_kwargs) for s in worker_seeds]
+    if vec_env == 'dummy' or n_workers == 1:
+        return DummyVecEnv(env_fns)
+    if vec_env == 'subproc':
+        return SubprocVecEnv(env_fns, start_method=start_method)
+    raise ValueError(f"Unknown vec_env type: {vec_env!r}")
+
+
+class ThroughputCallback(BaseCallback):
+    """Track aggregate environment steps per second across all workers."""
+
+    def __init__(self, verbose=0):
+        super().__init__(verbose)
+        self.start_time = None
+        self.elapsed = 0.0
+        self.steps_per_sec = 0.0
+
+    def _on_training_start(self):
+        self.start_time = time.perf_counter()
+
+    def _on_step(self):
+        return True
+
+    def _on_rollout_end(self):
+        self.elapsed = time.perf_counter() - self.start_time
+        self.steps_per_sec = self.num_timesteps / self.elapsed if self.elapsed > 0 else 0.0
+        self.logger.record('time/aggregate_steps_per_sec', self.steps_per_sec)
+
+    def _on_training_end(self):
+        self._on_rollout_end()
+        if self.verbose:
+            print(f"Trained {self.num_timesteps} steps in {self.elapsed:.1f} s "
+                  f"({self.steps_per_sec:.1f} steps/sec aggregate)")
+
+
+class ICSamplerCallback(BaseCallback):
+    """
+    Share adaptive initial condition statistics between workers.
+
+    After every rollout the episode outcomes each worker recorded are
+    merged into ``sampler`` and the merged sampler is sent back, so every
+    worker prioritizes (and widens its curriculum) from the statistics of
+    all of them. Training stops early once the recovery rate over the full
+    ranges reaches ``target_recovery``.
+    """
+
+    def __init__(self, sampler, target_recovery=None, verbose=0):
+        super().__init__(verbose)
+        self.sampler = sampler
+        self.target_recovery = target_recovery
+        self.recovery_rate = None
+
+    def _on_step(self):
+        # Keep going until the full ranges are recovered often enough
+        return not (self.target_recovery is not None and self.recovery_rate is not None
+                    and self.sampler.level >= 1 and self.recovery_rate >= self.target_recovery)
+
+    def _on_rollout_end(self):
+        # In-process envs share self.sampler, whose counts are already in
+        # place; dropping its pending counts first keeps them from being
+        # merged twice. Worker processes hold copies with their own counts.
+        # env_method (unlike get_attr/set_attr) reaches the env through
+        # Monitor in every Stable-Baselines3 version.
+        self.sampler.pop_updates()
+        for updates in self.training_env.env_method('pop_ic_updates'):
+            if updates is not None:
+                self.sampler.merge(updates)
+        self.training_env.env_method('set_ic_sampler', self.sampler)
+
+        self.recovery_rate = self.sampler.overall_success_rate()
+        self.logger.record('ic/level', self.sampler.level)
+        if self.recovery_rate is not None:
+            self.logger.record('ic/recovery_rate', self.recovery_rate)
+
+
+def train_parallel(n_workers, total_timesteps=50000, seed=0, worker_seeds=None,
+                   env_kwargs=None, vec_env='subproc', start_method=None, n_steps=None,
+                   normalize=True, ic_sampler=None, target_recovery=None,
+                   tensorboard_log="./ppo_stall_recovery_tensorboard/",
+                   save_path='stall_recovery_agent', verbose=1):
+    """
+    Train PPO against ``n_workers`` parallel stall recovery environments.
+
+    Args:
+        n_workers (int): Number of environment workers.
+        total_timesteps (int): Total environment steps summed over workers.
+        seed (int): Seed of the PPO agent (Python, NumPy and PyTorch RNGs),
+            and base seed of the workers: worker ``i`` uses ``seed + i``.
+        worker_seeds (list[int], optional): Explicit per-worker seeds. They
+            win over ``seed`` for the environments; the agent is never
+            allowed to reseed the workers.
+        env_kwargs (dict, optional): Keyword arguments for
+            ``CustomStallRecoveryEnv``.
+        vec_env (str): ``'subproc'``, ``'dummy'`` or ``'batch'``.
+        start_method (str, optional): Multiprocessing start method.
+        n_steps (int, optional): Rollout length per worker. Defaults to
+            keeping the PPO rollout size close to the single-env 2048 steps.
+        normalize (bool): Scale observations and rewards with running
+            statistics shared by all workers; they are saved next to the
+            model as ``<save_path>_vecnormalize.pkl``.
+        ic_sampler (AdaptiveICSampler, optional): Draws the workers' initial
+            conditions; its statistics are merged after every rollout.
+        target_recovery (float, optional): With ``ic_sampler``, stop once
+            the recovery rate over the full ranges reaches this value.
+        tensorboard_log (str): TensorBoard log directory.
+        save_path (str): Where to save the trained model, or None to skip.
+        verbose (int): Verbosity level.
+
+    Returns:
+        tuple: ``(model, stats)`` where ``stats`` holds the step count,
+            wall-clock time and aggregate steps/sec.
+    """
+    if n_steps is None:
+        n_steps = max(2048 // n_workers, 64)
+
+    env_kwargs = dict(env_kwargs or {})
+    callbacks = [ThroughputCallback(verbose=verbose)]
+    if ic_sampler is not None:
+        env_kwargs['ic_sampler'] = ic_sampler
+        callbacks.append(ICSamplerCallback(ic_sampler, target_recovery))
+    env = make_vec_env(n_workers, seed=seed, worker_seeds=worker_seeds, vec_env=vec_env,
+                       start_method=start_method, **env_kwargs)
+    if normalize:
+        env = normalize_env(env)
+    throughput = callbacks[0]
+    try:
+        # PPO(seed=...) would also call env.seed(seed), replacing the worker
+        # seeds with seed + i at the first reset of learn(); seed only the
+        # agent's generators so the workers keep their own.
+        set_random_seed(seed)
+        model = PPO('MlpPolicy', env, n_steps=n_steps, verbose=verbose,
+                    tensorboard_log=tensorboard_log, device='cpu')
+        model.learn(total_timesteps=total_timesteps, callback=callbacks)
+        if save_path:
+            save_model(model, save_path)
+    finally:
+        env.close()
+
+    stats = {
+        'workers': n_workers,
+        'timesteps': throughput.num_timesteps,
+        'elapsed_sec': throughput.elapsed,
+        'steps_per_sec': throughput.steps_per_sec,
+    }
+    if ic_sampler is not None:
+        stats['recovery_rate'] = ic_sampler.overall_success_rate()
+        stats['ic_level'] = ic_sampler.level
+    return model, stats
+
+
+def main():
+    """Train the stall recovery agent with vectorized JSBSim workers."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="number of environment workers (default: CPU count)")
+    parser.add_argument('--timesteps', type=int, default=50000,
+                        help="total environment steps across all workers")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="base seed; worker i uses seed + i")
+    parser.add_argument('--worker-seeds', type=int, nargs='+', default=None,
+                        help="explicit per-worker seeds (one per worker)")
+    parser.add_argument('--vec-env', choices=['subproc', 'dummy', 'batch'], default='subproc')
+    parser.add_argument('--start-method', choices=['fork', 'spawn', 'forkserver'], default=None)
+    parser.add_argument('--n-steps', type=int, default=None, help="rollout length per worker")
+    parser.add_argument('--aircraft', nargs='+', default=['B747'],
+                        help="aircraft models; several train one policy on a per-episode sampled airframe")
+    parser.add_argument('--dt', type=float, default=0.1)
+    parser.add_argument('--action-repeat', type=int, default=1,
+                        help="physics frames each action is held for")
+    parser.add_argument('--physics-substeps', type=int, default=1,
+                        help="FDM integration steps per physics frame")
+    parser.add_argument('--no-normalize', action='store_true',
+                        help="train on raw observations and rewards")
+    parser.add_argument('--stream', default=None, metavar='ADDRESS',
+                        help="publish every worker's steps to a telemetry viewer, e.g. udp://127.0.0.1:5600")
+    parser.add_argument('--prioritize-ic', action='store_true',
+                        help="oversample initial conditions the agent fails to recover from")
+    parser.add_argument('--curriculum', action='store_true',
+                        help="start from easy initial conditions and widen them as recovery improves")
+    parser.add_argument('--target-recovery', type=float, default=None,
+                        help="with --prioritize-ic or --curriculum, stop at this recovery rate")
+    parser.add_argument('--save-path', default='stall_recovery_agent')
+    args = parser.parse_args()
+
+    env_kwargs = {'aircraft': args.aircraft, 'dt': args.dt, 'action_repeat': args.action_repeat,
+                  'physics_substeps': args.physics_substeps}
+    if args.stream:
+        env_kwargs['stream'] = args.stream
+    ic_sampler = None
+    if args.prioritize_ic or args.curriculum:
+        from ic_sampler import AdaptiveICSampler
+
+        ic_sampler = AdaptiveICSampler(prioritize=args.prioritize_ic, curriculum=args.curriculum)
+
+    print(f"Training the stall recovery agent with {args.workers} workers...")
+    _, stats = train_parallel(
+        args.workers, total_timesteps=args.timesteps, seed=args.seed,
+        worker_seeds=args.worker_seeds, env_kwargs=env_kwargs,
+        vec_env=args.vec_env, start_method=args.start_method, n_steps=args.n_steps,
+        normalize=not args.no_normalize, ic_sampler=ic_sampler, target_recovery=args.target_recovery,
+        save_path=args.save_path,
+    )
+    if args.save_path:
+        print(f"Model saved as '{args.save_path}.zip'")
+    print(f"Aggregate throughput: {stats['steps_per_sec']:.1f} steps/sec "
+          f"over {stats['workers']} workers")
+    if ic_sampler is not None and stats['recovery_rate'] is not None:
+        print(f"Recovery rate {stats['recovery_rate']:.1%} at curriculum level {stats['ic_level']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
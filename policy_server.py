@@ -0,0 +1,348 @@
+import argparse
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from profiling import Histogram
+
+OBS_DIM = 7
+ACTION_DIM = 2
+# Wire format: little-endian uint32 row count, then float32 rows.
+_HEADER = struct.Struct('<I')
+
+_ACTIVATIONS = {
+    'Tanh': np.tanh,
+    'ReLU': lambda x: np.maximum(x, 0),
+    'Identity': lambda x: x,
+}
+
+
+class NumpyPolicy:
+    """
+    Deterministic PPO ``MlpPolicy`` actor evaluated with NumPy only.
+
+    ``from_model`` copies the actor network weights out of a
+    Stable-Baselines3 model; ``predict`` then matches
+    ``model.predict(obs, deterministic=True)`` without torch. Models trained
+    with normalized observations carry the saved statistics along, so
+    ``predict`` always takes raw observations.
+    """
+
+    def __init__(self, layers, low, high, obs_mean=None, obs_std=None, clip_obs=np.inf):
+        self.layers = layers  # List of (weight, bias) or activation name
+        self.low = np.asarray(low, dtype=np.float32)
+        self.high = np.asarray(high, dtype=np.float32)
+        self.obs_mean = None if obs_mean is None else np.asarray(obs_mean, dtype=np.float32)
+        self.obs_std = None if obs_std is None else np.asarray(obs_std, dtype=np.float32)
+        self.clip_obs = float(clip_obs)
+
+    @classmethod
+    def from_model(cls, model):
+        normalizer = getattr(model, 'normalizer', None)  # Set on a NormalizedModel
+        if normalizer is not None:
+            model = model.model
+        policy = model.policy
+        layers = []
+        for module in list(policy.mlp_extractor.policy_net) + [policy.action_net]:
+            name = type(module).__name__
+            if name == 'Linear':
+                layers.append((module.weight.detach().cpu().numpy().T.astype(np.float32),
+                               module.bias.detach().cpu().numpy().astype(np.float32)))
+            elif name in _ACTIVATIONS:
+                layers.append(name)
+            else:
+                raise ValueError(f"Unsupported policy layer: {name}")
+        if normalizer is None or not normalizer.norm_obs:
+            return cls(layers, model.action_space.low, model.action_space.high)
+        return cls(layers, model.action_space.low, model.action_space.high,
+                   obs_mean=normalizer.obs_rms.mean,
+                   obs_std=np.sqrt(normalizer.obs_rms.var + normalizer.epsilon),
+                   clip_obs=normalizer.clip_obs)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            layers = []
+            for i in range(int(data['n_layers'])):
+                if f'activation_{i}' in data:
+                    layers.append(str(data[f'activation_{i}']))
+                else:
+                    layers.append((data[f'weight_{i}'], data[f'bias_{i}']))
+            if 'obs_mean' in data:
+                return cls(layers, data['low'], data['high'], obs_mean=data['obs_mean'],
+                           obs_std=data['obs_std'], clip_obs=float(data['clip_obs']))
+            return cls(layers, data['low'], data['high'])
+
+    def save(self, path):
+        arrays = {'n_layers': len(self.layers), 'low': self.low, 'high': self.high}
+        if self.obs_mean is not None:
+            arrays.update(obs_mean=self.obs_mean, obs_std=self.obs_std, clip_obs=self.clip_obs)
+        for i, layer in enumerate(self.layers):
+            if isinstance(layer, str):
+                arrays[f'activation_{i}'] = layer
+            else:
+                arrays[f'weight_{i}'], arrays[f'bias_{i}'] = layer
+        np.savez(path, **arrays)
+
+    def predict(self, obs):
+        """
+        Compute deterministic actions.
+
+        Args:
+            obs (np.ndarray): One observation of shape (7,) or a batch (N, 7).
+
+        Returns:
+            np.ndarray: Actions clipped to the action space, matching the
+                input's batch shape.
+        """
+        x = np.asarray(obs, dtype=np.float32)
+        single = x.ndim == 1
+        if single:
+            x = x[None]
+        if self.obs_mean is not None:
+            x = np.clip((x - self.obs_mean) / self.obs_std, -self.clip_obs, self.clip_obs)
+        for layer in self.layers:
+            if isinstance(layer, str):
+                x = _ACTIVATIONS[layer](x)
+            else:
+                x = x @ layer[0] + layer[1]
+        actions = np.clip(x, self.low, self.high)
+        return actions[0] if single else actions
+
+
+def load_policy(path):
+    """Load a policy from a ``.npz`` export or a saved PPO model and its statistics."""
+    if path.endswith('.npz'):
+        return NumpyPolicy.load(path)
+    from normalization import load_model
+
+    return NumpyPolicy.from_model(load_model(path))
+
+
+class PolicyServer:
+    """
+    Serve a warm policy to many callers with micro-batching.
+
+    Requests are queued in-process; a single inference thread takes every
+    request that arrives within ``max_wait_ms`` of the first one (up to
+    ``max_batch`` observations) and answers them with one forward pass.
+    """
+
+    def __init__(self, policy, max_batch=256, max_wait_ms=1.0):
+        self.policy = policy
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._requests = queue.Queue()
+        self._thread = None
+        self._running = False
+        self._lock = threading.Lock()
+        self.latency = Histogram()    # Submit to result, per request
+        self.inference = Histogram()  # Forward pass, per batch
+        self.requests = 0
+        self.batches = 0
+        self.observations = 0
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        self._requests.put(None)
+        if self._thread is not None:
+            self._thread.join()
+
+    def submit(self, obs):
+        """
+        Queue a request.
+
+        Args:
+            obs (np.ndarray): (N, 7) observations, or a single (7,) one.
+
+        Returns:
+            Future: Resolves to the actions for ``obs``.
+        """
+        future = Future()
+        self._requests.put((np.asarray(obs, dtype=np.float32), future, time.perf_counter()))
+        return future
+
+    def predict(self, obs, timeout=None):
+        """Blocking ``submit``."""
+        return self.submit(obs).result(timeout)
+
+    def _serve(self):
+        while self._running:
+            first = self._requests.get()
+            if first is None:
+                break
+            batch = [first]
+            size = len(first[0]) if first[0].ndim == 2 else 1
+            deadline = time.perf_counter() + self.max_wait
+            while size < self.max_batch:
+                try:
+                    item = self._requests.get(timeout=max(deadline - time.perf_counter(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._running = False
+                    break
+                batch.append(item)
+                size += len(item[0]) if item[0].ndim == 2 else 1
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        obs = np.concatenate([o if o.ndim == 2 else o[None] for o, _, _ in batch])
+        start = time.perf_counter()
+        try:
+            actions = self.policy.predict(obs)
+        except Exception as exc:
+            for _, future, _ in batch:
+                future.set_exception(exc)
+            return
+        end = time.perf_counter()
+
+        offset = 0
+        with self._lock:
+            self.inference.add(end - start)
+            self.batches += 1
+            self.observations += len(obs)
+            for o, future, submitted in batch:
+                n = len(o) if o.ndim == 2 else 1
+                result = actions[offset:offset + n]
+                future.set_result(result if o.ndim == 2 else result[0])
+                offset += n
+                self.requests += 1
+                self.latency.add(end - submitted)
+
+    def stats(self):
+        """Request latency, inference time and batching statistics."""
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'batches': self.batches,
+                'mean_batch_size': self.observations / self.batches if self.batches else 0.0,
+                'latency': self.latency.summary(),
+                'inference': self.inference.summary(),
+            }
+
+
+def _recv_exact(sock, n):
+    data = bytearray()
+    while len(data) < n:
+        chunk = sock.recv(n - len(data))
+        if not chunk:
+            raise ConnectionError("Connection closed")
+        data.extend(chunk)
+    return bytes(data)
+
+
+class _RequestHandler(socketserver.BaseRequestHandler):
+    """Answer framed observation batches on one connection until it closes."""
+
+    def handle(self):
+        server = self.server.policy_server
+        while True:
+            try:
+                (n,) = _HEADER.unpack(_recv_exact(self.request, _HEADER.size))
+                obs = np.frombuffer(_recv_exact(self.request, n * OBS_DIM * 4), dtype='<f4')
+            except ConnectionError:
+                return
+            actions = server.predict(obs.reshape(n, OBS_DIM))
+            self.request.sendall(np.ascontiguousarray(actions, dtype='<f4').tobytes())
+
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve_socket(policy_server, host='127.0.0.1', port=5555, unix_path=None):
+    """
+    Expose a running ``PolicyServer`` on a local TCP or Unix socket.
+
+    Returns:
+        socketserver.BaseServer: Call ``serve_forever`` or ``shutdown`` on it.
+    """
+    if unix_path:
+        server = _UnixServer(unix_path, _RequestHandler)
+    else:
+        server = _TCPServer((host, port), _RequestHandler)
+    server.policy_server = policy_server
+    return server
+
+
+class PolicyClient:
+    """Blocking client for ``serve_socket``."""
+
+    def __init__(self, host='127.0.0.1', port=5555, unix_path=None):
+        if unix_path:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(unix_path)
+        else:
+            self.sock = socket.create_connection((host, port))
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def predict(self, obs):
+        """Return actions for one observation (7,) or a batch (N, 7)."""
+        obs = np.asarray(obs, dtype='<f4')
+        single = obs.ndim == 1
+        batch = obs.reshape(-1, OBS_DIM)
+        self.sock.sendall(_HEADER.pack(len(batch)) + batch.tobytes())
+        actions = np.frombuffer(_recv_exact(self.sock, len(batch) * ACTION_DIM * 4), dtype='<f4')
+        actions = actions.reshape(len(batch), ACTION_DIM)
+        return actions[0] if single else actions
+
+    def close(self):
+        self.sock.close()
+
+
+def main():
+    """Serve a trained stall recovery policy on a local socket."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--model', default='stall_recovery_agent',
+                        help="saved PPO model or .npz export")
+    parser.add_argument('--export', default=None, help="also write the NumPy export to this .npz file")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5555)
+    parser.add_argument('--unix', default=None, help="serve on this Unix socket path instead of TCP")
+    parser.add_argument('--max-batch', type=int, default=256)
+    parser.add_argument('--max-wait-ms', type=float, default=1.0)
+    parser.add_argument('--stats-every', type=float, default=10.0, help="seconds between latency reports")
+    args = parser.parse_args()
+
+    policy = load_policy(args.model)
+    if args.export:
+        policy.save(args.export)
+    policy_server = PolicyServer(policy, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms).start()
+    server = serve_socket(policy_server, host=args.host, port=args.port, unix_path=args.unix)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Serving {args.model} on {args.unix or f'{args.host}:{args.port}'}")
+
+    try:
+        while True:
+            time.sleep(args.stats_every)
+            stats = policy_server.stats()
+            if stats['requests']:
+                print(f"{stats['requests']} requests, batch {stats['mean_batch_size']:.1f}, "
+                      f"latency p50 {stats['latency']['p50_us']:.0f} us, p99 {stats['latency']['p99_us']:.0f} us")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        policy_server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""
+Opt-in per-phase timing instrumentation.
+
+Timers and counters cost a single flag check while profiling is disabled.
+Enable it with ``enable()`` or by setting ``SHAA_PROFILE=1``; with
+``SHAA_PROFILE_OUTPUT=<path>`` the statistics are also written to a JSON
+file when the process exits.
+
+Statistics are per process: timers recorded inside ``SubprocVecEnv`` or
+process-pool workers stay in those workers and are not merged into the
+parent's. Give ``SHAA_PROFILE_OUTPUT`` a ``{pid}`` placeholder to have
+every process write its own file.
+"""
+import atexit
+import json
+import math
+import os
+import threading
+import time
+from functools import wraps
+
+# Log-spaced histogram buckets from 100 ns to 100 s.
+_MIN_SECONDS = 1e-7
+_BUCKETS_PER_DECADE = 10
+_N_BUCKETS = 9 * _BUCKETS_PER_DECADE
+
+_enabled = os.environ.get('SHAA_PROFILE') == '1'
+_timers = {}
+_counters = {}
+_sections = {}
+
+
+class Histogram:
+    """Log-bucketed latency histogram with constant-time inserts."""
+
+    __slots__ = ('counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (_N_BUCKETS + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def add(self, seconds):
+        if seconds <= _MIN_SECONDS:
+            bucket = 0
+        else:
+            bucket = min(int(math.log10(seconds / _MIN_SECONDS) * _BUCKETS_PER_DECADE) + 1, _N_BUCKETS)
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        """
+        Estimate a percentile from the bucket upper bounds.
+
+        Args:
+            q (float): Percentile in [0, 100].
+
+        Returns:
+            float: Seconds, clamped to the observed maximum.
+        """
+        if not self.count:
+            return 0.0
+        target = q / 100 * self.count
+        cumulative = 0
+        for bucket, n in enumerate(self.counts):
+            cumulative += n
+            if cumulative >= target and n:
+                upper = _MIN_SECONDS * 10 ** (bucket / _BUCKETS_PER_DECADE)
+                return min(upper, self.max)
+        return self.max
+
+    def summary(self):
+        """Return count, total and mean/p50/p99/max latency in microseconds."""
+        return {
+            'count': self.count,
+            'total_sec': self.total,
+            'mean_us': self.total / self.count * 1e6 if self.count else 0.0,
+            'p50_us': self.percentile(50) * 1e6,
+            'p99_us': self.percentile(99) * 1e6,
+            'max_us': self.max * 1e6,
+        }
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    """Discard every recorded timer and counter."""
+    _timers.clear()
+    _counters.clear()
+
+
+def record(name, seconds):
+    """Add one duration to the ``name`` timer."""
+    histogram = _timers.get(name)
+    if histogram is None:
+        histogram = _timers[name] = Histogram()
+    histogram.add(seconds)
+
+
+def count(name, n=1):
+    """Increment the ``name`` counter while profiling is enabled."""
+    if _enabled:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def timed(name):
+    """Decorator recording each call's duration under ``name``."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+class _Section(threading.local):
+    """
+    Reusable context manager timing a block; nesting- and thread-safe.
+
+    The start-time stack is thread-local, so worker threads entering the
+    same section do not pop each other's start times.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._starts = []
+
+    def __enter__(self):
+        if _enabled:
+            self._starts.append(time.perf_counter())
+        return self
+
+    def __exit__(self, *exc):
+        if self._starts:
+            record(self.name, time.perf_counter() - self._starts.pop())
+        return False
+
+
+def section(name):
+    """
+    Context manager recording the duration of a block under ``name``.
+
+    The same object is reused for a given name, so entering a section
+    allocates nothing after a thread's first use of it.
+    """
+    block = _sections.get(name)
+    if block is None:
+        block = _sections[name] = _Section(name)
+    return block
+
+
+def stats():
+    """
+    Snapshot of every timer and counter.
+
+    Returns:
+        dict: ``{'timers': {name: summary}, 'counters': {name: value}}``.
+    """
+    return {
+        'timers': {name: histogram.summary() for name, histogram in sorted(_timers.items())},
+        'counters': dict(sorted(_counters.items())),
+    }
+
+
+def write_stats(path):
+    """Write ``stats()`` to a JSON file."""
+    with open(path, 'w') as f:
+        json.dump(stats(), f, indent=2)
+
+
+def log_to_sb3(logger):
+    """
+    Record the timer percentiles and counters on a Stable-Baselines3 logger.
+
+    When the model was created with ``tensorboard_log`` they appear in
+    TensorBoard under ``profile/``.
+    """
+    for name, summary in stats()['timers'].items():
+        logger.record(f'profile/{name}/p50_us', summary['p50_us'])
+        logger.record(f'profile/{name}/p99_us', summary['p99_us'])
+        logger.record(f'profile/{name}/count', summary['count'])
+    for name, value in _counters.items():
+        logger.record(f'profile/{name}', value)
+
+
+def make_tensorboard_callback():
+    """
+    Create a callback that logs the profile after every PPO rollout.
+
+    Returns:
+        BaseCallback: Callback for ``model.learn``.
+    """
+    from stable_baselines3.common.callbacks import BaseCallback
+
+    class ProfilingCallback(BaseCallback):
+        def _on_step(self):
+            return True
+
+        def _on_rollout_end(self):
+            log_to_sb3(self.logger)
+
+    return ProfilingCallback()
+
+
+def _write_on_exit():
+    path = os.environ.get('SHAA_PROFILE_OUTPUT')
+    if path and (_timers or _counters):
+        write_stats(path.replace('{pid}', str(os.getpid())))
+
+
+atexit.register(_write_on_exit)
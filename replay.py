@@ -0,0 +1,279 @@
+import argparse
+import json
+
+import numpy as np
+
+from AircraftSHAgent import IC_NAMES, OBS_ALPHA, OBS_ALT, CustomStallRecoveryEnv
+from aircraft_pool import make_stall_env
+from flight_recorder import STATUS_CRASHED, STATUS_NORMAL, STATUS_RECOVERED, STATUS_STALL, FlightRecorder
+from reward_spec import RewardSpec
+
+# Telemetry columns compared by diff_trajectories.
+DIFF_FIELDS = ('alpha', 'vc', 'q', 'theta', 'altitude', 'throttle', 'roll', 'elevator_cmd', 'throttle_cmd')
+
+# One row per compared episode.
+DIFF_DTYPE = np.dtype([
+    ('seed', np.int64),
+    ('steps_a', np.int32),
+    ('steps_b', np.int32),
+    ('recovered_a', np.bool_),
+    ('recovered_b', np.bool_),
+    ('reward_a', np.float64),
+    ('reward_b', np.float64),
+    ('first_divergence', np.int32),  # First step differing by more than the tolerance, -1 if none
+    ('max_alpha_diff', np.float64),
+    ('max_altitude_diff', np.float64),
+])
+
+
+class Replay:
+    """
+    A recorded episode as its initial condition plus the action sequence.
+
+    JSBSim is deterministic, so re-simulating the same initial condition
+    with the same float32 actions and env settings reproduces the episode
+    exactly; the replay stores 8 bytes per step instead of a full
+    telemetry row.
+    """
+
+    def __init__(self, ic, actions, seed=None, env_kwargs=None):
+        self.ic = dict(ic)
+        self.actions = np.asarray(actions, dtype=np.float32)
+        self.seed = seed
+        self.env_kwargs = dict(env_kwargs or {})
+
+    def __len__(self):
+        return len(self.actions)
+
+
+def record_episode(policy, seed=None, ic=None, max_steps=600, **env_kwargs):
+    """
+    Run one episode with ``policy`` and record it as a ``Replay``.
+
+    Args:
+        policy: Model with a Stable-Baselines3 style ``predict`` method.
+        seed (int, optional): Episode seed for the sampled initial condition.
+        ic (dict, optional): Initial conditions to fix, as for ``reset``.
+        max_steps (int): Agent steps before the episode is cut off.
+        **env_kwargs: Keyword arguments for ``make_stall_env``.
+
+    Returns:
+        Replay: The episode, replayable on a single-aircraft env.
+    """
+    env = make_stall_env(**env_kwargs)
+    try:
+        obs, info = env.reset(seed=seed, options={'ic': ic} if ic else None)
+        actions = np.zeros((max_steps, 2), dtype=np.float32)
+        n = 0
+        terminated = truncated = False
+        while not (terminated or truncated) and n < max_steps:
+            action, _ = policy.predict(obs, deterministic=True)
+            actions[n] = action  # Step with the stored float32 values so replays match exactly
+            obs, _, terminated, truncated, _ = env.step(actions[n])
+            n += 1
+    finally:
+        env.close()
+    # A pooled episode replays on a plain env of the airframe it flew
+    replay_kwargs = {k: v for k, v in env_kwargs.items() if k not in ('weights', 'stream', 'ic_sampler')}
+    replay_kwargs['aircraft'] = info.get('aircraft', env_kwargs.get('aircraft', 'B747'))
+    if isinstance(replay_kwargs.get('reward_spec'), RewardSpec):
+        replay_kwargs['reward_spec'] = replay_kwargs['reward_spec'].to_dict()  # Stored as JSON
+    return Replay(info['ic'], actions[:n], seed=seed, env_kwargs=replay_kwargs)
+
+
+def simulate(replay, recorder=None, env=None, episode=0):
+    """
+    Re-simulate a replay headlessly, as fast as JSBSim runs.
+
+    Args:
+        replay (Replay): Episode to re-run.
+        recorder (FlightRecorder, optional): Receives the telemetry; a new
+            one is created when omitted.
+        env (CustomStallRecoveryEnv, optional): Environment to reuse; it
+            must match ``replay.env_kwargs``.
+        episode (int): Episode number written to the telemetry.
+
+    Returns:
+        np.ndarray: The replayed ``TELEMETRY_DTYPE`` rows. The row of a step
+            that terminated the episode is tagged ``STATUS_RECOVERED`` or
+            ``STATUS_CRASHED``.
+    """
+    recorder = recorder if recorder is not None else FlightRecorder(capacity=max(len(replay), 1))
+    owned = env is None
+    env = env if env is not None else CustomStallRecoveryEnv(**replay.env_kwargs)
+    start = len(recorder)
+    try:
+        env.reset(options={'ic': replay.ic})
+        decision_dt = env.dt * env.action_repeat
+        for step, action in enumerate(replay.actions):
+            obs, reward, terminated, truncated, _ = env.step(action)
+            if terminated:
+                # The env only terminates on a crash or a completed recovery
+                status = STATUS_CRASHED if obs[OBS_ALT] <= env.reward_spec.crash_altitude else STATUS_RECOVERED
+            else:
+                status = STATUS_STALL if obs[OBS_ALPHA] > env.critical_alpha else STATUS_NORMAL
+            recorder.record(obs, action, reward, status, episode=episode, step=step,
+                            time=(step + 1) * decision_dt)
+            if terminated or truncated:
+                break
+    finally:
+        if owned:
+            env.close()
+    return recorder.data[start:]
+
+
+def save_replays(path, replays):
+    """
+    Store replays in one compressed ``.npz`` file.
+
+    Actions of all episodes are concatenated into a single (N, 2) float32
+    array with per-episode offsets; initial conditions form an (E, 6) array.
+    """
+    lengths = np.array([len(r) for r in replays], dtype=np.int64)
+    np.savez_compressed(
+        path,
+        actions=np.concatenate([r.actions for r in replays]) if replays else np.zeros((0, 2), np.float32),
+        offsets=np.concatenate(([0], np.cumsum(lengths))),
+        ics=np.array([[r.ic[name] for name in IC_NAMES] for r in replays], dtype=np.float64).reshape(-1, 6),
+        seeds=np.array([-1 if r.seed is None else r.seed for r in replays], dtype=np.int64),
+        env_kwargs=json.dumps([r.env_kwargs for r in replays]),
+    )
+
+
+def load_replays(path):
+    """Load the replays written by ``save_replays``."""
+    # Every NpzFile lookup decompresses the array again; read each one once
+    with np.load(path) as data:
+        actions, offsets, ics, seeds = data['actions'], data['offsets'], data['ics'], data['seeds']
+        env_kwargs = json.loads(str(data['env_kwargs']))
+    return [
+        Replay(dict(zip(IC_NAMES, ics[i].tolist())), actions[offsets[i]:offsets[i + 1]],
+               seed=None if seeds[i] < 0 else int(seeds[i]), env_kwargs=env_kwargs[i])
+        for i in range(len(offsets) - 1)
+    ]
+
+
+def diff_trajectories(telemetry_a, telemetry_b, fields=DIFF_FIELDS, tolerance=1e-3):
+    """
+    Compare two trajectories step by step over their common length.
+
+    Returns:
+        dict: Per-field maximum absolute difference, the first step where
+            any field differs by more than ``tolerance`` (-1 if none) and
+            both lengths.
+    """
+    n = min(len(telemetry_a), len(telemetry_b))
+    diffs = np.stack([np.abs(telemetry_a[f][:n].astype(np.float64) - telemetry_b[f][:n]) for f in fields])
+    diverged = np.flatnonzero((diffs > tolerance).any(axis=0))
+    if not len(diverged) and len(telemetry_a) != len(telemetry_b):
+        first = n  # Identical until one episode ended
+    else:
+        first = int(diverged[0]) if len(diverged) else -1
+    return {
+        'steps_a': len(telemetry_a),
+        'steps_b': len(telemetry_b),
+        'first_divergence': first,
+        'max_diff': {f: float(d.max()) if n else 0.0 for f, d in zip(fields, diffs)},
+    }
+
+
+def _recovered(telemetry):
+    # simulate tags a terminating step, whatever the step count
+    return len(telemetry) > 0 and telemetry['status'][-1] == STATUS_RECOVERED
+
+
+def diff_policies(policy_a, policy_b, seeds, max_steps=600, tolerance=1e-3, **env_kwargs):
+    """
+    Fly two policies from identical initial conditions and compare them.
+
+    The environment RNG is seeded per episode, so both policies start from
+    the same sampled initial condition (and airframe) for each seed.
+
+    Returns:
+        tuple: ``(diffs, replays_a, replays_b)`` with one ``DIFF_DTYPE`` row
+            per seed and the recorded replays of both policies.
+    """
+    seeds = list(seeds)
+    diffs = np.zeros(len(seeds), dtype=DIFF_DTYPE)
+    replays_a, replays_b = [], []
+    for i, seed in enumerate(seeds):
+        replay_a = record_episode(policy_a, seed=seed, max_steps=max_steps, **env_kwargs)
+        replay_b = record_episode(policy_b, seed=seed, max_steps=max_steps, **env_kwargs)
+        telemetry_a, telemetry_b = simulate(replay_a), simulate(replay_b)
+        result = diff_trajectories(telemetry_a, telemetry_b, tolerance=tolerance)
+
+        row = diffs[i]
+        row['seed'] = seed
+        row['steps_a'], row['steps_b'] = result['steps_a'], result['steps_b']
+        row['recovered_a'] = _recovered(telemetry_a)
+        row['recovered_b'] = _recovered(telemetry_b)
+        row['reward_a'] = telemetry_a['reward'].sum()
+        row['reward_b'] = telemetry_b['reward'].sum()
+        row['first_divergence'] = result['first_divergence']
+        row['max_alpha_diff'] = result['max_diff']['alpha']
+        row['max_altitude_diff'] = result['max_diff']['altitude']
+        replays_a.append(replay_a)
+        replays_b.append(replay_b)
+    return diffs, replays_a, replays_b
+
+
+def main():
+    """Record, replay and diff stall recovery episodes."""
+    from normalization import load_model
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    record = commands.add_parser('record', help="record seeded episodes of a policy")
+    record.add_argument('--model', default='stall_recovery_agent')
+    record.add_argument('--episodes', type=int, default=10)
+    record.add_argument('--seed', type=int, default=0)
+    record.add_argument('--max-steps', type=int, default=600)
+    record.add_argument('--output', default='replays.npz')
+
+    play = commands.add_parser('play', help="re-simulate stored replays into a flight log")
+    play.add_argument('replays')
+    play.add_argument('--episode', type=int, nargs='+', default=None, help="replay indices (default: all)")
+    play.add_argument('--output', default=None, help="flight log directory for the telemetry")
+
+    diff = commands.add_parser('diff', help="compare two policies from the same initial conditions")
+    diff.add_argument('model_a')
+    diff.add_argument('model_b')
+    diff.add_argument('--episodes', type=int, default=10)
+    diff.add_argument('--seed', type=int, default=0)
+    diff.add_argument('--max-steps', type=int, default=600)
+    diff.add_argument('--tolerance', type=float, default=1e-3)
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        model = load_model(args.model)
+        replays = [record_episode(model, seed=s, max_steps=args.max_steps)
+                   for s in range(args.seed, args.seed + args.episodes)]
+        save_replays(args.output, replays)
+        print(f"Recorded {len(replays)} episodes ({sum(map(len, replays))} steps) to {args.output}")
+    elif args.command == 'play':
+        replays = load_replays(args.replays)
+        recorder = FlightRecorder(path=args.output)
+        for i in args.episode if args.episode is not None else range(len(replays)):
+            telemetry = simulate(replays[i], recorder=recorder, episode=i)
+            print(f"Episode {i}: {len(telemetry)} steps, reward {telemetry['reward'].sum():.2f}, "
+                  f"final altitude {telemetry['altitude'][-1]:.1f} ft")
+        if args.output:
+            recorder.close()
+            print(f"Wrote {len(recorder)} telemetry rows to {args.output}")
+    else:
+        diffs, _, _ = diff_policies(load_model(args.model_a), load_model(args.model_b),
+                                    range(args.seed, args.seed + args.episodes),
+                                    max_steps=args.max_steps, tolerance=args.tolerance)
+        for row in diffs:
+            divergence = 'identical' if row['first_divergence'] < 0 else f"diverges at step {row['first_divergence']}"
+            print(f"Seed {row['seed']}: {divergence}, recovered {row['recovered_a']}/{row['recovered_b']}, "
+                  f"reward {row['reward_a']:.2f}/{row['reward_b']:.2f}, "
+                  f"max alpha diff {row['max_alpha_diff']:.3f} deg, "
+                  f"max altitude diff {row['max_altitude_diff']:.1f} ft")
+        changed = np.count_nonzero(diffs['recovered_a'] != diffs['recovered_b'])
+        print(f"{changed} of {len(diffs)} episodes changed outcome")
+
+
+if __name__ == "__main__":
+    main()
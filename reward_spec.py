@@ -0,0 +1,244 @@
+import argparse
+import json
+
+import numpy as np
+
+
+def stall_penalty(state):
+    """Degrees of angle of attack above the critical angle, negated."""
+    return -np.maximum(state['alpha'] - state['critical_alpha'], 0)
+
+
+def stalled(state):
+    """-1 for every frame above the critical angle."""
+    return -(state['alpha'] > state['critical_alpha']).astype(np.float64)
+
+
+def altitude_gain(state):
+    """Altitude change over the frame in feet."""
+    return state['altitude'] - state['prev_altitude']
+
+
+def elevator_effort(state):
+    """Magnitude of the elevator command, negated."""
+    return -np.abs(state['elevator'])
+
+
+def throttle_effort(state):
+    """Magnitude of the throttle command, negated."""
+    return -np.abs(state['throttle'])
+
+
+# Reward terms a spec can weight, by name. Each maps a dict of (N,) state
+# arrays to (N,) values.
+REWARD_TERMS = {
+    'stall': stall_penalty,
+    'stalled': stalled,
+    'altitude_gain': altitude_gain,
+    'elevator': elevator_effort,
+    'throttle': throttle_effort,
+}
+
+# The reward CustomStallRecoveryEnv has always used.
+DEFAULT_TERMS = {'stall': 1.0, 'altitude_gain': 0.1, 'elevator': 0.01}
+
+# One row per rescored episode.
+RESCORE_DTYPE = np.dtype([
+    ('episode', np.int32),
+    ('steps', np.int32),             # Rows up to and including the new termination
+    ('reward', np.float64),          # Return under the new spec
+    ('recorded_reward', np.float64), # Return stored in the telemetry
+    ('terminated', np.bool_),        # The new spec terminates within the recorded rows
+    ('recovered', np.bool_),
+])
+
+
+class RewardSpec:
+    """
+    Reward and termination of the stall recovery task as data.
+
+    The reward is a weighted sum of named ``REWARD_TERMS``; an episode
+    terminates on a crash (altitude at or below ``crash_altitude``) or after
+    ``required_recovery_steps`` consecutive frames below the safe angle of
+    attack. Every method works on (N,) arrays, so the same spec scores a
+    single env frame, a batch of lockstep envs and whole flight logs.
+    """
+
+    def __init__(self, terms=None, required_recovery_steps=10, crash_altitude=0.0):
+        """
+        Args:
+            terms (dict, optional): Weight per ``REWARD_TERMS`` name;
+                defaults to ``DEFAULT_TERMS``.
+            required_recovery_steps (int): Consecutive frames below the safe
+                angle that count as a recovery.
+            crash_altitude (float): Altitude in feet at or below which the
+                aircraft has crashed.
+        """
+        terms = dict(DEFAULT_TERMS if terms is None else terms)
+        unknown = set(terms) - set(REWARD_TERMS)
+        if unknown:
+            raise ValueError(f"Unknown reward terms: {sorted(unknown)}")
+        self.terms = {name: float(weight) for name, weight in terms.items()}
+        self.required_recovery_steps = int(required_recovery_steps)
+        self.crash_altitude = float(crash_altitude)
+        self._weighted = [(REWARD_TERMS[name], weight) for name, weight in self.terms.items() if weight]
+
+    def to_dict(self):
+        return {'terms': self.terms, 'required_recovery_steps': self.required_recovery_steps,
+                'crash_altitude': self.crash_altitude}
+
+    @classmethod
+    def from_dict(cls, spec):
+        return cls(**spec)
+
+    def reward(self, state):
+        """
+        Weighted sum of the reward terms.
+
+        Args:
+            state (dict): ``alpha``, ``altitude``, ``prev_altitude``,
+                ``elevator``, ``throttle`` and ``critical_alpha`` arrays or
+                scalars, broadcastable against each other.
+
+        Returns:
+            np.ndarray: The reward of every frame.
+        """
+        reward = 0.0
+        for term, weight in self._weighted:
+            reward = reward + weight * term(state)
+        return reward
+
+    def step(self, alpha, altitude, prev_altitude, actions, recovery_counter, critical_alpha, safe_alpha):
+        """
+        Reward and termination of one physics frame.
+
+        Args:
+            alpha, altitude, prev_altitude: Angle of attack and altitude
+                after the frame, and altitude before it.
+            actions (np.ndarray): (2,) or (N, 2) elevator and throttle
+                commands applied during the frame.
+            recovery_counter: Consecutive safe frames before this one.
+            critical_alpha (float): Stall angle of attack in degrees.
+            safe_alpha (float): Recovered angle of attack in degrees.
+
+        Returns:
+            tuple: ``(reward, terminated, recovery_counter)`` with the
+                updated counter.
+        """
+        actions = np.asarray(actions, dtype=np.float64)
+        reward = self.reward({
+            'alpha': alpha, 'altitude': altitude, 'prev_altitude': prev_altitude,
+            'elevator': actions[..., 0], 'throttle': actions[..., 1], 'critical_alpha': critical_alpha,
+        })
+        crashed = altitude <= self.crash_altitude
+        recovery_counter = np.where(crashed, recovery_counter, np.where(alpha < safe_alpha, recovery_counter + 1, 0))
+        return reward, crashed | (recovery_counter >= self.required_recovery_steps), recovery_counter
+
+    def rescore(self, telemetry, critical_alpha, safe_alpha, initial_altitude=None):
+        """
+        Score recorded trajectories under this spec without re-simulating.
+
+        Rows are grouped by the ``episode`` column and must be in step order
+        within each episode. Telemetry holds one row per agent step, so the
+        result matches a live run exactly when it was recorded with
+        ``action_repeat=1``. Rows after the new termination are ignored;
+        an episode the recording cut short of the new termination is
+        scored over the rows it has.
+
+        Args:
+            telemetry: ``TELEMETRY_DTYPE`` rows, a ``FlightRecorder`` buffer
+                or the columns of ``open_flight_log``.
+            critical_alpha (float): Stall angle of attack in degrees.
+            safe_alpha (float): Recovered angle of attack in degrees.
+            initial_altitude (float or np.ndarray, optional): Altitude at
+                reset, per episode; the first row's altitude when omitted,
+                so the first step earns no altitude gain.
+
+        Returns:
+            tuple: ``(rewards, episodes)`` with the new reward of every row
+                and one ``RESCORE_DTYPE`` row per episode.
+        """
+        episode = np.asarray(telemetry['episode'])
+        n = len(episode)
+        if n == 0:
+            return np.zeros(0), np.zeros(0, dtype=RESCORE_DTYPE)
+        alpha = np.asarray(telemetry['alpha'], dtype=np.float64)
+        altitude = np.asarray(telemetry['altitude'], dtype=np.float64)
+        new_episode = np.ones(n, dtype=bool)
+        new_episode[1:] = episode[1:] != episode[:-1]
+        starts = np.flatnonzero(new_episode)
+        stops = np.append(starts[1:], n)
+
+        prev_altitude = np.empty(n)
+        prev_altitude[1:] = altitude[:-1]
+        prev_altitude[starts] = altitude[starts] if initial_altitude is None else initial_altitude
+        rewards = self.reward({
+            'alpha': alpha, 'altitude': altitude, 'prev_altitude': prev_altitude,
+            'elevator': np.asarray(telemetry['elevator_cmd'], dtype=np.float64),
+            'throttle': np.asarray(telemetry['throttle_cmd'], dtype=np.float64),
+            'critical_alpha': critical_alpha,
+        }) * np.ones(n)
+
+        # Recovery counter: length of the run of safe rows ending at each row
+        row = np.arange(n)
+        safe = alpha < safe_alpha
+        episode_start = np.maximum.accumulate(np.where(new_episode, row, 0))
+        last_unsafe = np.maximum.accumulate(np.where(safe, -1, row))
+        counter = np.where(safe, row - np.maximum(last_unsafe, episode_start - 1), 0)
+        crashed = altitude <= self.crash_altitude
+        terminated = crashed | (counter >= self.required_recovery_steps)
+
+        first = np.minimum.reduceat(np.where(terminated, row, n), starts)
+        ended = first < stops
+        last = np.where(ended, first, stops - 1)
+        kept = row <= last[np.cumsum(new_episode) - 1]
+
+        episodes = np.zeros(len(starts), dtype=RESCORE_DTYPE)
+        episodes['episode'] = episode[starts]
+        episodes['steps'] = last - starts + 1
+        episodes['reward'] = np.add.reduceat(np.where(kept, rewards, 0), starts)
+        episodes['recorded_reward'] = np.add.reduceat(np.asarray(telemetry['reward'], dtype=np.float64), starts)
+        episodes['terminated'] = ended
+        episodes['recovered'] = ended & ~crashed[last]
+        return rewards, episodes
+
+
+DEFAULT_REWARD_SPEC = RewardSpec()
+
+
+def as_reward_spec(spec=None):
+    """A ``RewardSpec`` from a spec, its ``to_dict`` form or None for the default."""
+    if spec is None:
+        return DEFAULT_REWARD_SPEC
+    return RewardSpec.from_dict(spec) if isinstance(spec, dict) else spec
+
+
+def main():
+    """Re-score a recorded flight log under a new reward specification."""
+    from AircraftSHAgent import AIRCRAFT_ALPHA_LIMITS, DEFAULT_ALPHA_LIMITS
+    from flight_recorder import open_flight_log
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('log', help="flight log directory")
+    parser.add_argument('--spec', default=None,
+                        help="JSON file with 'terms', 'required_recovery_steps' and 'crash_altitude'")
+    parser.add_argument('--aircraft', default='B747', help="aircraft the log was flown with")
+    args = parser.parse_args()
+
+    spec = DEFAULT_REWARD_SPEC
+    if args.spec:
+        with open(args.spec) as f:
+            spec = RewardSpec.from_dict(json.load(f))
+    critical_alpha, safe_alpha = AIRCRAFT_ALPHA_LIMITS.get(args.aircraft, DEFAULT_ALPHA_LIMITS)
+    _, episodes = spec.rescore(open_flight_log(args.log), critical_alpha, safe_alpha)
+    if not len(episodes):
+        print("The flight log is empty")
+        return
+    print(f"Rescored {len(episodes)} episodes under {json.dumps(spec.to_dict())}")
+    print(f"Mean return: recorded {episodes['recorded_reward'].mean():.2f}, new {episodes['reward'].mean():.2f}")
+    print(f"Recovered under the new spec: {episodes['recovered'].mean():.1%}, "
+          f"mean length {episodes['steps'].mean():.1f} steps")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from AircraftSHAgent import BASE_IC, IC_NAMES, CustomStallRecoveryEnv
+from batch_eval import EPISODE_DTYPE, run_episodes, summarize
+from normalization import load_model, stats_path
+from reward_spec import DEFAULT_REWARD_SPEC, RewardSpec
+
+# Initial conditions a sweep can vary, with the value used when a sweep
+# leaves one out. Heading is always the nominal one.
+SWEEP_DIMS = ('alpha', 'vc', 'theta', 'altitude', 'roll')
+SWEEP_DEFAULTS = {name: BASE_IC[IC_NAMES.index(name)] for name in SWEEP_DIMS}
+OUTCOME_FIELDS = ('recovered', 'crashed', 'steps', 'time_to_recovery', 'altitude_loss',
+                  'steps_above_critical', 'reward')
+
+# One row per sweep point: the initial condition and its episode outcome.
+SWEEP_DTYPE = np.dtype(
+    [('aircraft', 'U32')]
+    + [(name, np.float64) for name in SWEEP_DIMS]
+    + [(name, EPISODE_DTYPE[name]) for name in OUTCOME_FIELDS]
+)
+
+# Env arguments that cannot change an episode's outcome.
+_UNKEYED_ENV_KWARGS = ('use_cache', 'stream', 'ic_sampler')
+
+# Per-process state set up by _init_worker.
+_MODEL = None
+
+
+def grid(aircraft=('B747',), **values):
+    """
+    Full factorial sweep points.
+
+    Args:
+        aircraft (sequence[str]): Aircraft models to sweep.
+        **values: One sequence (or scalar) of values per ``SWEEP_DIMS`` name;
+            dimensions left out stay at ``SWEEP_DEFAULTS``.
+
+    Returns:
+        np.ndarray: ``SWEEP_DTYPE`` rows with the outcome fields zeroed.
+    """
+    unknown = set(values) - set(SWEEP_DIMS)
+    if unknown:
+        raise ValueError(f"Unknown sweep dimensions: {sorted(unknown)}")
+    axes = [np.atleast_1d(np.asarray(values.get(name, SWEEP_DEFAULTS[name]), dtype=np.float64))
+            for name in SWEEP_DIMS]
+    aircraft = list(aircraft)
+    mesh = np.meshgrid(np.arange(len(aircraft)), *axes, indexing='ij')
+    points = np.zeros(mesh[0].size, dtype=SWEEP_DTYPE)
+    points['aircraft'] = np.asarray(aircraft)[mesh[0].ravel()]
+    for name, column in zip(SWEEP_DIMS, mesh[1:]):
+        points[name] = column.ravel()
+    return points
+
+
+def latin_hypercube(n_points, ranges, aircraft=('B747',), seed=0):
+    """
+    Latin-hypercube sweep points: each range is split into ``n_points``
+    strata and every stratum is sampled exactly once.
+
+    Args:
+        n_points (int): Points per aircraft.
+        ranges (dict): ``{name: (low, high)}`` for the ``SWEEP_DIMS`` to
+            vary; the others stay at ``SWEEP_DEFAULTS``.
+        aircraft (sequence[str]): Aircraft models to sweep.
+        seed (int): Seed for the stratum order and the offsets within them.
+
+    Returns:
+        np.ndarray: ``SWEEP_DTYPE`` rows with the outcome fields zeroed.
+    """
+    unknown = set(ranges) - set(SWEEP_DIMS)
+    if unknown:
+        raise ValueError(f"Unknown sweep dimensions: {sorted(unknown)}")
+    rng = np.random.default_rng(seed)
+    aircraft = list(aircraft)
+    points = np.zeros(n_points * len(aircraft), dtype=SWEEP_DTYPE)
+    points['aircraft'] = np.repeat(aircraft, n_points)
+    for name in SWEEP_DIMS:
+        if name not in ranges:
+            points[name] = SWEEP_DEFAULTS[name]
+            continue
+        low, high = ranges[name]
+        for i in range(len(aircraft)):
+            strata = (rng.permutation(n_points) + rng.uniform(size=n_points)) / n_points
+            points[name][i * n_points:(i + 1) * n_points] = low + strata * (high - low)
+    return points
+
+
+def model_hash(model_path):
+    """
+    SHA-256 of a saved model file and its normalization statistics, so
+    retrained models never hit stale results.
+    """
+    paths = [model_path + '.zip' if not os.path.exists(model_path) and os.path.exists(model_path + '.zip')
+             else model_path]
+    if os.path.exists(stats_path(model_path)):
+        paths.append(stats_path(model_path))
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def _env_config(env_kwargs):
+    """Every outcome-relevant env argument, with defaults filled in."""
+    parameters = inspect.signature(CustomStallRecoveryEnv.__init__).parameters
+    config = {name: p.default for name, p in parameters.items() if p.default is not inspect.Parameter.empty}
+    config.update(env_kwargs or {})
+    for name in _UNKEYED_ENV_KWARGS + ('aircraft',):
+        config.pop(name, None)
+    # A custom reward spec can change when episodes terminate; the default
+    # is left out so existing cache keys stay valid
+    spec = config.pop('reward_spec', None)
+    if isinstance(spec, RewardSpec):
+        spec = spec.to_dict()
+    if spec is not None and spec != DEFAULT_REWARD_SPEC.to_dict():
+        config['reward_spec'] = spec
+    return config
+
+
+def point_key(model_digest, point, env_config, max_steps):
+    """Cache key of one sweep point: model, aircraft, rounded IC, env settings and horizon."""
+    ic = [round(float(point[name]), 6) for name in SWEEP_DIMS]
+    payload = json.dumps([model_digest, str(point['aircraft']), ic, env_config, max_steps], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResultCache:
+    """SQLite store of sweep outcomes keyed by ``point_key``."""
+
+    def __init__(self, path='sweep_cache.sqlite'):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        columns = ', '.join(f'{name} REAL' for name in OUTCOME_FIELDS)
+        self.db.execute(f'CREATE TABLE IF NOT EXISTS outcomes (key TEXT PRIMARY KEY, {columns})')
+
+    def get_many(self, keys):
+        """Return ``{key: outcome tuple}`` for the keys that are cached."""
+        found = {}
+        keys = list(keys)
+        for i in range(0, len(keys), 500):  # Stay under SQLite's parameter limit
+            chunk = keys[i:i + 500]
+            rows = self.db.execute(
+                f"SELECT key, {', '.join(OUTCOME_FIELDS)} FROM outcomes "
+                f"WHERE key IN ({', '.join('?' * len(chunk))})", chunk)
+            found.update((row[0], row[1:]) for row in rows)
+        return found
+
+    def put_many(self, keys, outcomes):
+        placeholders = ', '.join('?' * (len(OUTCOME_FIELDS) + 1))
+        with self.db:
+            self.db.executemany(
+                f'INSERT OR REPLACE INTO outcomes VALUES ({placeholders})',
+                [(key, *(float(row[name]) for name in OUTCOME_FIELDS)) for key, row in zip(keys, outcomes)])
+
+    def close(self):
+        self.db.close()
+
+
+def _init_worker(model_path):
+    """Load the policy once per worker process."""
+    global _MODEL
+    _MODEL = load_model(model_path)
+
+
+def _run_points(points, n_envs, max_steps, env_kwargs):
+    """Simulate sweep points of a single aircraft with the worker's policy."""
+    ics = [{name: float(point[name]) for name in SWEEP_DIMS} for point in points]
+    env_kwargs = dict(env_kwargs or {}, aircraft=str(points[0]['aircraft']))
+    # The seed is irrelevant with every initial condition fixed
+    return run_episodes(_MODEL, [0] * len(points), n_envs=n_envs, max_steps=max_steps,
+                        env_kwargs=env_kwargs, ics=ics)
+
+
+def run_sweep(points, model_path='stall_recovery_agent', cache_path='sweep_cache.sqlite', n_workers=None,
+              n_envs=8, max_steps=600, env_kwargs=None, chunk_size=None, verbose=1):
+    """
+    Evaluate a policy on every sweep point, simulating only uncached ones.
+
+    The initial conditions are fully fixed, so each point's outcome is
+    deterministic and can be reused by any later sweep with the same model
+    file, env settings and ``max_steps``.
+
+    Args:
+        points (np.ndarray): ``SWEEP_DTYPE`` rows from ``grid`` or
+            ``latin_hypercube``.
+        model_path (str): Path to the saved PPO model.
+        cache_path (str): SQLite cache file, or None to disable caching.
+        n_workers (int, optional): Worker processes. Defaults to the CPU count.
+        n_envs (int): Environments stepped in lockstep inside each worker.
+        max_steps (int): Agent steps before an episode counts as unrecovered.
+        env_kwargs (dict, optional): Keyword arguments for
+            ``CustomStallRecoveryEnv`` other than ``aircraft``.
+        chunk_size (int, optional): Points per task.
+        verbose (int): Verbosity level.
+
+    Returns:
+        np.ndarray: ``points`` with the outcome fields filled in.
+    """
+    results = points.copy()
+    digest = model_hash(model_path)
+    env_config = _env_config(env_kwargs)
+    keys = [point_key(digest, point, env_config, max_steps) for point in results]
+    cache = ResultCache(cache_path) if cache_path else None
+    try:
+        cached = cache.get_many(set(keys)) if cache else {}
+        pending = []
+        for i, key in enumerate(keys):
+            if key in cached:
+                for name, value in zip(OUTCOME_FIELDS, cached[key]):
+                    results[i][name] = value
+            else:
+                pending.append(i)
+        if verbose:
+            print(f"{len(results) - len(pending)} of {len(results)} points cached, simulating {len(pending)}")
+
+        if pending:
+            n_workers = n_workers or os.cpu_count() or 1
+            chunk_size = chunk_size or max(n_envs, -(-len(pending) // (n_workers * 4)))
+            chunks = []
+            for aircraft in np.unique(results['aircraft'][pending]):
+                indices = [i for i in pending if results[i]['aircraft'] == aircraft]
+                chunks += [indices[i:i + chunk_size] for i in range(0, len(indices), chunk_size)]
+
+            start_time = time.perf_counter()
+            with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                     initargs=(model_path,)) as pool:
+                futures = [pool.submit(_run_points, results[chunk], n_envs, max_steps, env_kwargs)
+                           for chunk in chunks]
+                for chunk, future in zip(chunks, futures):
+                    outcomes = future.result()
+                    for name in OUTCOME_FIELDS:
+                        results[name][chunk] = outcomes[name]
+                    if cache:
+                        cache.put_many([keys[i] for i in chunk], outcomes)
+            if verbose:
+                print(f"Simulated {len(pending)} points in {time.perf_counter() - start_time:.1f}s")
+    finally:
+        if cache:
+            cache.close()
+    return results
+
+
+def envelope(results, x='alpha', y='vc', metric='recovered', bins=None):
+    """
+    Pivot sweep results onto two axes, averaging over every other dimension.
+
+    Args:
+        results (np.ndarray): ``SWEEP_DTYPE`` rows from ``run_sweep``.
+        x (str): Dimension for the horizontal axis.
+        y (str): Dimension for the vertical axis.
+        metric (str): Outcome field to average.
+        bins (int, optional): Bin each axis into this many intervals instead
+            of using its distinct values (needed for Latin-hypercube sweeps).
+
+    Returns:
+        tuple: ``(x_values, y_values, grid)`` with ``grid`` of shape
+            (len(y_values), len(x_values)); empty cells are NaN.
+    """
+    values = results[metric].astype(np.float64)
+    if bins:
+        x_edges = np.linspace(results[x].min(), results[x].max(), bins + 1)
+        y_edges = np.linspace(results[y].min(), results[y].max(), bins + 1)
+        x_index = np.clip(np.searchsorted(x_edges, results[x], side='right') - 1, 0, bins - 1)
+        y_index = np.clip(np.searchsorted(y_edges, results[y], side='right') - 1, 0, bins - 1)
+        x_values = (x_edges[:-1] + x_edges[1:]) / 2
+        y_values = (y_edges[:-1] + y_edges[1:]) / 2
+    else:
+        x_values, x_index = np.unique(results[x], return_inverse=True)
+        y_values, y_index = np.unique(results[y], return_inverse=True)
+    total = np.zeros((len(y_values), len(x_values)))
+    counts = np.zeros_like(total)
+    np.add.at(total, (y_index, x_index), values)
+    np.add.at(counts, (y_index, x_index), 1)
+    with np.errstate(invalid='ignore'):
+        return x_values, y_values, total / counts
+
+
+def plot_envelope(results, path, x='alpha', y='vc', metric='recovered', bins=None):
+    """Write a recovery-envelope heatmap of ``envelope`` to an image file."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    x_values, y_values, grid_values = envelope(results, x=x, y=y, metric=metric, bins=bins)
+    figure = Figure(figsize=(7, 5))
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot(111)
+    image = ax.pcolormesh(x_values, y_values, grid_values, shading='nearest', cmap='RdYlGn',
+                          **({'vmin': 0, 'vmax': 1} if metric == 'recovered' else {}))
+    figure.colorbar(image, ax=ax, label='Recovery rate' if metric == 'recovered' else metric)
+    ax.set_xlabel(x)
+    ax.set_ylabel(y)
+    aircraft = ', '.join(np.unique(results['aircraft']))
+    ax.set_title(f'Recovery Envelope ({aircraft}, {len(results)} points)')
+    figure.savefig(path, dpi=120, bbox_inches='tight')
+
+
+def _dimension_spec(values):
+    """Split a CLI value list into a fixed value, a (low, high) range or a grid axis."""
+    if len(values) == 1:
+        return values[0]
+    if len(values) == 2:
+        return tuple(values)
+    if len(values) == 3:
+        return tuple(values[:2]) + (int(values[2]),)
+    raise argparse.ArgumentTypeError("expected VALUE, LOW HIGH or LOW HIGH N")
+
+
+def main():
+    """Sweep initial conditions, cache outcomes and plot the recovery envelope."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--model', default='stall_recovery_agent')
+    for name in SWEEP_DIMS:
+        parser.add_argument(f'--{name}', type=float, nargs='+', default=None,
+                            help=f"VALUE, LOW HIGH (Latin hypercube) or LOW HIGH N (grid); "
+                                 f"default {SWEEP_DEFAULTS[name]:g}")
+    parser.add_argument('--aircraft', nargs='+', default=['B747'])
+    parser.add_argument('--lhs', type=int, default=None,
+                        help="draw this many Latin-hypercube points per aircraft instead of a grid")
+    parser.add_argument('--seed', type=int, default=0, help="Latin-hypercube seed")
+    parser.add_argument('--cache', default='sweep_cache.sqlite')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--envs-per-worker', type=int, default=8)
+    parser.add_argument('--max-steps', type=int, default=600)
+    parser.add_argument('--x', default='alpha', choices=SWEEP_DIMS)
+    parser.add_argument('--y', default='vc', choices=SWEEP_DIMS)
+    parser.add_argument('--bins', type=int, default=None, help="heatmap bins per axis (default: 10 with --lhs)")
+    parser.add_argument('--heatmap', default='recovery_envelope.png')
+    parser.add_argument('--output', default=None, help="write the per-point results to this .npy file")
+    args = parser.parse_args()
+
+    specs = {name: _dimension_spec(getattr(args, name)) for name in SWEEP_DIMS
+             if getattr(args, name) is not None}
+    if args.lhs:
+        ranges = {name: spec[:2] for name, spec in specs.items() if isinstance(spec, tuple)}
+        points = latin_hypercube(args.lhs, ranges, aircraft=args.aircraft, seed=args.seed)
+        for name, spec in specs.items():
+            if not isinstance(spec, tuple):
+                points[name] = spec
+    else:
+        axes = {name: np.linspace(*spec) if isinstance(spec, tuple) and len(spec) == 3 else spec
+                for name, spec in specs.items()}
+        if any(isinstance(spec, tuple) and len(spec) == 2 for spec in axes.values()):
+            parser.error("LOW HIGH ranges need --lhs; give LOW HIGH N for a grid")
+        points = grid(aircraft=args.aircraft, **axes)
+
+    results = run_sweep(points, model_path=args.model, cache_path=args.cache, n_workers=args.workers,
+                        n_envs=args.envs_per_worker, max_steps=args.max_steps)
+    print(json.dumps(summarize(results), indent=2))
+    if args.output:
+        np.save(args.output, results)
+    if args.heatmap:
+        plot_envelope(results, args.heatmap, x=args.x, y=args.y,
+                      bins=args.bins or (10 if args.lhs else None))
+        print(f"Wrote {args.heatmap}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import numpy as np
+
+# Stall boundary of CustomStallRecoveryEnv for the B747 (degrees).
+CRITICAL_ALPHA = 15.0
+SAFE_ALPHA = 10.0
+
+# One row per stall event: a run of consecutive steps with alpha above the
+# critical angle, followed by the recovery window until alpha is back below
+# the safe angle.
+STALL_EVENT_DTYPE = np.dtype([
+    ('episode', np.int32),
+    ('start', np.int64),              # First telemetry row above critical alpha
+    ('stop', np.int64),               # Row after the last one above critical alpha
+    ('entry_time', np.float64),
+    ('duration', np.float64),         # Seconds above critical alpha
+    ('peak_alpha', np.float64),
+    ('recovered', np.bool_),          # Alpha got below the safe angle in the same episode
+    ('recovery_time', np.float64),    # Entry to safe alpha in seconds; NaN if not recovered
+    ('altitude_loss', np.float64),    # Entry altitude minus the lowest altitude until recovery
+    ('elevator_effort', np.float64),  # Integral of |elevator command| until recovery
+    ('throttle_effort', np.float64),  # Integral of |throttle command| until recovery
+])
+
+
+def _segment_reduce(ufunc, values, starts, stops):
+    """Apply ``ufunc.reduceat`` to each ``values[starts[i]:stops[i]]`` in one call."""
+    bounds = np.empty(2 * len(starts), dtype=np.int64)
+    bounds[0::2] = starts
+    bounds[1::2] = stops
+    padded = np.append(values, values[-1:])  # Keep stops == len(values) in range
+    return ufunc.reduceat(padded, bounds)[0::2]
+
+
+def find_stall_events(telemetry, critical_alpha=CRITICAL_ALPHA, safe_alpha=SAFE_ALPHA, dt=None):
+    """
+    Segment telemetry into discrete stall events.
+
+    Works on any number of episodes at once: rows are grouped by the
+    ``episode`` column and must be in step order within each episode.
+    Runs are found with a single boolean edge detection and every
+    per-event statistic is one ``reduceat`` over all events.
+
+    Args:
+        telemetry (np.ndarray): ``TELEMETRY_DTYPE`` rows, e.g. a
+            ``FlightRecorder`` buffer or a memory-mapped flight log.
+        critical_alpha (float): Angle of attack above which a step stalls.
+        safe_alpha (float): Angle of attack below which a stall is recovered.
+        dt (float, optional): Seconds per row. Defaults to the median time
+            step of the telemetry.
+
+    Returns:
+        np.ndarray: ``STALL_EVENT_DTYPE`` rows in telemetry order.
+    """
+    n = len(telemetry)
+    if n == 0:
+        return np.zeros(0, dtype=STALL_EVENT_DTYPE)
+    episode = telemetry['episode']
+    alpha = telemetry['alpha']
+    time = telemetry['time'].astype(np.float64)
+    if dt is None:
+        steps = np.diff(time)[episode[1:] == episode[:-1]]
+        dt = float(np.median(steps)) if len(steps) else 0.0
+
+    new_episode = np.ones(n, dtype=bool)
+    new_episode[1:] = episode[1:] != episode[:-1]
+    stalled = alpha > critical_alpha
+    # Run edges: a stalled row whose predecessor (in the same episode) is not
+    starts = np.flatnonzero(stalled & ~(np.r_[False, stalled[:-1]] & ~new_episode))
+    ends = np.flatnonzero(stalled & ~(np.r_[stalled[1:], False] & ~np.r_[new_episode[1:], True]))
+    stops = ends + 1
+
+    events = np.zeros(len(starts), dtype=STALL_EVENT_DTYPE)
+    if not len(starts):
+        return events
+
+    # Recovery: the first row at or after the run with alpha below the safe angle
+    row = np.arange(n)
+    next_safe = np.minimum.accumulate(np.where(alpha < safe_alpha, row, n)[::-1])[::-1]
+    episode_starts = np.flatnonzero(new_episode)
+    episode_stops = np.append(episode_starts[1:], n)[np.searchsorted(episode_starts, starts, side='right') - 1]
+    recovery = next_safe[np.minimum(stops, n - 1)]
+    recovered = (stops < n) & (recovery < episode_stops)
+    window_stops = np.where(recovered, recovery + 1, episode_stops)
+
+    # The window includes the row before entry, whose altitude is the reference
+    window_starts = np.where(new_episode[starts], starts, starts - 1)
+    altitude = telemetry['altitude'].astype(np.float64)
+
+    events['episode'] = episode[starts]
+    events['start'] = starts
+    events['stop'] = stops
+    events['entry_time'] = time[starts]
+    events['duration'] = (stops - starts) * dt
+    events['peak_alpha'] = _segment_reduce(np.maximum, alpha.astype(np.float64), starts, stops)
+    events['recovered'] = recovered
+    events['recovery_time'] = np.where(recovered, (recovery - starts) * dt, np.nan)
+    events['altitude_loss'] = altitude[window_starts] - _segment_reduce(np.minimum, altitude, window_starts,
+                                                                        window_stops)
+    events['elevator_effort'] = _segment_reduce(
+        np.add, np.abs(telemetry['elevator_cmd'].astype(np.float64)), starts, window_stops) * dt
+    events['throttle_effort'] = _segment_reduce(
+        np.add, np.abs(telemetry['throttle_cmd'].astype(np.float64)), starts, window_stops) * dt
+    return events
+
+
+def summarize_events(events):
+    """
+    Aggregate stall events into summary metrics.
+
+    Args:
+        events (np.ndarray): ``STALL_EVENT_DTYPE`` rows.
+
+    Returns:
+        dict: Event counts, duration, peak alpha, recovery, altitude loss
+            and control effort statistics.
+    """
+    recovered = events['recovered']
+    recovery_time = events['recovery_time'][recovered]
+
+    def mean(values):
+        return float(values.mean()) if len(values) else None
+
+    def percentile(values, q):
+        return float(np.percentile(values, q)) if len(values) else None
+
+    return {
+        'events': int(len(events)),
+        'episodes_with_stall': int(len(np.unique(events['episode']))),
+        'recovery_rate': mean(recovered),
+        'duration_mean': mean(events['duration']),
+        'duration_p95': percentile(events['duration'], 95),
+        'peak_alpha_mean': mean(events['peak_alpha']),
+        'peak_alpha_max': float(events['peak_alpha'].max()) if len(events) else None,
+        'recovery_time_mean': mean(recovery_time),
+        'recovery_time_p50': percentile(recovery_time, 50),
+        'recovery_time_p95': percentile(recovery_time, 95),
+        'altitude_loss_mean': mean(events['altitude_loss']),
+        'altitude_loss_max': float(events['altitude_loss'].max()) if len(events) else None,
+        'elevator_effort_mean': mean(events['elevator_effort']),
+        'throttle_effort_mean': mean(events['throttle_effort']),
+    }
+
+
+# One row per episode with at least one stall event.
+EPISODE_STALL_DTYPE = np.dtype([
+    ('episode', np.int32),
+    ('events', np.int32),
+    ('stall_time', np.float64),
+    ('peak_alpha', np.float64),
+    ('altitude_loss', np.float64),
+    ('recovered', np.bool_),  # Every event in the episode recovered
+])
+
+
+def episode_table(events):
+    """
+    Per-episode totals of stall events.
+
+    Args:
+        events (np.ndarray): ``STALL_EVENT_DTYPE`` rows grouped by episode,
+            as returned by ``find_stall_events``.
+
+    Returns:
+        np.ndarray: ``EPISODE_STALL_DTYPE`` rows, one per stalled episode.
+    """
+    if not len(events):
+        return np.zeros(0, dtype=EPISODE_STALL_DTYPE)
+    first = np.flatnonzero(np.r_[True, events['episode'][1:] != events['episode'][:-1]])
+    table = np.zeros(len(first), dtype=EPISODE_STALL_DTYPE)
+    table['episode'] = events['episode'][first]
+    table['events'] = np.diff(np.append(first, len(events)))
+    table['stall_time'] = np.add.reduceat(events['duration'], first)
+    table['peak_alpha'] = np.maximum.reduceat(events['peak_alpha'], first)
+    table['altitude_loss'] = np.maximum.reduceat(events['altitude_loss'], first)
+    table['recovered'] = np.logical_and.reduceat(events['recovered'], first)
+    return table
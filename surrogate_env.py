@@ -0,0 +1,351 @@
+import argparse
+import json
+
+import numpy as np
+from stable_baselines3.common.vec_env import VecEnv
+
+from AircraftSHAgent import (
+    OBS_ALPHA,
+    OBS_ALT,
+    OBS_Q,
+    OBS_ROLL,
+    OBS_THETA,
+    OBS_THROTTLE,
+    OBS_VC,
+    CustomStallRecoveryEnv,
+)
+from reward_spec import DEFAULT_REWARD_SPEC
+
+# Observation entries the surrogate integrates as per-step deltas. Throttle
+# is not modelled: the observed value is the throttle command itself.
+STATE_DIMS = (OBS_ALPHA, OBS_VC, OBS_Q, OBS_THETA, OBS_ALT, OBS_ROLL)
+STATE_NAMES = ('alpha', 'vc', 'q', 'theta', 'altitude', 'roll')
+
+
+def collect_transitions(n_steps=50000, seed=0, policy=None, **env_kwargs):
+    """
+    Log (observation, action, next observation) transitions from JSBSim.
+
+    Args:
+        n_steps (int): Number of transitions to log.
+        seed (int): Seed for the actions and initial conditions.
+        policy (callable, optional): Maps an observation to an action;
+            uniform random actions are used when omitted.
+        **env_kwargs: Keyword arguments for ``CustomStallRecoveryEnv``.
+
+    Returns:
+        dict: ``obs``, ``actions``, ``next_obs`` and ``initial_obs`` arrays.
+    """
+    env = CustomStallRecoveryEnv(**env_kwargs)
+    rng = np.random.default_rng(seed)
+    n_obs = env.observation_space.shape[0]
+    obs_log = np.zeros((n_steps, n_obs), dtype=np.float32)
+    action_log = np.zeros((n_steps, 2), dtype=np.float32)
+    next_log = np.zeros((n_steps, n_obs), dtype=np.float32)
+    initial_obs = []
+
+    obs, _ = env.reset(seed=seed)
+    initial_obs.append(obs)
+    for i in range(n_steps):
+        action = rng.uniform(-1, 1, size=2).astype(np.float32) if policy is None else policy(obs)
+        next_obs, _, terminated, truncated, _ = env.step(action)
+        obs_log[i], action_log[i], next_log[i] = obs, action, next_obs
+        if terminated or truncated:
+            obs, _ = env.reset()
+            initial_obs.append(obs)
+        else:
+            obs = next_obs
+    env.close()
+    return {'obs': obs_log, 'actions': action_log, 'next_obs': next_log,
+            'initial_obs': np.array(initial_obs, dtype=np.float32)}
+
+
+def _features(obs, actions):
+    """Polynomial longitudinal features of the state and action, one row per sample."""
+    alpha = obs[:, OBS_ALPHA].astype(np.float64)
+    vc = obs[:, OBS_VC].astype(np.float64)
+    q = obs[:, OBS_Q].astype(np.float64)
+    theta = np.radians(obs[:, OBS_THETA].astype(np.float64))
+    roll = np.radians(obs[:, OBS_ROLL].astype(np.float64))
+    elevator = actions[:, 0].astype(np.float64)
+    throttle = actions[:, 1].astype(np.float64)
+    return np.column_stack([
+        alpha, vc, q, theta, roll, elevator, throttle,
+        alpha ** 2, vc ** 2, alpha * vc, alpha * elevator, vc * elevator,
+        vc * throttle, q * vc, np.sin(theta), np.cos(roll),
+    ])
+
+
+class SurrogateDynamics:
+    """
+    Ridge-regression model of the per-step change in the stall state.
+
+    ``predict`` advances any number of states at once with a single matrix
+    product.
+    """
+
+    def __init__(self, weights=None, mean=None, scale=None, initial_obs=None, dt=0.1):
+        self.weights = weights
+        self.mean = mean
+        self.scale = scale
+        self.initial_obs = initial_obs
+        self.dt = dt
+
+    def _design(self, obs, actions):
+        x = (_features(obs, actions) - self.mean) / self.scale
+        return np.column_stack([np.ones(len(x)), x])
+
+    def fit(self, obs, actions, next_obs, ridge=1e-3):
+        """
+        Fit the model to logged JSBSim transitions.
+
+        Returns:
+            SurrogateDynamics: ``self``.
+        """
+        features = _features(obs, actions)
+        self.mean = features.mean(axis=0)
+        self.scale = features.std(axis=0)
+        self.scale[self.scale == 0] = 1
+        x = self._design(obs, actions)
+        y = (next_obs[:, STATE_DIMS] - obs[:, STATE_DIMS]).astype(np.float64)
+        gram = x.T @ x + ridge * len(x) * np.eye(x.shape[1])
+        self.weights = np.linalg.solve(gram, x.T @ y)
+        return self
+
+    def predict(self, obs, actions):
+        """
+        Advance a batch of states by one step.
+
+        Args:
+            obs (np.ndarray): (N, 7) observations.
+            actions (np.ndarray): (N, 2) actions.
+
+        Returns:
+            np.ndarray: (N, 7) float32 next observations.
+        """
+        next_obs = obs.astype(np.float32, copy=True)
+        next_obs[:, STATE_DIMS] += (self._design(obs, actions) @ self.weights).astype(np.float32)
+        next_obs[:, OBS_THROTTLE] = actions[:, 1] * 100  # Convert to percentage
+        return next_obs
+
+    def save(self, path):
+        np.savez(path, weights=self.weights, mean=self.mean, scale=self.scale,
+                 initial_obs=self.initial_obs, dt=self.dt)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['weights'], data['mean'], data['scale'], data['initial_obs'], float(data['dt']))
+
+
+class SurrogateStallRecoveryVecEnv(VecEnv):
+    """
+    Batch of surrogate stall recovery episodes stepped with vectorized NumPy.
+
+    Observation space, action space, reward and termination match
+    ``CustomStallRecoveryEnv``. Initial states are drawn from the logged
+    JSBSim reset observations. Finished episodes reset automatically, as in
+    any Stable-Baselines3 VecEnv.
+    """
+
+    def __init__(self, dynamics, num_envs=4096, seed=0, max_episode_steps=1000,
+                 critical_alpha=15, safe_alpha=10, reward_spec=None):
+        observation_space, action_space = _spaces()
+        super().__init__(num_envs, observation_space, action_space)
+        self.dynamics = dynamics
+        self.max_episode_steps = max_episode_steps
+        self.critical_alpha = critical_alpha
+        self.safe_alpha = safe_alpha
+        self.reward_spec = reward_spec if reward_spec is not None else DEFAULT_REWARD_SPEC
+        self.rng = np.random.default_rng(seed)
+
+        self.obs = np.zeros((num_envs, observation_space.shape[0]), dtype=np.float32)
+        self.prev_alt = np.zeros(num_envs, dtype=np.float32)
+        self.recovery_counter = np.zeros(num_envs, dtype=np.int32)
+        self.episode_steps = np.zeros(num_envs, dtype=np.int32)
+        self._actions = None
+
+    def _reset_envs(self, idx):
+        samples = self.rng.integers(len(self.dynamics.initial_obs), size=len(idx))
+        self.obs[idx] = self.dynamics.initial_obs[samples]
+        self.prev_alt[idx] = self.obs[idx, OBS_ALT]
+        self.recovery_counter[idx] = 0
+        self.episode_steps[idx] = 0
+
+    def reset(self):
+        self._reset_envs(np.arange(self.num_envs))
+        return self.obs.copy()
+
+    def step_async(self, actions):
+        self._actions = np.asarray(actions, dtype=np.float32)
+
+    def step_wait(self):
+        actions = self._actions
+        self.obs = self.dynamics.predict(self.obs, actions)
+        self.episode_steps += 1
+
+        # Reward and termination with the same spec as CustomStallRecoveryEnv
+        alt = self.obs[:, OBS_ALT]
+        reward, terminated, self.recovery_counter = self.reward_spec.step(
+            self.obs[:, OBS_ALPHA], alt, self.prev_alt, actions, self.recovery_counter,
+            self.critical_alpha, self.safe_alpha)
+        self.prev_alt = alt.copy()
+        truncated = ~terminated & (self.episode_steps >= self.max_episode_steps)
+        dones = terminated | truncated
+
+        infos = [{} for _ in range(self.num_envs)]
+        done_idx = np.flatnonzero(dones)
+        if len(done_idx):
+            for i in done_idx:
+                infos[i]['terminal_observation'] = self.obs[i].copy()
+                infos[i]['TimeLimit.truncated'] = bool(truncated[i])
+            self._reset_envs(done_idx)
+        return self.obs.copy(), reward.astype(np.float32), dones, infos
+
+    def close(self):
+        pass
+
+    def seed(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+        return [seed] * self.num_envs
+
+    def get_attr(self, attr_name, indices=None):
+        return [getattr(self, attr_name)] * len(self._get_indices(indices))
+
+    def set_attr(self, attr_name, value, indices=None):
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        """Surrogate environments have no per-env methods; every call is a no-op returning None."""
+        return [None] * len(self._get_indices(indices))
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False] * len(self._get_indices(indices))
+
+    def _get_indices(self, indices):
+        if indices is None:
+            return range(self.num_envs)
+        if isinstance(indices, int):
+            return [indices]
+        return indices
+
+
+def _spaces():
+    """Observation and action spaces shared with CustomStallRecoveryEnv."""
+    import gymnasium as gym
+
+    action_space = gym.spaces.Box(low=-1, high=1, shape=(2,), dtype=np.float32)
+    observation_space = gym.spaces.Box(low=-np.inf, high=np.inf, shape=(7,), dtype=np.float32)
+    return observation_space, action_space
+
+
+def fidelity_report(dynamics, n_episodes=20, horizon=200, seed=1000, policy=None, **env_kwargs):
+    """
+    Compare open-loop surrogate and JSBSim trajectories from the same states.
+
+    Each episode starts both models from one JSBSim reset and applies the
+    same action sequence, so errors compound as they would during a rollout.
+
+    Args:
+        dynamics (SurrogateDynamics): Fitted surrogate.
+        n_episodes (int): Number of compared trajectories.
+        horizon (int): Maximum steps per trajectory.
+        seed (int): Seed for the initial conditions and random actions.
+        policy (callable, optional): Maps an observation to an action;
+            uniform random actions are used when omitted.
+        **env_kwargs: Keyword arguments for ``CustomStallRecoveryEnv``.
+
+    Returns:
+        dict: Per-variable RMSE after 1 and 10 steps and over the whole
+            horizon, plus the number of compared steps.
+    """
+    env = CustomStallRecoveryEnv(**env_kwargs)
+    rng = np.random.default_rng(seed)
+    errors = [[] for _ in range(horizon)]
+
+    for episode in range(n_episodes):
+        real, _ = env.reset(seed=seed + episode)
+        surrogate = real[None].copy()
+        for t in range(horizon):
+            action = rng.uniform(-1, 1, size=2).astype(np.float32) if policy is None else policy(real)
+            real, _, terminated, truncated, _ = env.step(action)
+            surrogate = dynamics.predict(surrogate, action[None])
+            errors[t].append(surrogate[0, STATE_DIMS] - real[list(STATE_DIMS)])
+            if terminated or truncated:
+                break
+    env.close()
+
+    def rmse(rows):
+        rows = np.array(rows)
+        values = np.sqrt((rows ** 2).mean(axis=0)) if len(rows) else np.full(len(STATE_DIMS), np.nan)
+        return dict(zip(STATE_NAMES, map(float, values)))
+
+    return {
+        'rmse_step_1': rmse(errors[0]),
+        'rmse_step_10': rmse(errors[9]) if horizon >= 10 else None,
+        'rmse_all_steps': rmse([e for step in errors for e in step]),
+        'compared_steps': sum(len(step) for step in errors),
+    }
+
+
+def pretrain(dynamics, surrogate_timesteps=2_000_000, finetune_timesteps=50000, num_envs=4096,
+             seed=0, save_path='stall_recovery_agent', **env_kwargs):
+    """
+    Pre-train PPO on the surrogate, then fine-tune it on JSBSim.
+
+    The pre-trained policy is also saved as ``<save_path>_surrogate``.
+
+    Returns:
+        PPO: The fine-tuned model.
+    """
+    from stable_baselines3 import PPO
+
+    from normalization import save_model
+
+    surrogate_env = SurrogateStallRecoveryVecEnv(dynamics, num_envs=num_envs, seed=seed)
+    # Short rollouts per env keep the buffer size reasonable with thousands of envs
+    model = PPO('MlpPolicy', surrogate_env, n_steps=16, batch_size=4096, seed=seed, verbose=1, device='cpu')
+    model.learn(total_timesteps=surrogate_timesteps)
+    pretrained_path = f'{save_path or "stall_recovery_agent"}_surrogate'
+    model.save(pretrained_path)
+
+    # Reload against a single JSBSim env with the usual rollout settings;
+    # set_env cannot change the number of environments
+    env = CustomStallRecoveryEnv(**env_kwargs)
+    model = PPO.load(pretrained_path, env=env, device='cpu',
+                     custom_objects={'n_steps': 2048, 'batch_size': 64})
+    model.learn(total_timesteps=finetune_timesteps, reset_num_timesteps=False)
+    if save_path:
+        save_model(model, save_path)
+    env.close()
+    return model
+
+
+def main():
+    """Fit a surrogate stall dynamics model from JSBSim and report its fidelity."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--steps', type=int, default=50000, help="JSBSim transitions to fit on")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='surrogate_dynamics.npz')
+    parser.add_argument('--report-episodes', type=int, default=20)
+    parser.add_argument('--pretrain-steps', type=int, default=0,
+                        help="if set, pre-train PPO on the surrogate for this many steps")
+    parser.add_argument('--finetune-steps', type=int, default=50000)
+    args = parser.parse_args()
+
+    data = collect_transitions(n_steps=args.steps, seed=args.seed)
+    dynamics = SurrogateDynamics(initial_obs=data['initial_obs'])
+    dynamics.fit(data['obs'], data['actions'], data['next_obs'])
+    dynamics.save(args.output)
+    print(f"Surrogate saved as '{args.output}'")
+
+    report = fidelity_report(dynamics, n_episodes=args.report_episodes, seed=args.seed + 1000)
+    print(json.dumps(report, indent=2))
+
+    if args.pretrain_steps:
+        pretrain(dynamics, surrogate_timesteps=args.pretrain_steps,
+                 finetune_timesteps=args.finetune_steps, seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Stream step telemetry from any number of simulation processes to a viewer.
+
+Publishers batch ``TELEMETRY_DTYPE`` rows into datagrams on a local UDP or
+Unix datagram socket; a single ``TelemetrySubscriber`` receives the frames
+of every process. Each frame is a 24 byte header followed by packed
+little-endian rows::
+
+    magic  b'SHAT'   4s
+    version          B
+    (pad)            x
+    rows             H
+    source           I   publisher id: process id << 10 | publisher number
+    sequence         I   per-publisher frame counter, for loss detection
+    critical_alpha   f   stall boundary of the observed alpha, degrees
+    safe_alpha       f
+"""
+import itertools
+import os
+import socket
+import struct
+import time
+
+import gymnasium as gym
+import numpy as np
+
+from AircraftSHAgent import DEFAULT_ALPHA_LIMITS, OBS_ALPHA, OBS_ALT
+from flight_recorder import (
+    ACTION_FIELDS,
+    OBS_FIELDS,
+    STATUS_CRASHED,
+    STATUS_NORMAL,
+    STATUS_RECOVERED,
+    STATUS_STALL,
+    TELEMETRY_DTYPE,
+)
+
+MAGIC = b'SHAT'
+VERSION = 2
+HEADER = struct.Struct('<4sBxHIIff')
+WIRE_DTYPE = TELEMETRY_DTYPE.newbyteorder('<')
+# Largest batch that fits a UDP datagram with room to spare.
+MAX_BATCH = (60000 - HEADER.size) // WIRE_DTYPE.itemsize
+
+_publisher_numbers = itertools.count()
+
+
+def default_source():
+    """A source id unique to this publisher across the local processes."""
+    return (os.getpid() << 10 | next(_publisher_numbers) & 0x3FF) & 0xFFFFFFFF
+
+
+def source_label(source):
+    """Human-readable ``pid:publisher`` form of a source id."""
+    return f"{source >> 10}:{source & 0x3FF}"
+
+
+def parse_address(address):
+    """
+    Split ``udp://host:port`` or ``unix:///path`` into a socket family and address.
+
+    Returns:
+        tuple: ``(family, sockaddr)``.
+    """
+    if address.startswith('udp://'):
+        host, _, port = address[len('udp://'):].rpartition(':')
+        return socket.AF_INET, (host or '127.0.0.1', int(port))
+    if address.startswith('unix://'):
+        return socket.AF_UNIX, address[len('unix://'):]
+    raise ValueError(f"Unsupported telemetry address: {address!r}")
+
+
+class TelemetryPublisher:
+    """
+    Batch telemetry rows and send them as datagrams.
+
+    A batch is sent when it holds ``max_batch`` rows, when its oldest row
+    is ``max_delay`` seconds old, or on ``flush``. With ``policy='drop'``
+    the socket is non-blocking and a batch that cannot be sent right away
+    (no subscriber, or its receive buffer is full) is dropped and counted,
+    so a slow viewer never slows the simulation. ``policy='block'`` applies
+    backpressure instead: sends wait until the subscriber catches up
+    (only meaningful for Unix sockets).
+    """
+
+    def __init__(self, address, max_batch=64, max_delay=0.05, policy='drop', source=None,
+                 alpha_limits=DEFAULT_ALPHA_LIMITS):
+        if policy not in ('drop', 'block'):
+            raise ValueError(f"Unknown drop policy: {policy!r}")
+        if not 1 <= max_batch <= MAX_BATCH:
+            raise ValueError(f"max_batch must be between 1 and {MAX_BATCH}")
+        family, self.sockaddr = parse_address(address)
+        self.sock = socket.socket(family, socket.SOCK_DGRAM)
+        self.sock.setblocking(policy == 'block')
+        self.max_delay = max_delay
+        self.source = default_source() if source is None else source
+        self.alpha_limits = tuple(alpha_limits)  # (critical, safe), sent with every frame
+        self._batch = np.zeros(max_batch, dtype=WIRE_DTYPE)
+        self._size = 0
+        self._first_time = 0.0
+        self.sequence = 0
+        self.sent = 0
+        self.dropped = 0
+
+    def publish(self, obs, action, reward, status=STATUS_NORMAL, episode=0, step=0, time_s=0.0):
+        """Queue one step; sends the batch when it is full or old enough."""
+        row = self._batch[self._size]
+        row['episode'] = episode
+        row['step'] = step
+        row['time'] = time_s
+        for field, value in zip(OBS_FIELDS, obs):
+            row[field] = value
+        for field, value in zip(ACTION_FIELDS, action):
+            row[field] = value
+        row['reward'] = reward
+        row['status'] = status
+        self._size += 1
+        if self._size == 1:
+            self._first_time = time.perf_counter()
+        if self._size == len(self._batch) or time.perf_counter() - self._first_time >= self.max_delay:
+            self.flush()
+
+    def flush(self):
+        """Send the pending rows, if any."""
+        if not self._size:
+            return
+        frame = HEADER.pack(MAGIC, VERSION, self._size, self.source, self.sequence & 0xFFFFFFFF,
+                            *self.alpha_limits)
+        frame += self._batch[:self._size].tobytes()
+        self.sequence += 1
+        self._size = 0
+        try:
+            self.sock.sendto(frame, self.sockaddr)
+            self.sent += 1
+        except (BlockingIOError, ConnectionRefusedError, FileNotFoundError):
+            self.dropped += 1  # No subscriber, or it is not keeping up
+
+    def close(self):
+        self.flush()
+        self.sock.close()
+
+
+class TelemetryStreamWrapper(gym.Wrapper):
+    """
+    Publish every step of a stall recovery environment.
+
+    Episodes are numbered per wrapper; the last step of an episode is
+    tagged ``STATUS_RECOVERED`` or ``STATUS_CRASHED`` and flushed at once.
+    Environment attributes such as ``dt`` and ``critical_alpha`` read
+    through the wrapper, so it can stand in for the env anywhere.
+    """
+
+    def __init__(self, env, publisher):
+        super().__init__(env)
+        self.publisher = publisher
+        publisher.alpha_limits = (env.critical_alpha, env.safe_alpha)
+        self.episode = -1
+        self.steps = 0
+
+    def reset(self, **kwargs):
+        self.publisher.flush()
+        self.episode += 1
+        self.steps = 0
+        return self.env.reset(**kwargs)
+
+    def step(self, action):
+        obs, reward, terminated, truncated, info = self.env.step(action)
+        env = self.env
+        self.steps += 1
+        if terminated:
+            # The env only terminates on a crash or a completed recovery
+            status = STATUS_CRASHED if obs[OBS_ALT] <= env.reward_spec.crash_altitude else STATUS_RECOVERED
+        else:
+            status = STATUS_STALL if obs[OBS_ALPHA] > env.critical_alpha else STATUS_NORMAL
+        self.publisher.publish(obs, action, reward, status, episode=self.episode, step=self.steps - 1,
+                               time_s=self.steps * env.dt * env.action_repeat)
+        if terminated or truncated:
+            self.publisher.flush()
+        return obs, reward, terminated, truncated, info
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.env, name)
+
+    def close(self):
+        self.publisher.close()
+        super().close()
+
+
+class TelemetrySubscriber:
+    """
+    Receive frames from any number of publishers on one socket.
+
+    ``poll`` never blocks; call it from a timer. Lost frames are detected
+    from gaps in each source's sequence numbers, and the latest
+    ``(critical, safe)`` alpha of each source is kept in ``alpha_limits``.
+    """
+
+    def __init__(self, address, receive_buffer=4 << 20):
+        family, self.sockaddr = parse_address(address)
+        if family == socket.AF_UNIX and os.path.exists(self.sockaddr):
+            os.unlink(self.sockaddr)  # Stale socket from an earlier viewer
+        self.sock = socket.socket(family, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, receive_buffer)
+        self.sock.bind(self.sockaddr)
+        self.sock.setblocking(False)
+        self._next_sequence = {}
+        self.alpha_limits = {}
+        self.received = 0
+        self.lost = 0
+
+    def poll(self, max_frames=1000):
+        """
+        Read every frame that has arrived.
+
+        Returns:
+            list[tuple]: ``(source, rows)`` per frame, in arrival order, with
+                ``rows`` a ``TELEMETRY_DTYPE`` array.
+        """
+        frames = []
+        for _ in range(max_frames):
+            try:
+                data = self.sock.recv(65536)
+            except BlockingIOError:
+                break
+            if len(data) < HEADER.size:
+                continue
+            magic, version, n, source, sequence, critical_alpha, safe_alpha = HEADER.unpack_from(data)
+            if magic != MAGIC or version != VERSION or len(data) != HEADER.size + n * WIRE_DTYPE.itemsize:
+                continue
+            expected = self._next_sequence.get(source)
+            if expected is not None and sequence > expected:
+                self.lost += sequence - expected
+            self._next_sequence[source] = sequence + 1
+            self.alpha_limits[source] = (critical_alpha, safe_alpha)
+            self.received += 1
+            rows = np.frombuffer(data, dtype=WIRE_DTYPE, count=n, offset=HEADER.size).astype(TELEMETRY_DTYPE)
+            frames.append((source, rows))
+        return frames
+
+    def close(self):
+        self.sock.close()
+        if isinstance(self.sockaddr, str) and os.path.exists(self.sockaddr):
+            os.unlink(self.sockaddr)
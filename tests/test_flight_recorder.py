@@ -0,0 +1,86 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from flight_recorder import (SCHEMA_FILE, STATUS_STALL, TELEMETRY_DTYPE, FlightRecorder,
+                             open_flight_log)
+
+
+def _record(recorder, n, episode=0):
+    for i in range(n):
+        obs = np.arange(7, dtype=np.float32) + i
+        recorder.record(obs, (-0.5, 0.25), reward=float(i), status=STATUS_STALL, episode=episode,
+                        time=0.1 * i)
+
+
+def test_record_fills_columns():
+    recorder = FlightRecorder(capacity=2)
+    _record(recorder, 3, episode=7)
+    data = recorder.data
+    assert len(recorder) == 3
+    np.testing.assert_array_equal(data['step'], [0, 1, 2])
+    np.testing.assert_array_equal(data['alpha'], [0, 1, 2])
+    np.testing.assert_array_equal(data['roll'], [6, 7, 8])
+    assert (data['elevator_cmd'] == -0.5).all() and (data['throttle_cmd'] == 0.25).all()
+    assert (data['episode'] == 7).all() and (data['status'] == STATUS_STALL).all()
+
+
+def test_buffer_grows_and_keeps_rows():
+    recorder = FlightRecorder(capacity=1)
+    _record(recorder, 5)
+    rows = np.zeros(10, dtype=TELEMETRY_DTYPE)
+    rows['step'] = np.arange(10)
+    recorder.record_batch(rows)
+    assert len(recorder) == 15
+    np.testing.assert_array_equal(recorder.column('step'), np.r_[np.arange(5), np.arange(10)])
+
+
+def test_clear_keeps_capacity():
+    recorder = FlightRecorder(capacity=4)
+    _record(recorder, 3)
+    recorder.clear()
+    assert len(recorder) == 0
+    _record(recorder, 1)
+    assert recorder.data['alpha'][0] == 0
+
+
+def test_flush_round_trip(tmp_path):
+    path = str(tmp_path / 'log')
+    recorder = FlightRecorder(capacity=2, path=path)
+    _record(recorder, 3)
+    assert recorder.flush() == 3
+    _record(recorder, 2, episode=1)
+    recorder.close()
+
+    log = open_flight_log(path)
+    assert set(log) == set(TELEMETRY_DTYPE.names)
+    for name in TELEMETRY_DTYPE.names:
+        np.testing.assert_array_equal(log[name], recorder.data[name])
+        assert log[name].dtype == TELEMETRY_DTYPE[name]
+    assert recorder.flush() == 0
+
+
+def test_open_empty_log(tmp_path):
+    path = str(tmp_path / 'log')
+    FlightRecorder(path=path).flush()
+    log = open_flight_log(path)
+    assert all(len(column) == 0 for column in log.values())
+
+
+def test_flush_needs_a_path():
+    with pytest.raises(ValueError):
+        FlightRecorder().flush()
+
+
+def test_unsupported_schema_version(tmp_path):
+    path = str(tmp_path / 'log')
+    FlightRecorder(path=path).flush()
+    with open(os.path.join(path, SCHEMA_FILE)) as f:
+        schema = json.load(f)
+    schema['version'] += 1
+    with open(os.path.join(path, SCHEMA_FILE), 'w') as f:
+        json.dump(schema, f)
+    with pytest.raises(ValueError):
+        open_flight_log(path)
@@ -0,0 +1,127 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from ic_sampler import REGION_DTYPE, AdaptiveICSampler
+
+
+def test_samples_stay_in_their_ranges():
+    sampler = AdaptiveICSampler(alpha_range=(12, 18), vc_range=(40, 60), theta_range=(10, 20))
+    rng = np.random.default_rng(0)
+    draws = np.array([sampler.sample(rng) for _ in range(500)])
+    assert (draws.min(axis=0) >= (12, 40, 10)).all()
+    assert (draws.max(axis=0) <= (18, 60, 20)).all()
+
+
+def test_region_of_matches_the_grid():
+    sampler = AdaptiveICSampler(alpha_range=(12, 18), vc_range=(40, 60), bins=(3, 2))
+    assert sampler.n_regions == 6
+    assert sampler.region_of(12.0, 40.0) == 0
+    assert sampler.region_of(12.5, 55.0) == 1
+    assert sampler.region_of(15.0, 45.0) == 2
+    assert sampler.region_of(18.0, 60.0) == 5  # Upper edges belong to the last bin
+    assert sampler.region_of(30.0, 10.0) == 4  # Out of range values are clipped
+
+
+def test_weights_favour_failing_regions():
+    sampler = AdaptiveICSampler(bins=(2, 1), uniform_mix=0.2, length_weight=0)
+    np.testing.assert_allclose(sampler.weights(), [0.5, 0.5])
+    for _ in range(50):
+        sampler.record(0, True, 10)
+        sampler.record(1, False, 10)
+    weights = sampler.weights()
+    assert weights.sum() == pytest.approx(1)
+    assert weights[1] > 0.8
+
+
+def test_uniform_without_prioritize():
+    sampler = AdaptiveICSampler(bins=(2, 2), prioritize=False)
+    sampler.record(0, False, 100)
+    np.testing.assert_allclose(sampler.weights(), 0.25)
+
+
+def test_pop_updates_returns_counts_once():
+    sampler = AdaptiveICSampler(bins=(2, 2))
+    sampler.record(1, True, 30)
+    sampler.record(1, False, 50)
+    sampler.record(3, True, 20)
+    updates = sampler.pop_updates()
+    np.testing.assert_array_equal(updates, [[0, 2, 0, 1], [0, 1, 0, 1], [0, 80, 0, 20]])
+    assert not sampler.pop_updates().any()
+    # Popping does not forget the statistics themselves
+    np.testing.assert_array_equal(sampler.episodes, [0, 2, 0, 1])
+
+
+def test_merge_combines_worker_counts():
+    main = AdaptiveICSampler(bins=(2, 2))
+    workers = [pickle.loads(pickle.dumps(main)) for _ in range(2)]  # As sent to subprocesses
+    workers[0].record(0, True, 10)
+    workers[1].record(0, False, 30)
+    workers[1].record(2, True, 20)
+    for worker in workers:
+        main.merge(worker.pop_updates())
+    np.testing.assert_array_equal(main.episodes, [2, 0, 1, 0])
+    np.testing.assert_array_equal(main.recoveries, [1, 0, 1, 0])
+    np.testing.assert_array_equal(main.steps, [40, 0, 20, 0])
+    # Merged counts are not handed on again
+    assert not main.pop_updates().any()
+    assert main.overall_success_rate() == pytest.approx(0.75)
+
+
+def test_curriculum_widens_on_success():
+    sampler = AdaptiveICSampler(alpha_range=(12, 18), vc_range=(40, 60), curriculum=True, start_level=0.5,
+                                widen_by=0.25, promote_at=0.8, min_episodes=10)
+    (alpha_low, alpha_high), (vc_low, vc_high) = sampler.bounds()
+    assert (alpha_low, alpha_high, vc_low, vc_high) == (12, 15, 50, 60)
+    rng = np.random.default_rng(0)
+    draws = np.array([sampler.sample(rng) for _ in range(200)])
+    assert draws[:, 0].max() <= 15 and draws[:, 1].min() >= 50
+
+    for _ in range(10):
+        sampler.record(0, False, 100)
+    assert sampler.level == 0.5
+    updates = np.zeros((3, sampler.n_regions), dtype=np.int64)
+    updates[:, 0] = (40, 40, 400)
+    sampler.merge(updates)  # 40 of the 50 episodes at this level recovered
+    assert sampler.level == 0.75
+    updates[:, 0] = (10, 8, 100)
+    sampler.merge(updates)  # The count restarts at every promotion
+    assert sampler.level == 1.0
+    assert sampler.bounds() == ((12, 18), (40, 60))
+
+
+def test_stats_table():
+    sampler = AdaptiveICSampler(bins=(2, 2))
+    sampler.record(3, True, 40)
+    table = sampler.stats()
+    assert table.dtype == REGION_DTYPE
+    assert table['episodes'].tolist() == [0, 0, 0, 1]
+    assert np.isnan(table['mean_steps'][:3]).all() and table['mean_steps'][3] == 40
+    assert table['success_rate'][3] == pytest.approx(2 / 3)
+    assert table['weight'].sum() == pytest.approx(1)
+
+
+def test_invalid_uniform_mix():
+    with pytest.raises(ValueError):
+        AdaptiveICSampler(uniform_mix=1.5)
+
+
+def test_env_reports_episodes_to_the_sampler():
+    from AircraftSHAgent import CustomStallRecoveryEnv
+
+    sampler = AdaptiveICSampler(bins=(2, 2))
+    env = CustomStallRecoveryEnv(ic_sampler=sampler)
+    _, info = env.reset(seed=0)
+    region = sampler.region_of(info['ic']['alpha'], info['ic']['vc'])
+    for _ in range(3):
+        env.step(np.zeros(2, dtype=np.float32))
+    env.reset(options={'ic': {'alpha': 13.0, 'vc': 58.0, 'theta': 12.0}, 'ic_region': 2})
+    env.step(np.zeros(2, dtype=np.float32))
+    env.reset()
+    env.close()
+    # The cut-off episodes count as not recovered, under their own regions
+    expected = np.zeros((3, 4), dtype=np.int64)
+    expected[:, region] += (1, 0, 3)
+    expected[:, 2] += (1, 0, 1)
+    np.testing.assert_array_equal(sampler.pop_updates(), expected)
@@ -0,0 +1,63 @@
+import numpy as np
+
+from AircraftSHAgent import PropertyBinding
+
+
+class StubNode:
+    def __init__(self, value=0.0):
+        self.value = value
+
+    def get_double_value(self):
+        return self.value
+
+    def set_double_value(self, value):
+        self.value = value
+
+
+class StubSim:
+    """Just enough of FGFDMExec for PropertyBinding."""
+
+    def __init__(self, **values):
+        self.nodes = {name: StubNode(value) for name, value in values.items()}
+        self.lookups = 0
+
+    def get_property_manager(self):
+        return self
+
+    def get_node(self, name, create):
+        self.lookups += 1
+        return self.nodes.setdefault(name, StubNode())
+
+
+def test_read_returns_values_in_binding_order():
+    sim = StubSim(a=1.0, b=2.5, c=-3.0)
+    binding = PropertyBinding(sim, ['c', 'a', 'b'])
+    np.testing.assert_array_equal(binding.read(), np.float32([-3.0, 1.0, 2.5]))
+    assert binding.read().dtype == np.float32
+
+
+def test_read_reuses_the_buffer():
+    sim = StubSim(a=1.0)
+    binding = PropertyBinding(sim, ['a'])
+    first = binding.read()
+    sim.nodes['a'].value = 4.0
+    assert binding.read() is first
+    assert first[0] == 4.0
+
+
+def test_nodes_are_resolved_once():
+    sim = StubSim(a=1.0, b=2.0)
+    binding = PropertyBinding(sim, ['a', 'b'])
+    for _ in range(5):
+        binding.read()
+        binding.write([0.5, 0.25])
+    assert sim.lookups == 2
+
+
+def test_write_sets_python_floats_in_order():
+    sim = StubSim()
+    binding = PropertyBinding(sim, ['elevator', 'throttle'])
+    binding.write(np.float32([-0.5, 0.75]))
+    assert sim.nodes['elevator'].value == -0.5
+    assert sim.nodes['throttle'].value == 0.75
+    assert type(sim.nodes['throttle'].value) is float
@@ -0,0 +1,40 @@
+import numpy as np
+
+from flight_recorder import STATUS_RECOVERED
+from replay import diff_policies, load_replays, record_episode, save_replays, simulate
+
+
+class ConstantPolicy:
+    def __init__(self, action):
+        self.action = np.float32(action)
+
+    def predict(self, obs, deterministic=True):
+        return self.action, None
+
+
+def test_simulate_reproduces_the_recording():
+    replay = record_episode(ConstantPolicy((1.0, 1.0)), seed=0, max_steps=600)
+    first, second = simulate(replay), simulate(replay)
+    assert len(first) == len(replay)
+    np.testing.assert_array_equal(first['altitude'], second['altitude'])
+    assert first['status'][-1] == STATUS_RECOVERED
+
+
+def test_recovery_on_the_last_allowed_step_counts():
+    steps = len(record_episode(ConstantPolicy((1.0, 1.0)), seed=0, max_steps=600))
+    diffs, _, _ = diff_policies(ConstantPolicy((1.0, 1.0)), ConstantPolicy((1.0, 1.0)), [0], max_steps=steps)
+    assert diffs[0]['steps_a'] == steps
+    assert diffs[0]['recovered_a'] and diffs[0]['recovered_b']
+    assert diffs[0]['first_divergence'] == -1
+
+
+def test_save_and_load_round_trip(tmp_path):
+    replays = [record_episode(ConstantPolicy((0.5, 1.0)), seed=seed, max_steps=20) for seed in (3, None)]
+    path = str(tmp_path / 'replays.npz')
+    save_replays(path, replays)
+    loaded = load_replays(path)
+    assert [r.seed for r in loaded] == [3, None]
+    for original, restored in zip(replays, loaded):
+        assert restored.ic == original.ic
+        assert restored.env_kwargs == original.env_kwargs
+        np.testing.assert_array_equal(restored.actions, original.actions)
@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+
+from flight_recorder import TELEMETRY_DTYPE, FlightRecorder
+from reward_spec import DEFAULT_REWARD_SPEC, RESCORE_DTYPE, RewardSpec, as_reward_spec
+
+CRITICAL, SAFE = 15.0, 10.0
+
+
+def test_default_step_reward():
+    reward, terminated, counter = DEFAULT_REWARD_SPEC.step(
+        17.0, 990.0, 1000.0, np.float32([-0.5, 0.8]), 0, CRITICAL, SAFE)
+    # -(17 - 15) + 0.1 * (990 - 1000) - 0.01 * 0.5
+    assert reward == pytest.approx(-3.005)
+    assert not terminated and counter == 0
+
+
+def test_step_counts_recovery_and_crash():
+    spec = RewardSpec(required_recovery_steps=3, crash_altitude=100.0)
+    counter = 0
+    for expected in (False, False, True):
+        _, terminated, counter = spec.step(5.0, 1000.0, 1000.0, (0, 0), counter, CRITICAL, SAFE)
+        assert terminated == expected
+    _, _, counter = spec.step(12.0, 1000.0, 1000.0, (0, 0), counter, CRITICAL, SAFE)
+    assert counter == 0
+    _, terminated, _ = spec.step(20.0, 100.0, 200.0, (0, 0), 0, CRITICAL, SAFE)
+    assert terminated
+
+
+def test_step_is_vectorized():
+    spec = RewardSpec({'stall': 1.0, 'stalled': 2.0, 'throttle': 0.5})
+    alpha = np.array([5.0, 16.0, 20.0])
+    actions = np.array([[0, 0.2], [0, -1.0], [1, 0.0]])
+    reward, terminated, counter = spec.step(alpha, np.full(3, 500.0), np.full(3, 500.0), actions,
+                                            np.array([9, 0, 3]), CRITICAL, SAFE)
+    np.testing.assert_allclose(reward, [-0.1, -1 - 2 - 0.5, -5 - 2])
+    np.testing.assert_array_equal(terminated, [True, False, False])
+    np.testing.assert_array_equal(counter, [10, 0, 0])
+
+
+def test_dict_round_trip():
+    spec = RewardSpec({'stall': 2.0, 'throttle': 0.1}, required_recovery_steps=5, crash_altitude=50)
+    copy = as_reward_spec(spec.to_dict())
+    assert copy.to_dict() == spec.to_dict()
+    assert as_reward_spec(None) is DEFAULT_REWARD_SPEC
+    assert as_reward_spec(spec) is spec
+
+
+def test_unknown_terms_are_rejected():
+    with pytest.raises(ValueError):
+        RewardSpec({'stall': 1.0, 'bank': 1.0})
+
+
+def _telemetry(alpha, altitude, episode=None, reward=0.0):
+    telemetry = np.zeros(len(alpha), dtype=TELEMETRY_DTYPE)
+    telemetry['episode'] = 0 if episode is None else episode
+    telemetry['alpha'] = alpha
+    telemetry['altitude'] = altitude
+    telemetry['reward'] = reward
+    return telemetry
+
+
+def test_rescore_matches_stepping():
+    rng = np.random.default_rng(0)
+    episode = np.repeat([3, 4], 30)
+    telemetry = _telemetry(rng.uniform(8, 20, 60), rng.uniform(500, 600, 60), episode=episode)
+    telemetry['elevator_cmd'] = rng.uniform(-1, 1, 60)
+    telemetry['throttle_cmd'] = rng.uniform(-1, 1, 60)
+    spec = RewardSpec({'stall': 1.0, 'altitude_gain': 0.1, 'elevator': 0.01, 'throttle': 0.3},
+                      required_recovery_steps=1000)
+    rewards, episodes = spec.rescore(telemetry, CRITICAL, SAFE, initial_altitude=np.array([550.0, 560.0]))
+
+    expected = []
+    for start, initial in ((0, 550.0), (30, 560.0)):
+        prev = initial
+        for row in telemetry[start:start + 30]:
+            reward, _, _ = spec.step(float(row['alpha']), float(row['altitude']), prev,
+                                     (row['elevator_cmd'], row['throttle_cmd']), 0, CRITICAL, SAFE)
+            expected.append(reward)
+            prev = float(row['altitude'])
+    np.testing.assert_allclose(rewards, expected, rtol=1e-6)
+    assert episodes.dtype == RESCORE_DTYPE
+    np.testing.assert_array_equal(episodes['episode'], [3, 4])
+    np.testing.assert_allclose(episodes['reward'], [sum(expected[:30]), sum(expected[30:])], rtol=1e-6)
+    assert not episodes['terminated'].any()
+
+
+def test_rescore_stops_at_the_new_termination():
+    alpha = [16, 9, 9, 9, 16, 16, 9, 9]
+    altitude = [500, 500, 500, 500, 500, 0, 500, 500]
+    telemetry = _telemetry(alpha, altitude, episode=[0, 0, 0, 0, 1, 1, 1, 1], reward=1.0)
+    spec = RewardSpec(required_recovery_steps=2)
+    _, episodes = spec.rescore(telemetry, CRITICAL, SAFE)
+    np.testing.assert_array_equal(episodes['steps'], [3, 2])
+    np.testing.assert_array_equal(episodes['terminated'], [True, True])
+    np.testing.assert_array_equal(episodes['recovered'], [True, False])  # Episode 1 crashed
+    np.testing.assert_array_equal(episodes['recorded_reward'], [4, 4])
+
+
+def test_rescore_unterminated_episode():
+    telemetry = _telemetry([16, 16, 9], [500, 500, 500])
+    _, episodes = DEFAULT_REWARD_SPEC.rescore(telemetry, CRITICAL, SAFE)
+    assert episodes['steps'][0] == 3
+    assert not episodes['terminated'][0] and not episodes['recovered'][0]
+
+
+def test_rescore_empty():
+    rewards, episodes = DEFAULT_REWARD_SPEC.rescore(np.zeros(0, dtype=TELEMETRY_DTYPE), CRITICAL, SAFE)
+    assert len(rewards) == 0 and len(episodes) == 0
+
+
+def test_rescore_reproduces_a_live_episode():
+    from AircraftSHAgent import OBS_ALT, CustomStallRecoveryEnv
+
+    env = CustomStallRecoveryEnv()
+    obs, _ = env.reset(seed=1)
+    initial_altitude = float(obs[OBS_ALT])
+    recorder = FlightRecorder()
+    terminated = False
+    action = np.float32([1.0, 1.0])
+    while not terminated:
+        obs, reward, terminated, _, _ = env.step(action)
+        recorder.record(obs, action, reward)
+    env.close()
+
+    rewards, episodes = DEFAULT_REWARD_SPEC.rescore(recorder.data, env.critical_alpha, env.safe_alpha,
+                                                    initial_altitude=initial_altitude)
+    np.testing.assert_allclose(rewards, recorder.data['reward'], rtol=1e-5, atol=1e-4)
+    assert episodes['steps'][0] == len(recorder)
+    assert episodes['terminated'][0] and episodes['recovered'][0]
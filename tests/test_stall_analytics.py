@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+
+from flight_recorder import TELEMETRY_DTYPE
+from stall_analytics import STALL_EVENT_DTYPE, episode_table, find_stall_events, summarize_events
+
+DT = 0.1
+
+
+def make_telemetry(alpha, episode=None, altitude=None, elevator=None):
+    n = len(alpha)
+    telemetry = np.zeros(n, dtype=TELEMETRY_DTYPE)
+    telemetry['episode'] = 0 if episode is None else episode
+    telemetry['alpha'] = alpha
+    telemetry['altitude'] = 1000.0 if altitude is None else altitude
+    telemetry['elevator_cmd'] = 0.0 if elevator is None else elevator
+    # Steps restart at every episode
+    new_episode = np.r_[True, telemetry['episode'][1:] != telemetry['episode'][:-1]]
+    starts = np.flatnonzero(new_episode)
+    telemetry['step'] = np.arange(n) - starts[np.cumsum(new_episode) - 1]
+    telemetry['time'] = telemetry['step'] * DT
+    return telemetry
+
+
+def test_single_recovered_event():
+    telemetry = make_telemetry([5, 16, 17, 12, 9, 8], altitude=[1000, 990, 980, 970, 975, 980],
+                               elevator=[0, -1, -1, -0.5, -0.5, 0])
+    events = find_stall_events(telemetry, 15, 10)
+    assert len(events) == 1
+    event = events[0]
+    assert (event['start'], event['stop']) == (1, 3)
+    assert event['duration'] == pytest.approx(0.2)
+    assert event['peak_alpha'] == 17
+    assert event['recovered']
+    assert event['recovery_time'] == pytest.approx(0.3)
+    assert event['altitude_loss'] == pytest.approx(30)
+    assert event['elevator_effort'] == pytest.approx(3 * DT)
+
+
+def test_events_do_not_cross_episodes():
+    telemetry = make_telemetry([5, 16, 16, 16, 5, 5], episode=[0, 0, 0, 1, 1, 1])
+    events = find_stall_events(telemetry, 15, 10)
+    np.testing.assert_array_equal(events['episode'], [0, 1])
+    np.testing.assert_array_equal(events['start'], [1, 3])
+    np.testing.assert_array_equal(events['stop'], [3, 4])
+    # The next episode's safe rows do not recover the first one
+    np.testing.assert_array_equal(events['recovered'], [False, True])
+    assert np.isnan(events['recovery_time'][0])
+
+
+def test_stall_on_the_last_row():
+    events = find_stall_events(make_telemetry([5, 5, 16]), 15, 10)
+    assert len(events) == 1
+    assert events[0]['stop'] == 3
+    assert not events[0]['recovered']
+
+
+def test_no_events():
+    assert find_stall_events(np.zeros(0, dtype=TELEMETRY_DTYPE)).dtype == STALL_EVENT_DTYPE
+    assert len(find_stall_events(make_telemetry([5, 6, 7]))) == 0
+
+
+def _reference_events(alpha, episode, critical, safe):
+    """Loop implementation of event starts, stops and recovery."""
+    found = []
+    i, n = 0, len(alpha)
+    while i < n:
+        if alpha[i] > critical:
+            start = i
+            while i + 1 < n and alpha[i + 1] > critical and episode[i + 1] == episode[start]:
+                i += 1
+            stop = i + 1
+            j = stop
+            while j < n and episode[j] == episode[start] and not alpha[j] < safe:
+                j += 1
+            found.append((start, stop, j < n and episode[j] == episode[start]))
+        i += 1
+    return found
+
+
+def test_matches_a_loop_reference():
+    rng = np.random.default_rng(0)
+    episode = np.repeat(np.arange(20), rng.integers(1, 40, size=20))
+    alpha = rng.uniform(5, 20, size=len(episode)).astype(np.float32)
+    events = find_stall_events(make_telemetry(alpha, episode=episode), 15, 10)
+    expected = _reference_events(alpha, episode, 15, 10)
+    assert list(zip(events['start'], events['stop'], events['recovered'])) == expected
+
+
+def test_summaries():
+    telemetry = make_telemetry([16, 5, 16, 16, 5, 16], episode=[0, 0, 0, 0, 1, 1])
+    events = find_stall_events(telemetry, 15, 10)
+    summary = summarize_events(events)
+    assert summary['events'] == 3
+    assert summary['episodes_with_stall'] == 2
+    assert summary['recovery_rate'] == pytest.approx(1 / 3)
+
+    table = episode_table(events)
+    np.testing.assert_array_equal(table['episode'], [0, 1])
+    np.testing.assert_array_equal(table['events'], [2, 1])
+    np.testing.assert_allclose(table['stall_time'], [0.3, 0.1])
+    np.testing.assert_array_equal(table['recovered'], [False, False])
+
+
+def test_empty_summaries():
+    events = np.zeros(0, dtype=STALL_EVENT_DTYPE)
+    assert summarize_events(events)['recovery_rate'] is None
+    assert len(episode_table(events)) == 0
@@ -0,0 +1,147 @@
+import socket
+
+import gymnasium as gym
+import numpy as np
+import pytest
+
+from flight_recorder import STATUS_CRASHED, STATUS_RECOVERED, STATUS_STALL, TELEMETRY_DTYPE
+from reward_spec import RewardSpec
+from telemetry_stream import (HEADER, MAGIC, VERSION, TelemetryPublisher, TelemetryStreamWrapper,
+                              TelemetrySubscriber, default_source, parse_address, source_label)
+
+
+@pytest.fixture
+def address(tmp_path):
+    return f'unix://{tmp_path}/telemetry.sock'
+
+
+@pytest.fixture
+def subscriber(address):
+    subscriber = TelemetrySubscriber(address)
+    yield subscriber
+    subscriber.close()
+
+
+def _publish(publisher, n, episode=0):
+    for i in range(n):
+        publisher.publish(np.arange(7) + i, (0.5, -0.5), reward=-i, status=STATUS_STALL, episode=episode,
+                          step=i, time_s=0.1 * (i + 1))
+
+
+def test_parse_address():
+    assert parse_address('udp://10.0.0.1:5600') == (socket.AF_INET, ('10.0.0.1', 5600))
+    assert parse_address('udp://:5600') == (socket.AF_INET, ('127.0.0.1', 5600))
+    assert parse_address('unix:///tmp/viewer.sock') == (socket.AF_UNIX, '/tmp/viewer.sock')
+    with pytest.raises(ValueError):
+        parse_address('tcp://localhost:5600')
+
+
+def test_sources_are_unique_and_labelled():
+    first, second = default_source(), default_source()
+    assert first != second
+    assert source_label(first).split(':')[0] == source_label(second).split(':')[0]
+
+
+def test_frame_round_trip(address, subscriber):
+    publisher = TelemetryPublisher(address, max_delay=60, source=7, alpha_limits=(16.0, 11.0))
+    _publish(publisher, 3, episode=2)
+    publisher.flush()
+    frames = subscriber.poll()
+    assert len(frames) == 1
+    source, rows = frames[0]
+    assert source == 7
+    assert rows.dtype == TELEMETRY_DTYPE
+    np.testing.assert_array_equal(rows['step'], [0, 1, 2])
+    np.testing.assert_array_equal(rows['alpha'], [0, 1, 2])
+    np.testing.assert_array_equal(rows['roll'], [6, 7, 8])
+    np.testing.assert_array_equal(rows['reward'], [0, -1, -2])
+    assert (rows['episode'] == 2).all() and (rows['status'] == STATUS_STALL).all()
+    assert (rows['elevator_cmd'] == 0.5).all() and (rows['throttle_cmd'] == -0.5).all()
+    assert subscriber.alpha_limits[7] == (16.0, 11.0)
+    publisher.close()
+
+
+def test_full_batches_are_sent(address, subscriber):
+    publisher = TelemetryPublisher(address, max_batch=2, max_delay=60)
+    _publish(publisher, 5)
+    assert publisher.sent == 2
+    publisher.close()
+    frames = subscriber.poll()
+    assert [len(rows) for _, rows in frames] == [2, 2, 1]
+    assert subscriber.lost == 0
+
+
+def test_sequence_gaps_count_as_lost(address, subscriber):
+    publisher = TelemetryPublisher(address, max_batch=1, max_delay=60)
+    _publish(publisher, 1)
+    publisher.sequence += 3  # Three frames that never arrived
+    _publish(publisher, 1)
+    subscriber.poll()
+    assert subscriber.received == 2
+    assert subscriber.lost == 3
+    publisher.close()
+
+
+def test_malformed_frames_are_ignored(address, subscriber):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    sock.sendto(b'short', subscriber.sockaddr)
+    sock.sendto(HEADER.pack(MAGIC, VERSION + 1, 0, 1, 0, 15.0, 10.0), subscriber.sockaddr)
+    sock.sendto(HEADER.pack(MAGIC, VERSION, 2, 1, 0, 15.0, 10.0) + b'\0', subscriber.sockaddr)
+    sock.close()
+    assert subscriber.poll() == []
+    assert subscriber.received == 0
+
+
+def test_unsent_batches_are_dropped(tmp_path):
+    publisher = TelemetryPublisher(f'unix://{tmp_path}/nobody.sock', max_batch=1)
+    _publish(publisher, 3)
+    assert (publisher.sent, publisher.dropped) == (0, 3)
+    publisher.close()
+
+
+class StubEnv(gym.Env):
+    """Falls 100 ft per step from 250 ft, stalled until it is told to recover."""
+
+    observation_space = gym.spaces.Box(-np.inf, np.inf, shape=(7,), dtype=np.float32)
+    action_space = gym.spaces.Box(-1, 1, shape=(2,), dtype=np.float32)
+    dt = 0.1
+    action_repeat = 2
+    critical_alpha, safe_alpha = 15.0, 10.0
+    reward_spec = RewardSpec(crash_altitude=0.0)
+
+    def __init__(self, recover_at=None):
+        self.recover_at = recover_at
+
+    def reset(self, seed=None, options=None):
+        self.steps = 0
+        return self._obs(), {}
+
+    def step(self, action):
+        self.steps += 1
+        obs = self._obs()
+        terminated = obs[4] <= 0 or self.steps == self.recover_at
+        return obs, -1.0, bool(terminated), False, {}
+
+    def _obs(self):
+        alpha = 5.0 if self.steps == self.recover_at else 16.0
+        return np.float32([alpha, 50, 0, 10, 250 - 100 * self.steps, 0, 0])
+
+
+@pytest.mark.parametrize('recover_at, final_status', [(None, STATUS_CRASHED), (2, STATUS_RECOVERED)])
+def test_wrapper_tags_the_terminal_step(address, subscriber, recover_at, final_status):
+    env = TelemetryStreamWrapper(StubEnv(recover_at), TelemetryPublisher(address, max_delay=60))
+    assert env.critical_alpha == 15.0  # Attributes read through the wrapper
+    for episode in range(2):
+        env.reset()
+        terminated = False
+        while not terminated:
+            _, _, terminated, _, _ = env.step(env.action_space.sample())
+    env.close()
+
+    frames = subscriber.poll()
+    assert [rows['episode'][0] for _, rows in frames] == [0, 1]  # Flushed at every episode end
+    rows = frames[0][1]
+    assert rows['status'][-1] == final_status
+    assert (rows['status'][:-1] == STATUS_STALL).all()
+    np.testing.assert_allclose(rows['time'], 0.2 * np.arange(1, len(rows) + 1))
+    assert subscriber.alpha_limits[frames[0][0]] == (15.0, 10.0)
@@ -0,0 +1,209 @@
+import threading
+import time
+
+from PyQt6.QtCore import QObject, pyqtSignal, pyqtSlot
+
+import profiling
+from flight_recorder import STATUS_NORMAL, STATUS_STALL, FlightRecorder
+
+# Stable-Baselines3 (and torch) and the JSBSim environment module are
+# imported inside ``run`` so that importing this module stays cheap.
+
+
+class ControlledWorker(QObject):
+    """
+    Base for background workers that the GUI thread can pause and cancel.
+
+    Subclasses implement ``run`` as a slot started from ``QThread.started``
+    and call ``checkpoint`` regularly. ``pause``, ``resume`` and ``cancel``
+    only touch thread-safe events, so they may be called directly from the
+    GUI thread while ``run`` is busy.
+    """
+
+    status = pyqtSignal(str)
+    failed = pyqtSignal(str)
+    finished = pyqtSignal()
+
+    def __init__(self):
+        super().__init__()
+        self._resume = threading.Event()
+        self._resume.set()
+        self._cancelled = threading.Event()
+
+    @property
+    def paused(self):
+        return not self._resume.is_set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def pause(self):
+        self._resume.clear()
+
+    def resume(self):
+        self._resume.set()
+
+    def cancel(self):
+        self._cancelled.set()
+        self._resume.set()  # Wake a paused worker so it can exit
+
+    def checkpoint(self):
+        """
+        Block while paused.
+
+        Returns:
+            bool: False once the worker has been cancelled.
+        """
+        self._resume.wait()
+        return not self._cancelled.is_set()
+
+
+class EvaluationWorker(ControlledWorker):
+    """
+    Run one evaluation episode off the GUI thread.
+
+    ``model`` is evaluated when given; otherwise the agent is loaded from
+    ``model_path`` and kept on ``self.model``. Telemetry rows are streamed
+    to the GUI in chunks at most ``max_emit_hz`` times per second. With
+    ``realtime`` set, steps are paced to simulation time; otherwise the
+    episode runs as fast as possible.
+    """
+
+    telemetry = pyqtSignal(object)  # np.ndarray of TELEMETRY_DTYPE rows
+    stall_detected = pyqtSignal()
+
+    def __init__(self, env, model_path='stall_recovery_agent', realtime=True, max_emit_hz=20, model=None):
+        super().__init__()
+        self.env = env
+        self.model_path = model_path
+        self.model = model
+        self.realtime = realtime  # May be toggled from the GUI thread
+        self.max_emit_hz = max_emit_hz
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            if self.model is None:
+                from normalization import load_model
+
+                self.status.emit("Status: Loading Agent...")
+                self.model = load_model(self.model_path, env=self.env)
+            self.status.emit("Status: Evaluating...")
+            self._evaluate()
+            self.status.emit("Status: Evaluation Cancelled" if self.cancelled else "Status: Evaluation Complete")
+        except Exception as exc:
+            self.failed.emit(f"Status: Evaluation Failed ({exc})")
+        finally:
+            self.finished.emit()
+
+    def _evaluate(self):
+        from AircraftSHAgent import OBS_ALPHA
+
+        env = self.env
+        decision_dt = env.dt * env.action_repeat
+        recorder = FlightRecorder()
+        emitted = 0
+        last_emit = next_tick = time.perf_counter()
+        in_stall = False
+
+        obs, _ = env.reset()
+        terminated = truncated = False
+        while not (terminated or truncated) and self.checkpoint():
+            with profiling.section('model.predict'):
+                action, _ = self.model.predict(obs, deterministic=True)
+            obs, reward, terminated, truncated, _ = env.step(action)
+
+            # Detect stall condition
+            stall = obs[OBS_ALPHA] > env.critical_alpha
+            if stall and not in_stall:
+                self.stall_detected.emit()
+            in_stall = stall
+            recorder.record(obs, action, reward, STATUS_STALL if stall else STATUS_NORMAL,
+                            time=len(recorder) * decision_dt)
+            if stall:
+                obs[OBS_ALPHA] = env.safe_alpha  # Adjust angle of attack to recover from stall
+
+            now = time.perf_counter()
+            if now - last_emit >= 1 / self.max_emit_hz:
+                self.telemetry.emit(recorder.data[emitted:].copy())
+                emitted = len(recorder)
+                last_emit = now
+
+            # Pace to simulation time; a late step (or a pause) restarts the clock
+            if self.realtime:
+                next_tick += decision_dt
+                delay = next_tick - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_tick = time.perf_counter()
+
+        if emitted < len(recorder):
+            self.telemetry.emit(recorder.data[emitted:].copy())
+
+
+def _make_worker_callback(worker, total_timesteps, report_every=256):
+    """Create a callback that lets a TrainingWorker pause, cancel and report on ``model.learn``."""
+    from stable_baselines3.common.callbacks import BaseCallback
+
+    class WorkerCallback(BaseCallback):
+        def _on_step(self):
+            if self.n_calls % report_every == 0:
+                worker.status.emit(f"Status: Training... {self.num_timesteps}/{total_timesteps}")
+            return worker.checkpoint()
+
+    return WorkerCallback()
+
+
+class TrainingWorker(ControlledWorker):
+    """
+    Run ``model.learn`` off the GUI thread and save the result.
+
+    When ``model`` is None a new PPO agent is created for ``env`` first;
+    either way the trained agent is left on ``self.model``. ``completed``
+    is only set once training ran to the end and the agent was saved; a
+    cancelled or failed run leaves a partially trained ``self.model``.
+    """
+
+    def __init__(self, model, env=None, total_timesteps=8000, save_path='stall_recovery_agent'):
+        super().__init__()
+        self.model = model
+        self.env = env
+        self.total_timesteps = total_timesteps
+        self.save_path = save_path
+        self.completed = False
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            from normalization import save_model
+
+            if self.model is None:
+                from stable_baselines3 import PPO
+
+                self.status.emit("Status: Creating Agent...")
+                self.model = PPO('MlpPolicy', self.env, verbose=1, device='cpu')
+            self.status.emit("Status: Training...")
+            callbacks = [_make_worker_callback(self, self.total_timesteps)]
+            if profiling.is_enabled():
+                callbacks.append(profiling.make_tensorboard_callback())
+            # Keep a loaded model's normalization statistics updating while it learns
+            vec_normalize = self.model.get_vec_normalize_env()
+            if vec_normalize is not None:
+                vec_normalize.training = True
+            try:
+                self.model.learn(total_timesteps=self.total_timesteps, callback=callbacks)
+            finally:
+                if vec_normalize is not None:
+                    vec_normalize.training = False
+            if self.cancelled:
+                self.status.emit("Status: Training Cancelled")
+            else:
+                save_model(self.model, self.save_path)
+                self.completed = True
+                self.status.emit("Status: Training Complete")
+        except Exception as exc:
+            self.failed.emit(f"Status: Training Failed ({exc})")
+        finally:
+            self.finished.emit()